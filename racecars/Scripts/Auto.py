@@ -1,4 +1,3 @@
-import random
 from simulation.script_api import AutoAuto
 
 
@@ -16,7 +15,7 @@ class Auto(AutoAuto):
     def PickMove(self, auto, world, targets, validity):
         if not validity or len(validity) == 0:
             return None
-        move = random.choice(validity)
+        move = self.random.choice(validity)
         self.last_move = move
         self.move_history.append(move)
         return move
@@ -1,4 +1,3 @@
-import random
 from simulation.script_api import AutoAuto
 
 
@@ -14,8 +13,8 @@ class Auto(AutoAuto):
                 valid_indices.append(i)
 
         if len(valid_indices) == 0:
-            index = random.randint(0, len(targets) - 1)
+            index = self.random.randint(0, len(targets) - 1)
             return targets[index]
 
-        choice_idx = random.randint(0, len(valid_indices) - 1)
+        choice_idx = self.random.randint(0, len(valid_indices) - 1)
         return targets[valid_indices[choice_idx]]
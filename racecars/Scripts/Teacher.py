@@ -1,4 +1,3 @@
-import random
 from simulation.script_api import AutoAuto
 
 
@@ -15,7 +14,7 @@ class Auto(AutoAuto):
     def PickMove(self, auto, world, targets, validity):
         if len(validity) == 0 or sum(validity) == 0:
             self.logger.warning("None of the targets is valid, choosing random.")
-            return targets[random.randint(0, len(targets) - 1)]
+            return targets[self.random.randint(0, len(targets) - 1)]
         
         best_x = None
         for i in range(0, len(targets)):
@@ -29,4 +28,4 @@ class Auto(AutoAuto):
         if len(best_targets) == 0:
             self.logger.error("No best targets found:", targets,validity)
 
-        return best_targets[random.randint(0, len(best_targets) - 1)]
+        return best_targets[self.random.randint(0, len(best_targets) - 1)]
@@ -5,24 +5,24 @@ This file wires together setup, track generation, driver loading, and the UI loo
 
 import logging
 import os
-import random
-from typing import List
-from simulation.game_state import GameState, Car, Track, Vertex
-from simulation.track_generator import generate_track
 from simulation.params import GameParams
 from simulation.config import (
     parse_console_args,
     parse_controllers_text,
+    parse_seed_list_text,
     print_basic_console_help,
     print_advanced_console_help
 )
-from simulation.manual_auto import MouseAuto
-from simulation.script_loader import load_scripts_from_folder, load_auto_class
+from simulation.script_loader import load_scripts_from_folder
+from simulation.race_setup import build_track, create_cars_for_track, build_game_state
 from simulation.performance import PerformanceTracker
-from ui.logging_utils import setup_logging, sanitize_logger_name
-from ui.renderer import Renderer
-from ui.setup_dialog import SetupDialog
-from ui.controller_dialog import ControllerDialog
+from simulation.headless import run_headless
+from simulation.tournament import run_tournament, write_results_csv
+from simulation.driver_host import DriverHostPool, release_hosted_drivers
+from simulation.replay import ReplayRecorder, ReplayEngine, ReplayError, read_replay
+from simulation.track_pool import TrackPool, ensure_track_library
+from simulation.race_random import RaceRandom
+from ui.logging_utils import setup_logging
 
 _LOGGER = logging.getLogger("racecars.main")
 
@@ -33,97 +33,84 @@ def _filter_visible_scripts(script_infos):
             visible.append(info)
     return visible
 
-def _find_script_info(script_infos, name: str):
-    if name is None:
-        return None
-    target = name.lower()
-    target_no_ext = _strip_py_extension(target)
-    for info in script_infos:
-        info_name = info.name.lower()
-        info_file = info.file_name.lower()
-        if info_name == target or info_file == target or info_name == target_no_ext:
-            return info
-    return None
-
-
-def _strip_py_extension(name: str) -> str:
-    if name.endswith(".py"):
-        return name[:-3]
-    return name
-
-
-def _create_cars_for_track(track: Track, players: int, controllers, script_infos) -> List[Car]:
-    # Start order is randomized so scripts do not always get the same starting slot.
-    start_positions = list(track.start_vertices)
-    random.shuffle(start_positions)
-
-    count = players
-    if count > len(start_positions):
-        count = len(start_positions)
-
-    # generate random names
-    ADJECTIVES = ["Red", "Blue", "Green", "Yellow", "Silver", "Black",
-    "Swift", "Brave", "Wild", "Mighty", "Fierce", "Lucky"]
-    NOUNS = ["Comet", "Falcon", "Tiger", "Eagle", "Rocket", "Panther",
-    "Wolf", "Viper", "Storm", "Blaze", "Arrow", "Bolt"]
-    random.shuffle(ADJECTIVES)
-    random.shuffle(NOUNS)
-    names = []
-    for i in range(count):
-        names.append(ADJECTIVES[i] + " " + NOUNS[i])
-
-    cars: List[Car] = []
-    for index in range(count):
-        controller_name = "mouse"
-        if index < len(controllers):
-            controller_name = controllers[index]
-
-        driver = MouseAuto()
-        logger = logging.getLogger("racecars.car." + sanitize_logger_name("Mouse") + ".id_" + str(index + 1))
-        if controller_name.lower() != "mouse":
-            try:
-                script_info = _find_script_info(script_infos, controller_name)
-                if script_info is None:
-                    raise ValueError("Controller '%s' was not found. Falling back to mouse for car %s." % (controller_name, index + 1))   
-                auto_class = load_auto_class(script_info)
-                if auto_class is None:
-                    raise ValueError("Failed to load script '%s'. Falling back to mouse for car %s." % (script_info.name, index + 1))
-                driver = auto_class(track)
-                try:
-                    name = driver.GetName()
-                except Exception as ex:
-                    car.logger.exception("GetName() failed for script '%s' (%s: %s). Using script file name as fallback.", script_info.name, type(ex).__name__, ex)
-                    name = script_info.name
-                names[index] = name
-                logger = logging.getLogger("racecars.car." + sanitize_logger_name(script_info.name) + ".id_" + str(index + 1))
-            except Exception as ex:
-                _LOGGER.exception("Script '%s' raised during initialization (%s: %s). Falling back to mouse for car %s.", script_info.name, type(ex).__name__, ex, index + 1)
-
-        # finally create the car        
-        cars.append(Car(index, names[index], start_positions[index], driver = driver, logger = logger))
-
-    return cars
-
 def _print_start_instructions():
     print("Players: use --players N or players=N")
     print("Measure: use --measure")
     print("Controllers: use --controllers mouse,ScriptName")
     print("Framerate: use --framerate N or framerate=N")
     print("Skip GUI: use --no-gui")
+    print("No window at all (scripts only): use --headless")
     print("List console params: use --list-params")
 
+def _print_race_result(result):
+    if not result.finished:
+        print("Race did not finish. Rounds played: " + str(result.rounds))
+        return
+    winner_texts = []
+    for winner_id in result.winners:
+        winner_texts.append("Car " + str(winner_id + 1) + ": " + result.names[winner_id])
+    print("Winners: " + ", ".join(winner_texts))
+    print("Rounds: " + str(result.rounds))
+
+def _run_tournament_mode(tournament_text, controllers, params, scripts_folder, workers, replay_folder, track_library_path):
+    try:
+        seeds = parse_seed_list_text(tournament_text)
+    except ValueError as ex:
+        _LOGGER.error("Tournament could not start: %s", ex)
+        return
+    if len(seeds) == 0 or len(controllers) == 0:
+        _LOGGER.error("Tournament needs at least one seed and one controller.")
+        return
+
+    log_path = os.path.join(os.path.dirname(__file__), "tournament_log.csv")
+    print("Tournament: " + str(len(seeds)) + " races, controllers: " + ", ".join(controllers))
+    if replay_folder is not None:
+        os.makedirs(replay_folder, exist_ok=True)
+        print("Replays: " + replay_folder)
+    if track_library_path is not None:
+        # Generated once here; every worker then maps the same file instead of generating.
+        library_params = params.clone()
+        library_params.players = len(controllers)
+        generated = ensure_track_library(track_library_path, library_params, seeds, workers)
+        print("Track library: " + track_library_path + " (" + str(generated) + " new tracks)")
+    results = run_tournament(
+        seeds,
+        controllers,
+        params,
+        scripts_folder,
+        workers,
+        replay_folder=replay_folder,
+        track_library=track_library_path
+    )
+    count = write_results_csv(_print_tournament_progress(results), log_path)
+    print("Tournament finished: " + str(count) + " races written to " + log_path)
+
+def _print_tournament_progress(results):
+    for result in results:
+        winner_names = []
+        for winner_id in result.winners:
+            winner_names.append(result.names[winner_id])
+        print("Seed " + str(result.seed) + ": rounds=" + str(result.rounds) + " winners=" + ", ".join(winner_names))
+        yield result
+
 def main():
     # 1) Gather parameters and available scripts.
     parsed_config = parse_console_args(GameParams())
     params = parsed_config.params
     provided_any = parsed_config.provided_any
     start_without_gui = parsed_config.start_without_gui
+    headless = parsed_config.headless
     list_params = parsed_config.list_params
     list_advanced_parameters = parsed_config.list_advanced_parameters
     controllers_text = parsed_config.controllers_text
+    tournament_text = parsed_config.tournament_text
+    workers = parsed_config.workers
     suppress_log = parsed_config.suppress_log
     log_path = parsed_config.log_path
     log_level = parsed_config.log_level
+    record_replay_path = parsed_config.record_replay_path
+    replay_path = parsed_config.replay_path
+    track_library_path = parsed_config.track_library_path
 
     if suppress_log:
         setup_logging(log_level, to_console=False, file_path=None)
@@ -141,6 +128,10 @@ def main():
         print_advanced_console_help()
         return
 
+    if replay_path is not None:
+        _run_replay(replay_path, params, headless)
+        return
+
     scripts_folder = os.path.join(os.path.dirname(__file__), "Scripts")
     scripts = load_scripts_from_folder(scripts_folder)
     visible_scripts = _filter_visible_scripts(scripts)
@@ -152,6 +143,12 @@ def main():
     if controllers is not None and len(controllers) == 0:
         controllers = None
 
+    if tournament_text is not None:
+        if controllers is None:
+            controllers = list(script_names_default[:params.players])
+        _run_tournament_mode(tournament_text, controllers, params, scripts_folder, workers, record_replay_path, track_library_path)
+        return
+
     if controllers is None and not provided_any and not start_without_gui and len(script_names_default) > 0:
         params.players = len(script_names_default)
         if params.players > 10:
@@ -160,8 +157,18 @@ def main():
     if controllers is not None:
         params.players = len(controllers)
 
+    # With a track library, the track is generated in the background while the setup
+    # dialogs are open (if the dialogs change the parameters, it is generated later).
+    track_pool = None
+    if track_library_path is not None:
+        track_pool = TrackPool(track_library_path, workers=1)
+        if params.seed is not None and not start_without_gui:
+            track_pool.prefetch(params, [params.seed])
+
     # 3) Optionally run setup dialogs for easier classroom use.
+    # UI modules import pygame, so they are imported only when a window is used.
     if not start_without_gui:
+        from ui.setup_dialog import SetupDialog
         dialog = SetupDialog(params)
         params = dialog.run()
         if controllers is not None:
@@ -173,73 +180,106 @@ def main():
         if len(controllers) < params.players:
             controllers.extend(["mouse"] * (params.players - len(controllers)))
         if not start_without_gui:
+            from ui.controller_dialog import ControllerDialog
             options = ["Mouse"] + script_names_all
             dialog = ControllerDialog(params.players, options, controllers)
             controllers = dialog.run()
             controllers = list(controllers[:params.players])
             if len(controllers) < params.players:
                 controllers.extend(["mouse"] * (params.players - len(controllers)))
-        if start_without_gui:
+        if start_without_gui and not headless:
             params.players = 2
             controllers = []
             controllers.append("mouse")
             controllers.append("mouse")
 
     # 4) Build the world
-    # Generate a simple track
-    track = generate_track(
-        width=params.width-2,
-        height=params.height-2,
-        players=params.players,
-        track_width_mean=params.track_width_mean,
-        track_width_var=params.track_width_var,
-        turn_density=params.turn_density,
-        turn_sharpness=params.turn_sharpness,
-        seed=params.seed
-    )
-
-    # add bounderies
-    track.width = params.width
-    track.height = params.height
-    # vertical
-    track.road_mask.insert(0, [False for x in range(params.height)])
-    track.road_mask.append([False for x in range(params.height)])
-    #horizontal
-    for x in range(params.width):
-        track.road_mask[x].insert(0, False)
-        track.road_mask[x].append(False)
-
-    # move start and finish lines
-    track.start_line.start.x = 1
-    track.start_line.end.x = 1
-    for i in range(len(track.start_vertices)):
-        track.start_vertices[i] = (Vertex(track.start_vertices[i].x+1, track.start_vertices[i].y))
-    track.finish_line.start.x = params.width - 1
-    track.finish_line.end.x = params.width - 1
-    #print track.start_line.start, track.start_line.end
-    # Create cars
-    cars = _create_cars_for_track(track, params.players, controllers, scripts)
-
+    if track_pool is not None and params.seed is None:
+        _LOGGER.warning("Track library needs a fixed --seed; generating a random track instead.")
+    # Every random choice of the race comes from this seed; without --seed one is picked.
+    race_random = RaceRandom(params.seed)
+    if params.seed is None:
+        _LOGGER.info("Race seed %s (run with --seed %s to play this race again).", race_random.seed, race_random.seed)
+    track = build_track(params, track_pool, race_random)
+
+    # Create cars (scripts run in their own processes with --isolate-drivers)
+    host_pool = None
+    if params.isolate_drivers:
+        host_pool = DriverHostPool(scripts_folder)
+    cars = create_cars_for_track(track, params.players, controllers, scripts, host_pool, race_random)
+    try:
+        _play_race(params, track, cars, headless, controllers, record_replay_path, race_random)
+    finally:
+        if host_pool is not None:
+            release_hosted_drivers(cars, host_pool)
+            host_pool.close()
+        if track_pool is not None:
+            track_pool.close()
+
+
+def _play_race(params, track, cars, headless, controllers, record_replay_path, race_random):
     # Initialize game state
-    game_state = GameState(
-        track=track,
-        cars=cars,
-        car_collision_penalty_enabled=params.car_collision_penalty_enabled,
-        shuffle_turn_order_each_round=params.shuffle_turn_order_each_round,
-        strict_target_check=params.strict_target_check,
-        penalty_mode=params.penalty_mode,
-        penalty_value=params.penalty_value
-    )
+    game_state = build_game_state(params, track, cars, race_random)
     if params.measure_performance:
         log_path = os.path.join(os.path.dirname(__file__), "performance_log.csv")
         game_state.performance = PerformanceTracker(len(cars), log_path)
+    if record_replay_path is not None:
+        game_state.replay = ReplayRecorder(record_replay_path, params, game_state, controllers)
+    try:
+        _run_race_loop(params, game_state, headless)
+    finally:
+        if game_state.replay is not None:
+            game_state.replay.close(game_state)
+            print("Replay saved: " + record_replay_path)
+
+
+def _run_race_loop(params, game_state, headless):
+    # 5a) Headless races are played to the end right here, as fast as possible.
+    if headless:
+        try:
+            result = run_headless(game_state)
+        except ValueError as ex:
+            _LOGGER.error("Headless race could not start: %s", ex)
+            return
+        _print_race_result(result)
+        return
 
-    # 5) Hand off to renderer; it drives the game loop until window close.
+    # 5b) Hand off to renderer; it drives the game loop until window close.
     # Start the renderer
-    renderer = Renderer(game_state, framerate=params.framerate)
+    from ui.renderer import Renderer
+    renderer = Renderer(game_state, framerate=params.framerate, turn_rate=params.turn_rate)
     _print_start_instructions()
     renderer.run()
 
 
+def _run_replay(replay_path, params, headless):
+    try:
+        replay = read_replay(replay_path)
+    except (OSError, ReplayError) as ex:
+        _LOGGER.error("Replay could not be loaded: %s", ex)
+        return
+    engine = ReplayEngine(replay)
+    print("Replay: seed " + str(replay.seed) + ", " + str(engine.turn_count) + " moves, cars: " + ", ".join(replay.names))
+
+    # Headless replays re-simulate the race and compare it with the recorded result.
+    if headless:
+        try:
+            problems = engine.verify()
+        except ReplayError as ex:
+            _LOGGER.error("Replay could not be played: %s", ex)
+            return
+        _print_race_result(engine.result())
+        if problems:
+            for problem in problems:
+                print("Mismatch: " + problem)
+        else:
+            print("Replay matches the recorded result.")
+        return
+
+    from ui.renderer import Renderer
+    renderer = Renderer(engine.game_state, framerate=params.framerate, turn_rate=params.turn_rate, controller=engine)
+    renderer.run()
+
+
 if __name__ == "__main__":
     main()
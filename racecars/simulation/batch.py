@@ -0,0 +1,129 @@
+"""Play many independent races in one process, all of them turn by turn together.
+
+Driver training needs hundreds of races, and most of their cost is per-track
+setup and per-turn overhead, not the moves themselves. A RaceBatch keeps many
+GameStates and step() plays one turn in every race that is still running:
+
+- Races on the same track parameters and seed share one Track object, so its
+  tables (road cells, finish distances, answered segments) are built once.
+- Targets for all races of a step are generated in one pass through a
+  MoveTable per track: the nine targets of a (position, velocity) state and
+  their road validity are worked out once and reused by every race that
+  reaches that state; only the other cars are checked per race.
+- Each race keeps its own Controller, so drivers, time limits, fallback moves
+  and replays behave exactly as in a single race.
+
+Drivers run in this process (no --isolate-drivers), and scripts that use the
+`random` module share it between races; self.random stays per race.
+
+    batch = build_race_batch(params, range(1, 201), ["Teacher", "DijkstraFast"], scripts)
+    results = batch.run()
+"""
+
+import logging
+from typing import List
+from simulation.game_state import GameState
+from simulation.params import GameParams
+from simulation.controller import Controller
+from simulation.move_generator import get_batch_targets_and_validity
+from simulation.headless import RaceResult, ensure_no_manual_drivers, build_race_result
+from simulation.race_random import RaceRandom
+from simulation.race_setup import build_track, create_cars_for_track, build_game_state
+from simulation.track_library import track_key
+
+_LOGGER = logging.getLogger("racecars.batch")
+
+
+class RaceBatch:
+    def __init__(self, game_states: List[GameState], max_rounds: int = 1000):
+        # max_rounds: a race still running after this many rounds is stopped, as in run_headless().
+        for game_state in game_states:
+            ensure_no_manual_drivers(game_state)
+        self.game_states = list(game_states)
+        self.max_rounds = max_rounds
+        self.controllers = []
+        for game_state in self.game_states:
+            self.controllers.append(Controller(game_state))
+        self.move_tables = {}  # Track -> MoveTable, shared by all races on that track
+        self.steps = 0
+
+    def __len__(self):
+        return len(self.game_states)
+
+    def running(self) -> List[int]:
+        # Indices of the races that still get turns.
+        indices = []
+        for index in range(len(self.game_states)):
+            if self._is_running(self.game_states[index]):
+                indices.append(index)
+        return indices
+
+    def step(self) -> int:
+        # One turn in every running race; returns how many races played it (0 = all done).
+        indices = self.running()
+        if len(indices) == 0:
+            return 0
+        game_states = []
+        for index in indices:
+            game_states.append(self.game_states[index])
+        turns = get_batch_targets_and_validity(game_states, self.move_tables)
+        for position in range(len(indices)):
+            targets, validity = turns[position]
+            self.controllers[indices[position]].play_turn(targets, validity)
+        self.steps += 1
+        return len(indices)
+
+    def run(self) -> List[RaceResult]:
+        # Plays every race to its end and returns the results in batch order.
+        while self.step() > 0:
+            pass
+        stopped = 0
+        for game_state in self.game_states:
+            if not game_state.finished and game_state.cars:
+                stopped += 1
+        if stopped > 0:
+            _LOGGER.warning("%s of %s races stopped after %s rounds without reaching the finish.", stopped, len(self.game_states), self.max_rounds)
+        self.close()
+        return self.results()
+
+    def results(self) -> List[RaceResult]:
+        results = []
+        for game_state in self.game_states:
+            results.append(build_race_result(game_state, self.max_rounds))
+        return results
+
+    def close(self):
+        for controller in self.controllers:
+            controller.close()
+
+    def _is_running(self, game_state: GameState) -> bool:
+        if game_state.finished or not game_state.cars:
+            return False
+        return self.max_rounds is None or game_state.race_round <= self.max_rounds
+
+
+def build_race_batch(params: GameParams, seeds, controllers, script_infos, library=None, max_rounds: int = 1000) -> RaceBatch:
+    # One race per entry of `seeds`. A seed given more than once is raced again on the
+    # same Track object, with its own start grid, turn order and driver streams.
+    tracks = {}
+    races_per_seed = {}
+    game_states = []
+    for seed in seeds:
+        race_params = params.clone()
+        race_params.seed = seed
+        race_params.players = len(controllers)
+
+        race_index = races_per_seed.get(seed, 0)
+        races_per_seed[seed] = race_index + 1
+        race_random = RaceRandom(seed, race_index)
+
+        key = track_key(race_params)
+        track = tracks.get(key)
+        if track is None:
+            track = build_track(race_params, library, race_random)
+            if key is not None:
+                tracks[key] = track
+        cars = create_cars_for_track(track, race_params.players, controllers, script_infos, None, race_random)
+        game_states.append(build_game_state(race_params, track, cars, race_random))
+    _LOGGER.debug("Built %s races on %s shared tracks.", len(game_states), len(tracks))
+    return RaceBatch(game_states, max_rounds)
@@ -15,22 +15,34 @@ class ConsoleConfig:
         params: GameParams,
         provided_any: bool,
         start_without_gui: bool,
+        headless: bool,
         list_params: bool,
         list_advanced_parameters: bool,
         controllers_text,
+        tournament_text,
+        workers,
         suppress_log: bool,
         log_path,
         log_level: str,
+        record_replay_path=None,
+        replay_path=None,
+        track_library_path=None,
     ):
         self.params = params
         self.provided_any = provided_any
         self.start_without_gui = start_without_gui
+        self.headless = headless
         self.list_params = list_params
         self.list_advanced_parameters = list_advanced_parameters
         self.controllers_text = controllers_text
+        self.tournament_text = tournament_text
+        self.workers = workers
         self.suppress_log = suppress_log
         self.log_path = log_path
         self.log_level = log_level
+        self.record_replay_path = record_replay_path
+        self.replay_path = replay_path
+        self.track_library_path = track_library_path
 
 
 def parse_console_args(default_params: GameParams):
@@ -67,9 +79,14 @@ def parse_console_args(default_params: GameParams):
 
     provided_any = _has_parameter_overrides(options)
     start_without_gui = options.start_without_gui
+    headless = options.headless
+    if headless:
+        start_without_gui = True
     list_params = options.list_params
     list_advanced_parameters = options.list_advanced_parameters
     controllers_text = options.controllers
+    tournament_text = options.tournament
+    workers = options.workers
 
     suppress_log = False
     if options.suppress_log is not None:
@@ -84,12 +101,18 @@ def parse_console_args(default_params: GameParams):
         params=params,
         provided_any=provided_any,
         start_without_gui=start_without_gui,
+        headless=headless,
         list_params=list_params,
         list_advanced_parameters=list_advanced_parameters,
         controllers_text=controllers_text,
+        tournament_text=tournament_text,
+        workers=workers,
         suppress_log=suppress_log,
         log_path=log_path,
         log_level=log_level,
+        record_replay_path=options.record_replay_path,
+        replay_path=options.replay_path,
+        track_library_path=options.track_library_path,
     )
 
 
@@ -105,6 +128,30 @@ def parse_controllers_text(text):
     return result
 
 
+def parse_seed_list_text(text):
+    # Accepts "1,2,7" and ranges like "1-100" (both ends included), or a mix.
+    if text is None:
+        return None
+    seeds = []
+    for item in text.split(","):
+        part = item.strip()
+        if part == "":
+            continue
+        dash_index = part.find("-", 1)
+        if dash_index > 0:
+            first = part[:dash_index].strip()
+            last = part[dash_index + 1:].strip()
+            if not _is_int_string(first, True) or not _is_int_string(last, True):
+                raise ValueError("Invalid seed range '%s'." % part)
+            for seed in range(int(first), int(last) + 1):
+                seeds.append(seed)
+            continue
+        if not _is_int_string(part, True):
+            raise ValueError("Invalid seed '%s'." % part)
+        seeds.append(int(part))
+    return seeds
+
+
 def print_basic_console_help():
     print("Console parameters:")
     print("  --players N or players=N")
@@ -117,6 +164,7 @@ def print_basic_console_help():
     print("  --turn_sharpness N or turn_sharpness=N")
     print("  --turn_density N or turn_density=N")
     print("  --framerate N or framerate=N")
+    print("  --turn-rate N (turns per second in the window, 0 = as fast as possible, default: framerate)")
     print("  --seed N or --seed None")
     print("")
     print("  --supress-log or --suppress-log")
@@ -126,7 +174,15 @@ def print_basic_console_help():
     print("")
     print("  --config PATH (default: racecars.config next to main.py)")
     print("  --no-gui or --start (start game directly)")
+    print("  --headless (play the race without a window, scripts only)")
     print("  --list-params (show this list)")
+    print("")
+    print("  --tournament SEEDS (headless races, example: --tournament 1-100 or 1,5,9)")
+    print("  --workers N (worker processes for --tournament, default: all cores)")
+    print("")
+    print("  --record-replay PATH (save every move to a replay file; with --tournament a folder)")
+    print("  --replay FILE (play a saved race again without scripts; with --headless only check it)")
+    print("  --track-library PATH (load tracks from this file; missing ones are generated and added)")
     print("  --list-advanced-parameters (show advanced rule parameters)")
 
 
@@ -152,6 +208,17 @@ def print_advanced_console_help():
     print("  --penalty-length vel+N")
     print("    Waiting rounds compensate for deceleration and add the actual penalty.")
     print("    Example: --penalty-length vel+2")
+    print("")
+    print("  --move-time-limit SECONDS|off")
+    print("    Time budget for one PickMove() call. A script that needs longer")
+    print("    drifts (keeps its velocity) for that turn and the timeout is counted.")
+    print("    Example: --move-time-limit 0.5")
+    print("    Default: off")
+    print("")
+    print("  --isolate-drivers on|off")
+    print("    If ON, every script runs in its own process. A crashing or hanging")
+    print("    script cannot take the game down, and a hanging one can be killed.")
+    print("    Default: off")
 
 
 def _build_arg_parser():
@@ -166,6 +233,7 @@ def _build_arg_parser():
     parser.add_argument("--turn-sharpness", "--turn_sharpness", dest="turn_sharpness", type=int)
     parser.add_argument("--turn-density", "--turn_density", dest="turn_density", type=int)
     parser.add_argument("--framerate", type=int)
+    parser.add_argument("--turn-rate", "--turn_rate", dest="turn_rate", type=float)
     parser.add_argument("--seed", type=_parse_seed_option)
     parser.add_argument("--measure", nargs="?", const="on", type=_parse_bool_option)
 
@@ -184,6 +252,12 @@ def _build_arg_parser():
 
     parser.add_argument("--config", dest="config_path")
     parser.add_argument("--no-gui", "--start", dest="start_without_gui", action="store_true")
+    parser.add_argument("--headless", dest="headless", action="store_true")
+    parser.add_argument("--tournament", dest="tournament")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--record-replay", "--record_replay", dest="record_replay_path")
+    parser.add_argument("--replay", dest="replay_path")
+    parser.add_argument("--track-library", "--track_library", dest="track_library_path")
     parser.add_argument("--list-params", "--help-params", dest="list_params", action="store_true")
     parser.add_argument("--list-advanced-parameters", dest="list_advanced_parameters", action="store_true")
 
@@ -217,6 +291,20 @@ def _build_arg_parser():
         dest="penalty_length",
         type=_parse_penalty_length_option,
     )
+    parser.add_argument(
+        "--move-time-limit",
+        "--move_time_limit",
+        dest="move_time_limit",
+        type=_parse_time_limit_option,
+    )
+    parser.add_argument(
+        "--isolate-drivers",
+        "--isolate_drivers",
+        dest="isolate_drivers",
+        nargs="?",
+        const="on",
+        type=_parse_bool_option,
+    )
 
     return parser
 
@@ -238,6 +326,8 @@ def _apply_options_to_params(params: GameParams, options):
         params.turn_density = options.turn_density
     if options.framerate is not None:
         params.framerate = options.framerate
+    if options.turn_rate is not None:
+        params.turn_rate = options.turn_rate
     if options.seed is not None:
         params.seed = options.seed
     if options.measure is not None:
@@ -257,6 +347,15 @@ def _apply_options_to_params(params: GameParams, options):
         params.penalty_mode = penalty_mode
         params.penalty_value = penalty_value
 
+    if options.move_time_limit is not None:
+        # "off" is parsed as 0 so that it can override a limit from the config file.
+        if options.move_time_limit > 0:
+            params.move_time_limit = options.move_time_limit
+        else:
+            params.move_time_limit = None
+    if options.isolate_drivers is not None:
+        params.isolate_drivers = options.isolate_drivers
+
 
 def _has_parameter_overrides(options):
     fields = [
@@ -269,12 +368,15 @@ def _has_parameter_overrides(options):
         "turn_sharpness",
         "turn_density",
         "framerate",
+        "turn_rate",
         "seed",
         "measure",
         "car_collision_penalty_enabled",
         "shuffle_turn_order_each_round",
         "strict_target_check",
         "penalty_length",
+        "move_time_limit",
+        "isolate_drivers",
     ]
     for name in fields:
         value = getattr(options, name)
@@ -457,6 +559,21 @@ def _parse_penalty_length_option(text: str):
     raise argparse.ArgumentTypeError("Use N or vel+N (example: 2 or vel+1).")
 
 
+def _parse_time_limit_option(text: str):
+    if text is None:
+        raise argparse.ArgumentTypeError("Time limit value is required.")
+    value = text.strip().lower()
+    if value == "off" or value == "none" or value == "0":
+        return 0.0
+    try:
+        seconds = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("Use seconds (example: 0.5) or off.")
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError("Time limit must be positive (or off).")
+    return seconds
+
+
 def _is_int_string(text: str, allow_negative: bool):
     if text == "":
         return False
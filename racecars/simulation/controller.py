@@ -8,8 +8,10 @@ import time
 from simulation.game_state import GameState, Vertex
 from simulation.move_generator import get_ordered_targets_and_validity
 from simulation.turn_logic import TurnLogic
-from simulation.script_api import build_world_state
+from simulation.script_api import build_world_state, refresh_world_state
 from simulation.manual_auto import MouseAuto
+from simulation.driver_worker import DriverWorker, MoveTimeout
+from simulation.driver_host import HostedDriver
 
 _LOGGER = logging.getLogger("racecars.controller")
 
@@ -17,6 +19,18 @@ _LOGGER = logging.getLogger("racecars.controller")
 class Controller:
     def __init__(self, game_state: GameState):
         self.game_state = game_state
+        # Persistent script view, refreshed in place every turn instead of rebuilt.
+        self.world = None
+        # Set when a timed-out PickMove() is still running with self.world; that call
+        # keeps it, and the next turn gets a world of its own.
+        self._world_in_use = False
+        # Background threads for PickMove() when a move time limit is set, one per car id.
+        self._workers = {}
+        # Targets of the current turn; update() and the renderer snapshot ask for them
+        # several times per turn, and a waiting mouse player on every frame.
+        self._targets_key = None
+        self._targets = None
+        self._validity = None
 
     def apply_click(self, grid_x: int, grid_y: int):
         # Clicks are forwarded only to drivers that support manual targeting.
@@ -33,18 +47,24 @@ class Controller:
         if hasattr(car.driver, "SetTarget"):
             car.driver.SetTarget(target)
 
-    def update(self):
+    def update(self) -> bool:
         # Core turn loop for one car: generate targets, ask driver, apply result.
+        # Returns True if a move was applied, False if the turn is still open.
         if self.game_state.finished:
-            return
+            return False
         if not self.game_state.cars:
-            return
+            return False
 
-        car_id = self.game_state.current_player_idx
         targets, validity = self.get_targets_and_validity()
         if len(targets) == 0:
-            raise RuntimeError("No targets generated for current turn.", car)
-        world = build_world_state(self.game_state)
+            raise RuntimeError("No targets generated for current turn.")
+        return self.play_turn(targets, validity)
+
+    def play_turn(self, targets, validity) -> bool:
+        # Second half of update(): ask the current driver to pick one of `targets` and
+        # apply it. Batch runners call it with targets they generated for many races at once.
+        car_id = self.game_state.current_player_idx
+        world = self.get_world_state()
         car = self.game_state.cars[car_id]
         tracker = self.game_state.performance
         start_time = None
@@ -53,10 +73,10 @@ class Controller:
         target = None
         pickmove_failed = False
         try:
-            target = car.PickMove(world, targets, validity)
+            target = self._pick_move(car, world, targets, validity)
             if target is None and isinstance(car.driver, MouseAuto):
                 # Manual drivers can return None while waiting for a click.
-                return
+                return False
             if not isinstance(target, Vertex):
                 raise ValueError(f"PickMove() returned an invalid target of type {type(target).__name__}.")
             if self.game_state.strict_target_check:
@@ -68,6 +88,11 @@ class Controller:
                         target.x,
                         target.y
                     )
+        except MoveTimeout as ex:
+            pickmove_failed = True
+            if tracker is not None:
+                tracker.record_timeout(car_id)
+            car.logger.warning("%s Applying safe fallback move.", ex)
         except Exception as ex:
             pickmove_failed = True
             car.logger.exception(
@@ -85,25 +110,68 @@ class Controller:
         if target is None:
             # Manual players can return None while waiting for a click.
             if self._driver_waits_for_click(car.driver):
-                return
+                return False
 
         TurnLogic.apply_move(self.game_state, car_id, target)
+        if self.game_state.replay is not None:
+            self.game_state.replay.record_move(car_id, target, self.game_state)
         self._report_if_finished()
+        return True
 
     def get_targets_and_validity(self):
         if not self.game_state.cars:
             return [], []
-        targets, validity = get_ordered_targets_and_validity(
-            self.game_state,
-            self.game_state.current_player_idx
-        )
-        if len(targets) == 0:
-            print(self.game_state)
-            raise RuntimeError(
-                "No targets were generated for the current turn. "
-                "This should be impossible and indicates a move generation bug."
-            )
-        return targets, validity
+        car_id = self.game_state.current_player_idx
+        car = self.game_state.cars[car_id]
+        key = (car_id, car.pos, car.vel, car.penalty, self.game_state.occupancy_version)
+        if key != self._targets_key:
+            targets, validity = get_ordered_targets_and_validity(self.game_state, car_id)
+            if len(targets) == 0:
+                print(self.game_state)
+                raise RuntimeError(
+                    "No targets were generated for the current turn. "
+                    "This should be impossible and indicates a move generation bug."
+                )
+            self._targets_key = key
+            self._targets = targets
+            self._validity = validity
+        # Copies, so a driver that edits its lists cannot change the cached ones.
+        return list(self._targets), list(self._validity)
+
+    def close(self):
+        # Lets idle driver threads end; call when the race is over.
+        for worker in self._workers.values():
+            worker.stop()
+        self._workers = {}
+
+    def _pick_move(self, car, world, targets, validity):
+        # Without a time limit (or for mouse players) the driver runs right here.
+        time_limit = self.game_state.move_time_limit
+        if isinstance(car.driver, HostedDriver):
+            # Subprocess drivers enforce the limit on their pipe; no extra thread needed.
+            return car.driver.pick_move(car, world, targets, validity, time_limit)
+        if time_limit is None or self._driver_waits_for_click(car.driver):
+            return car.PickMove(world, targets, validity)
+        worker = self._workers.get(car.id)
+        if worker is None:
+            worker = DriverWorker("id_" + str(car.id + 1))
+            self._workers[car.id] = worker
+        try:
+            return worker.call(car.PickMove, (world, targets, validity), time_limit)
+        except MoveTimeout:
+            if worker.busy:
+                self._world_in_use = True
+            raise
+
+    def get_world_state(self):
+        if self.world is None:
+            self.world = build_world_state(self.game_state)
+        elif self._world_in_use:
+            self.world = build_world_state(self.game_state, self.world)
+            self._world_in_use = False
+        else:
+            self.world = refresh_world_state(self.world, self.game_state)
+        return self.world
 
     def _drifting_target(self, car_id):
         # Ordered targets map ax=-1..1, ay=-1..1, so center is index 4.
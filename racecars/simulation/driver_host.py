@@ -0,0 +1,518 @@
+"""Run each script driver in its own long-lived subprocess.
+
+A DriverHost is one child process that imported one script (through
+script_loader) and keeps it imported. The engine talks to it over a pipe with
+small struct-packed messages:
+
+- TRACK: the road and start/finish lines and the seed of the driver's random
+  stream; the child builds its own Track and a fresh Auto instance and answers
+  with the driver name.
+- CARS: car ids and names, sent before the first turn and when the car list
+  changes.
+- TURN: race round, only the cars whose position or velocity changed since the
+  last TURN sent to this host, and the ordered targets with validity flags;
+  the child answers with a target, None, or an error text.
+
+A crash, a hang or leaked memory in a script stays inside its process. A dead
+host is started again on the next turn without waiting for it (the script
+loses its own state); the car drifts until the new process has answered
+TRACK. A host that overruns the move time limit too many turns in a row is
+killed.
+DriverHostPool keeps idle hosts between races, so the import cost is paid once.
+"""
+
+import logging
+import multiprocessing
+import random
+import struct
+import traceback
+from simulation.game_state import Track, Car, GameState, Vertex, Vector2i, Segment
+from simulation.driver_worker import MoveTimeout
+from ui.logging_utils import sanitize_logger_name, setup_logging, logging_settings
+
+_LOGGER = logging.getLogger("racecars.driver_host")
+
+_MSG_TRACK = 1
+_MSG_CARS = 2
+_MSG_TURN = 3
+_MSG_STOP = 4
+
+_REPLY_NAME = 1
+_REPLY_TARGET = 2
+_REPLY_NONE = 3
+_REPLY_ERROR = 4
+
+_HEADER = struct.Struct("<B")
+_TRACK_HEAD = struct.Struct("<iiiiiii")  # width, height, finish x0, y0, x1, y1, start count
+_PAIR = struct.Struct("<ii")
+_CARS_HEAD = struct.Struct("<ii")  # car count, index of the car this host drives
+_CAR_NAME = struct.Struct("<iH")  # car id, name length in bytes
+_TURN_HEAD = struct.Struct("<iiii")  # race round, own penalty, changed cars, target count
+_CAR_STATE = struct.Struct("<iiiii")  # car index, pos x, pos y, vel x, vel y
+
+# A host that is still busy after this many consecutive timed-out turns is killed.
+_KILL_AFTER_TIMEOUTS = 10
+
+# Seconds to wait for a child to import its script and build the Auto.
+_START_TIMEOUT = 30.0
+
+
+class DriverProcessError(Exception):
+    pass
+
+
+class DriverHost:
+    def __init__(self, scripts_folder: str, script_name: str):
+        self.scripts_folder = scripts_folder
+        self.script_name = script_name
+        self.busy = False
+        self.timeouts_in_row = 0
+        self._process = None
+        self._connection = None
+
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+
+    def start(self):
+        context = multiprocessing.get_context("spawn")
+        parent_end, child_end = context.Pipe()
+        process = context.Process(
+            target=_host_main,
+            args=(child_end, self.scripts_folder, self.script_name, logging_settings()),
+            name="racecars-host-" + self.script_name,
+            daemon=True
+        )
+        process.start()
+        child_end.close()
+        self._process = process
+        self._connection = parent_end
+        self.busy = False
+        self.timeouts_in_row = 0
+
+    def stop(self):
+        if self._connection is not None:
+            try:
+                self._connection.send_bytes(_HEADER.pack(_MSG_STOP))
+            except (OSError, ValueError):
+                pass
+            self._connection.close()
+            self._connection = None
+        if self._process is not None:
+            self._process.join(1.0)
+            if self._process.is_alive():
+                self._process.kill()
+                self._process.join()
+            self._process = None
+
+    def kill(self):
+        self.busy = False
+        if self._process is not None:
+            self._process.kill()
+            self._process.join()
+        self._process = None
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def send(self, payload: bytes):
+        if not self.is_alive():
+            self.start()
+        self._connection.send_bytes(payload)
+
+    def poll(self, timeout: float) -> bool:
+        # True if an answer (or the end of a dead process) is waiting to be received.
+        return self._connection.poll(timeout)
+
+    def wait_for_previous(self, timeout: float):
+        # Called instead of a new request while the last one is unanswered. Spends this
+        # turn's budget waiting for the old answer, drops it, and always raises.
+        if self._connection.poll(timeout):
+            self._receive()
+            self.busy = False
+            self.timeouts_in_row = 0
+            raise MoveTimeout("Previous PickMove() call was still running.")
+        self.timeouts_in_row += 1
+        if self.timeouts_in_row >= _KILL_AFTER_TIMEOUTS:
+            _LOGGER.warning("Driver process '%s' did not answer for %s turns. Restarting it.", self.script_name, self.timeouts_in_row)
+            self.kill()
+            raise DriverProcessError("Driver process was restarted after hanging.")
+        raise MoveTimeout("Previous PickMove() call is still running.")
+
+    def request(self, payload: bytes, timeout: float):
+        # Sends one message that expects an answer; timeout=None waits forever.
+        if self.busy:
+            self.wait_for_previous(timeout)
+
+        self.send(payload)
+        self.busy = True
+        if timeout is not None and not self._connection.poll(timeout):
+            self.timeouts_in_row = 1
+            raise MoveTimeout("PickMove() did not return within " + str(timeout) + " s.")
+        reply = self._receive()
+        self.busy = False
+        self.timeouts_in_row = 0
+        return reply
+
+    def _receive(self):
+        try:
+            return self._connection.recv_bytes()
+        except (EOFError, OSError):
+            self.kill()
+            self.busy = False
+            raise DriverProcessError("Driver process '" + self.script_name + "' exited unexpectedly.")
+
+
+class DriverHostPool:
+    def __init__(self, scripts_folder: str):
+        # Idle hosts per script name, reused by the next race that needs that script.
+        self.scripts_folder = scripts_folder
+        self._idle = {}
+
+    def acquire(self, script_name: str) -> DriverHost:
+        hosts = self._idle.get(script_name)
+        while hosts:
+            host = hosts.pop()
+            if host.is_alive() and not host.busy:
+                return host
+            host.stop()
+        host = DriverHost(self.scripts_folder, script_name)
+        host.start()
+        return host
+
+    def release(self, host: DriverHost):
+        if not host.is_alive() or host.busy:
+            # A host that is still thinking about an old race cannot be trusted with a new one.
+            host.kill()
+            return
+        self._idle.setdefault(host.script_name, []).append(host)
+
+    def close(self):
+        for hosts in self._idle.values():
+            for host in hosts:
+                host.stop()
+        self._idle = {}
+
+
+class HostedDriver:
+    # Stands in for the script's Auto object inside the engine.
+    def __init__(self, host: DriverHost, track: Track, random_seed: str = None):
+        # random_seed: see RaceRandom.driver_seed(); the child seeds the script's random with it.
+        self.host = host
+        self.name = host.script_name
+        self._track_message = _encode_track(track, random_seed)
+        self._sent_cars = None
+        # True while a restarted process has not answered TRACK yet.
+        self._starting = False
+        try:
+            self._open_race()
+        except Exception:
+            host.kill()
+            raise
+
+    def GetName(self) -> str:
+        return self.name
+
+    def PickMove(self, auto, world, targets, validity):
+        return self.pick_move(auto, world, targets, validity, None)
+
+    def pick_move(self, auto, world, targets, validity, time_limit):
+        if self._starting:
+            self._finish_restart(time_limit)
+        elif self.host.busy:
+            # Nothing is sent this turn, so the car deltas stay pending for the next one.
+            try:
+                self.host.wait_for_previous(time_limit)
+            except DriverProcessError:
+                self._sent_cars = None
+                raise
+        if not self.host.is_alive():
+            self._restart()
+        if self._sent_cars is None or len(self._sent_cars) != len(world.cars):
+            self.host.send(_encode_cars(world.cars, _car_index(world.cars, auto.id)))
+            self._sent_cars = [None] * len(world.cars)
+
+        payload = self._encode_turn(auto, world, targets, validity)
+        try:
+            reply = self.host.request(payload, time_limit)
+        except DriverProcessError:
+            self._sent_cars = None
+            raise
+        return _decode_reply(reply)
+
+    def close(self, pool: DriverHostPool = None):
+        if pool is not None:
+            pool.release(self.host)
+        else:
+            self.host.stop()
+
+    def _open_race(self):
+        self._accept_name(self.host.request(self._track_message, _START_TIMEOUT))
+
+    def _restart(self):
+        # The previous process died; a fresh Auto on the same track is started, but not
+        # waited for, so the turn stays within its budget and the car drifts.
+        self.host.start()
+        self.host.send(self._track_message)
+        self.host.busy = True
+        self._starting = True
+        raise MoveTimeout("Driver process '" + self.host.script_name + "' died and is restarting.")
+
+    def _finish_restart(self, time_limit):
+        # Spends at most this turn's budget waiting for the restarted process.
+        if not self.host.poll(time_limit if time_limit is not None else 0):
+            raise MoveTimeout("Driver process '" + self.host.script_name + "' is still starting.")
+        self._starting = False
+        try:
+            reply = self.host._receive()
+        except DriverProcessError:
+            self._sent_cars = None
+            raise
+        self.host.busy = False
+        self.host.timeouts_in_row = 0
+        self._accept_name(reply)
+
+    def _accept_name(self, reply: bytes):
+        kind = reply[0]
+        if kind == _REPLY_ERROR:
+            raise DriverProcessError(reply[1:].decode("utf-8", "replace"))
+        self.name = reply[1:].decode("utf-8", "replace")
+        self._sent_cars = None
+
+    def _encode_turn(self, auto, world, targets, validity) -> bytes:
+        # Only cars whose immutable pos/vel objects changed since the last turn are sent.
+        changed = []
+        sent = self._sent_cars
+        for index in range(len(world.cars)):
+            car = world.cars[index]
+            state = (car.pos.x, car.pos.y, car.vel.x, car.vel.y)
+            if sent[index] != state:
+                sent[index] = state
+                changed.append(_CAR_STATE.pack(index, state[0], state[1], state[2], state[3]))
+
+        parts = [
+            _HEADER.pack(_MSG_TURN),
+            _TURN_HEAD.pack(world.race_round, getattr(auto, "penalty", 0), len(changed), len(targets))
+        ]
+        parts.extend(changed)
+        for target in targets:
+            parts.append(_PAIR.pack(target.x, target.y))
+        parts.append(bytes(1 if valid else 0 for valid in validity))
+        return b"".join(parts)
+
+
+def release_hosted_drivers(cars, pool: DriverHostPool = None):
+    # Call after a race; hosted drivers go back to the pool (or are stopped).
+    for car in cars:
+        if isinstance(car.driver, HostedDriver):
+            car.driver.close(pool)
+
+
+def _car_index(cars, car_id: int) -> int:
+    for index in range(len(cars)):
+        if cars[index].id == car_id:
+            return index
+    return -1
+
+
+def _encode_track(track: Track, random_seed: str = None) -> bytes:
+    finish = track.finish_line
+    parts = [
+        _HEADER.pack(_MSG_TRACK),
+        _TRACK_HEAD.pack(
+            track.width,
+            track.height,
+            finish.start.x,
+            finish.start.y,
+            finish.end.x,
+            finish.end.y,
+            len(track.start_vertices)
+        )
+    ]
+    for vertex in track.start_vertices:
+        parts.append(_PAIR.pack(vertex.x, vertex.y))
+    cells = bytearray(track.width * track.height)
+    for x in range(track.width):
+        column = track.road_mask[x]
+        for y in range(track.height):
+            if column[y]:
+                cells[x * track.height + y] = 1
+    parts.append(bytes(cells))
+    if random_seed is not None:
+        # Everything after the cells is the seed.
+        parts.append(random_seed.encode("utf-8"))
+    return b"".join(parts)
+
+
+def _encode_cars(cars, own_index: int) -> bytes:
+    parts = [_HEADER.pack(_MSG_CARS), _CARS_HEAD.pack(len(cars), own_index)]
+    for car in cars:
+        name = str(car.name).encode("utf-8")
+        parts.append(_CAR_NAME.pack(car.id, len(name)))
+        parts.append(name)
+    return b"".join(parts)
+
+
+def _decode_reply(reply: bytes):
+    kind = reply[0]
+    if kind == _REPLY_TARGET:
+        x, y = _PAIR.unpack_from(reply, 1)
+        return Vertex(x, y)
+    if kind == _REPLY_NONE:
+        return None
+    if kind == _REPLY_ERROR:
+        raise DriverProcessError(reply[1:].decode("utf-8", "replace"))
+    raise DriverProcessError("Unexpected reply from driver process.")
+
+
+# ----- child process side -----
+
+def _host_main(connection, scripts_folder: str, script_name: str, log_settings=None):
+    # Entry point of the child: import the script once, then serve requests forever.
+    # log_settings: the parent's setup_logging() arguments, so script logs honour
+    # --suppress-log, --log-level and --log-path like in-process drivers do.
+    from simulation.script_loader import load_scripts_from_folder, load_auto_class
+    from simulation.race_setup import find_script_info
+    from simulation.script_api import build_world_state, refresh_world_state
+
+    if log_settings is not None:
+        setup_logging(*log_settings)
+    else:
+        logging.basicConfig(level=logging.WARNING)
+    auto_class = None
+    load_error = None
+    try:
+        script_info = find_script_info(load_scripts_from_folder(scripts_folder), script_name)
+        if script_info is None:
+            load_error = "Controller '" + script_name + "' was not found."
+        else:
+            auto_class = load_auto_class(script_info)
+            if auto_class is None:
+                load_error = "Failed to load script '" + script_name + "'."
+    except Exception:
+        load_error = traceback.format_exc()
+
+    driver = None
+    game_state = None
+    world = None
+    own_car = None
+    logger = _LOGGER
+
+    while True:
+        try:
+            message = connection.recv_bytes()
+        except (EOFError, OSError):
+            return
+        kind = message[0]
+
+        if kind == _MSG_STOP:
+            return
+
+        if kind == _MSG_TRACK:
+            if load_error is not None:
+                connection.send_bytes(_HEADER.pack(_REPLY_ERROR) + load_error.encode("utf-8"))
+                continue
+            try:
+                track, random_seed = _decode_track(message)
+                if random_seed is not None:
+                    # This process runs only this script, so its `random` module is the
+                    # script's own too.
+                    random.seed(random_seed)
+                driver = auto_class(track)
+                if random_seed is not None:
+                    driver.random = random.Random(random_seed)
+                game_state = GameState(track=track, cars=[])
+                world = None
+                try:
+                    name = driver.GetName()
+                except Exception:
+                    name = script_name
+                connection.send_bytes(_HEADER.pack(_REPLY_NAME) + str(name).encode("utf-8"))
+            except Exception:
+                driver = None
+                connection.send_bytes(_HEADER.pack(_REPLY_ERROR) + traceback.format_exc().encode("utf-8"))
+            continue
+
+        if kind == _MSG_CARS:
+            cars, own_index = _decode_cars(message)
+            game_state.cars = cars
+            own_car = cars[own_index] if 0 <= own_index < len(cars) else None
+            if own_car is not None:
+                logger = logging.getLogger("racecars.car." + sanitize_logger_name(script_name) + ".id_" + str(own_car.id + 1))
+                own_car.logger = logger
+            if driver is not None:
+                driver.logger = logger
+            world = None
+            continue
+
+        if kind == _MSG_TURN:
+            try:
+                targets, validity = _apply_turn(message, game_state, own_car)
+                if world is None:
+                    world = build_world_state(game_state)
+                else:
+                    world = refresh_world_state(world, game_state)
+                target = driver.PickMove(own_car, world, targets, validity)
+                if target is None:
+                    connection.send_bytes(_HEADER.pack(_REPLY_NONE))
+                else:
+                    connection.send_bytes(_HEADER.pack(_REPLY_TARGET) + _PAIR.pack(int(target.x), int(target.y)))
+            except Exception:
+                connection.send_bytes(_HEADER.pack(_REPLY_ERROR) + traceback.format_exc().encode("utf-8"))
+            continue
+
+
+def _decode_track(message: bytes):
+    # Returns the track and the driver's random seed (None if none was sent).
+    width, height, fx0, fy0, fx1, fy1, start_count = _TRACK_HEAD.unpack_from(message, 1)
+    offset = 1 + _TRACK_HEAD.size
+    start_vertices = []
+    for _ in range(start_count):
+        x, y = _PAIR.unpack_from(message, offset)
+        offset += _PAIR.size
+        start_vertices.append(Vertex(x, y))
+    cells = message[offset:offset + width * height]
+    road_mask = []
+    for x in range(width):
+        column = cells[x * height:(x + 1) * height]
+        road_mask.append([value != 0 for value in column])
+    finish_line = Segment(Vertex(fx0, fy0), Vertex(fx1, fy1))
+    random_seed = None
+    if len(message) > offset + width * height:
+        random_seed = message[offset + width * height:].decode("utf-8")
+    return Track(width, height, road_mask, start_vertices, finish_line), random_seed
+
+
+def _decode_cars(message: bytes):
+    count, own_index = _CARS_HEAD.unpack_from(message, 1)
+    offset = 1 + _CARS_HEAD.size
+    cars = []
+    for _ in range(count):
+        car_id, name_length = _CAR_NAME.unpack_from(message, offset)
+        offset += _CAR_NAME.size
+        name = message[offset:offset + name_length].decode("utf-8", "replace")
+        offset += name_length
+        cars.append(Car(car_id, name, Vertex(0, 0)))
+    return cars, own_index
+
+
+def _apply_turn(message: bytes, game_state: GameState, own_car: Car):
+    race_round, penalty, changed_count, target_count = _TURN_HEAD.unpack_from(message, 1)
+    offset = 1 + _TURN_HEAD.size
+    game_state.race_round = race_round
+    cars = game_state.cars
+    for _ in range(changed_count):
+        index, pos_x, pos_y, vel_x, vel_y = _CAR_STATE.unpack_from(message, offset)
+        offset += _CAR_STATE.size
+        car = cars[index]
+        car.pos = Vertex(pos_x, pos_y)
+        car.vel = Vector2i(vel_x, vel_y)
+    if own_car is not None:
+        own_car.penalty = penalty
+
+    targets = []
+    for _ in range(target_count):
+        x, y = _PAIR.unpack_from(message, offset)
+        offset += _PAIR.size
+        targets.append(Vertex(x, y))
+    validity = [value != 0 for value in message[offset:offset + target_count]]
+    return targets, validity
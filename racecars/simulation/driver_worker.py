@@ -0,0 +1,86 @@
+"""Run driver PickMove() calls in a background thread with a time limit.
+
+The controller waits at most the move time budget for an answer. A driver that
+is still thinking after that is left running in its thread; its late answer is
+thrown away and the car gets no new question until that call has returned.
+Python threads cannot be killed, so this bounds turn latency, not CPU use.
+"""
+
+import logging
+import queue
+import threading
+
+_LOGGER = logging.getLogger("racecars.driver_worker")
+
+
+class MoveTimeout(Exception):
+    pass
+
+
+class DriverWorker:
+    def __init__(self, name: str):
+        # One worker per car, so a stuck driver never blocks another car's turn.
+        self.name = name
+        self.busy = False
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._thread = None
+        self._request_id = 0
+
+    def call(self, function, args, timeout: float):
+        # Returns function(*args), re-raises its exception, or raises MoveTimeout.
+        if self.busy:
+            # This turn's budget is spent waiting for the previous call, so that a slow
+            # driver can catch up without ever delaying the race by more than the limit.
+            self._wait_for_stale_result(timeout)
+            raise MoveTimeout("Previous PickMove() call was still running.")
+
+        self._ensure_thread()
+        self._request_id += 1
+        request_id = self._request_id
+        self.busy = True
+        self._requests.put((request_id, function, args))
+        try:
+            result_id, result, error = self._results.get(timeout=timeout)
+        except queue.Empty:
+            raise MoveTimeout("PickMove() did not return within " + str(timeout) + " s.")
+        self.busy = False
+        if result_id != request_id:
+            # Cannot happen while only one request is in flight; keep the engine safe anyway.
+            raise MoveTimeout("PickMove() answered an older request.")
+        if error is not None:
+            raise error
+        return result
+
+    def stop(self):
+        # The thread is a daemon; this only lets an idle one end cleanly.
+        if self._thread is not None:
+            self._requests.put(None)
+            self._thread = None
+
+    def _wait_for_stale_result(self, timeout: float):
+        try:
+            self._results.get(timeout=timeout)
+        except queue.Empty:
+            return
+        self.busy = False
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="racecars-driver-" + self.name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            request_id, function, args = request
+            try:
+                result = function(*args)
+                error = None
+            except Exception as ex:
+                result = None
+                error = ex
+            self._results.put((request_id, result, error))
@@ -0,0 +1,350 @@
+"""Reinforcement-learning style environments: reset(), step(), observations, action masks.
+
+A RaceEnv is one race in which a learning driver steers car 0 and scripts
+drive the other cars. The learner never goes through a script object, a
+WorldState or a worker thread: step() applies its action with TurnLogic, plays
+the other cars' turns (and the learner's own penalty turns) and stops at the
+learner's next decision.
+
+Actions index the fixed target order of get_ordered_targets_and_validity():
+action = (ax + 1) * 3 + (ay + 1), so 4 keeps the current velocity. The action
+mask marks the legal ones; an illegal action is still played and crashes like
+in a normal race.
+
+Observations are int32 vectors of OBSERVATION_HEAD + OTHER_CAR_SIZE values per
+other car:
+
+- own car: x, y, vx, vy, penalty, finish distance (Track.finish_distance_xy)
+- the finish distance after each of the 9 actions, -1 for illegal ones
+- every other car: x and y relative to the own car, vx, vy, penalty
+
+The reward is -1 for every turn of the own car, penalty turns included, so an
+episode returns minus the rounds the car needed to finish. info["won"] tells
+whether the car was among the winners.
+
+VectorRaceEnv runs many RaceEnvs side by side, keeps positions, velocities
+and penalties of all of them in NumPy arrays, builds the observations for all
+of them in one go and restarts finished races by itself.
+
+    env = VectorRaceEnv(params, 64, ["Teacher"], scripts)
+    observations = env.reset(range(1, 100001))
+    observations, rewards, dones, infos = env.step(policy(observations, env.action_masks))
+"""
+
+import logging
+from array import array
+from simulation.game_state import CAR_FIELDS
+from simulation.params import GameParams
+from simulation.controller import Controller
+from simulation.turn_logic import TurnLogic
+from simulation.move_generator import get_batch_targets_and_validity
+from simulation.headless import ensure_no_manual_drivers
+from simulation.race_random import RaceRandom
+from simulation.race_setup import build_track, create_cars_for_track, build_game_state
+from simulation.track_library import track_key
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is optional for RaceEnv (observations become array("i")); VectorRaceEnv needs it.
+    np = None
+
+_LOGGER = logging.getLogger("racecars.env")
+
+ACTION_COUNT = 9
+OWN_SIZE = 6
+OBSERVATION_HEAD = OWN_SIZE + ACTION_COUNT
+OTHER_CAR_SIZE = 5
+
+# The learner always drives car 0; start slots are shuffled anyway.
+_AGENT_CAR = 0
+
+# Tracks kept for later resets on the same seed; the oldest one is dropped first.
+_MAX_CACHED_TRACKS = 64
+
+
+class RaceEnv:
+    def __init__(
+        self,
+        params: GameParams,
+        opponents,
+        script_infos,
+        library=None,
+        max_rounds: int = 1000,
+        tracks: dict = None,
+        move_tables: dict = None
+    ):
+        # opponents: controller names of the other cars (scripts only).
+        # tracks and move_tables are caches that several environments may share.
+        self.params = params.clone()
+        self.params.players = 1 + len(opponents)
+        self.opponents = list(opponents)
+        self.script_infos = script_infos
+        self.library = library
+        self.max_rounds = max_rounds
+        self.tracks = tracks if tracks is not None else {}
+        self.move_tables = move_tables if move_tables is not None else {}
+        self.game_state = None
+        self.controller = None
+        self.done = True
+        self._targets = None
+        self._validity = [False] * ACTION_COUNT
+        self._target_distances = [-1] * ACTION_COUNT
+
+    @property
+    def observation_size(self) -> int:
+        return OBSERVATION_HEAD + OTHER_CAR_SIZE * len(self.opponents)
+
+    def reset(self, seed: int = None):
+        # Starts a new race on `seed` (None = random) and returns the first observation.
+        self._start(seed)
+        return self.observation()
+
+    def step(self, action: int):
+        # Returns (observation, reward, done, info).
+        reward, truncated = self._play(action)
+        return self.observation(), reward, self.done, self._info(truncated)
+
+    def action_mask(self):
+        if np is not None:
+            return np.array(self._validity, dtype=bool)
+        return list(self._validity)
+
+    def observation(self):
+        values = self._observation_values()
+        if np is not None:
+            return np.array(values, dtype=np.int32)
+        return array("i", values)
+
+    def close(self):
+        if self.controller is not None:
+            self.controller.close()
+            self.controller = None
+
+    def _start(self, seed):
+        self.close()
+        params = self.params.clone()
+        params.seed = seed
+        race_random = RaceRandom(seed)
+        track = self._track_for(params, race_random)
+        controllers = ["mouse"] + self.opponents
+        cars = create_cars_for_track(track, params.players, controllers, self.script_infos, None, race_random)
+        # The learner moves this car through step(); nobody may ask it for a move.
+        cars[_AGENT_CAR].driver = None
+        game_state = build_game_state(params, track, cars, race_random)
+        ensure_no_manual_drivers(game_state)
+        self.game_state = game_state
+        self.controller = Controller(game_state)
+        self.done = False
+        truncated = self._advance()[1]
+        self.done = game_state.finished or truncated
+
+    def _play(self, action: int):
+        # Applies the learner's action and plays on to its next decision.
+        # Returns (reward, truncated).
+        if self.done:
+            raise RuntimeError("The race is over; call reset() first.")
+        if action < 0 or action >= len(self._targets):
+            raise ValueError("Action %s is out of range 0..%s." % (action, len(self._targets) - 1))
+        TurnLogic.apply_move(self.game_state, _AGENT_CAR, self._targets[action])
+        turns, truncated = self._advance()
+        self.done = self.game_state.finished or truncated
+        return -(turns + 1), truncated
+
+    def _advance(self):
+        # Plays the other cars and the learner's penalty turns until the learner has to
+        # choose. Returns (own turns played, truncated).
+        game_state = self.game_state
+        turns = 0
+        while not game_state.finished:
+            if self.max_rounds is not None and game_state.race_round > self.max_rounds:
+                self._clear_targets()
+                return turns, True
+            car_id = game_state.current_player_idx
+            car = game_state.cars[car_id]
+            if car_id != _AGENT_CAR:
+                targets, validity = get_batch_targets_and_validity([game_state], self.move_tables)[0]
+                self.controller.play_turn(targets, validity)
+            elif car.penalty > 0:
+                TurnLogic.apply_move(game_state, car_id, car.pos)
+                turns += 1
+            else:
+                self._set_targets()
+                return turns, False
+        self._clear_targets()
+        return turns, False
+
+    def _set_targets(self):
+        targets, validity = get_batch_targets_and_validity([self.game_state], self.move_tables)[0]
+        track = self.game_state.track
+        distances = []
+        for index in range(len(targets)):
+            if validity[index]:
+                distances.append(track.finish_distance_xy(targets[index].x, targets[index].y))
+            else:
+                distances.append(-1)
+        self._targets = targets
+        self._validity = validity
+        self._target_distances = distances
+
+    def _clear_targets(self):
+        self._targets = None
+        self._validity = [False] * ACTION_COUNT
+        self._target_distances = [-1] * ACTION_COUNT
+
+    def _observation_values(self):
+        cars = self.game_state.cars
+        own = cars[_AGENT_CAR]
+        values = [
+            own.pos.x,
+            own.pos.y,
+            own.vel.x,
+            own.vel.y,
+            own.penalty,
+            self.game_state.track.finish_distance_xy(own.pos.x, own.pos.y)
+        ]
+        values.extend(self._target_distances)
+        for car in cars:
+            if car.id != _AGENT_CAR:
+                values.extend((car.pos.x - own.pos.x, car.pos.y - own.pos.y, car.vel.x, car.vel.y, car.penalty))
+        return values
+
+    def _info(self, truncated: bool) -> dict:
+        game_state = self.game_state
+        return {
+            "round": game_state.race_round,
+            "winners": list(game_state.winners),
+            "won": _AGENT_CAR in game_state.winners,
+            "truncated": truncated
+        }
+
+    def _track_for(self, params: GameParams, race_random: RaceRandom):
+        # Races on one seed share the Track (and so its tables and its MoveTable).
+        key = track_key(params)
+        track = self.tracks.get(key) if key is not None else None
+        if track is not None:
+            return track
+        track = build_track(params, self.library, race_random)
+        if key is not None:
+            if len(self.tracks) >= _MAX_CACHED_TRACKS:
+                oldest = next(iter(self.tracks))
+                self.move_tables.pop(self.tracks.pop(oldest), None)
+            self.tracks[key] = track
+        return track
+
+
+class VectorRaceEnv:
+    def __init__(
+        self,
+        params: GameParams,
+        count: int,
+        opponents,
+        script_infos,
+        library=None,
+        max_rounds: int = 1000
+    ):
+        if np is None:
+            raise RuntimeError("VectorRaceEnv needs NumPy.")
+        self.tracks = {}
+        self.move_tables = {}
+        self.envs = []
+        for _ in range(count):
+            self.envs.append(RaceEnv(params, opponents, script_infos, library, max_rounds, self.tracks, self.move_tables))
+        players = 1 + len(opponents)
+        self.positions = np.zeros((count, players, 2), dtype=np.int32)
+        self.velocities = np.zeros((count, players, 2), dtype=np.int32)
+        self.penalties = np.zeros((count, players), dtype=np.int32)
+        self.finish_distances = np.zeros(count, dtype=np.int32)
+        self.target_distances = np.full((count, ACTION_COUNT), -1, dtype=np.int32)
+        self.action_masks = np.zeros((count, ACTION_COUNT), dtype=bool)
+        self._seeds = iter(())
+
+    def __len__(self):
+        return len(self.envs)
+
+    @property
+    def observation_size(self) -> int:
+        return self.envs[0].observation_size
+
+    def reset(self, seeds=None):
+        # seeds: iterable of race seeds, used in order by this reset and then by every
+        # automatic restart; once it runs out, races get random seeds.
+        self._seeds = iter(seeds) if seeds is not None else iter(())
+        for env in self.envs:
+            env._start(self._next_seed())
+        self._gather()
+        return self.observations()
+
+    def step(self, actions):
+        # actions: one action index per environment. Returns (observations, rewards,
+        # dones, infos); a finished race is restarted at once, its last observation is
+        # info["final_observation"].
+        count = len(self.envs)
+        rewards = np.zeros(count, dtype=np.int32)
+        dones = np.zeros(count, dtype=bool)
+        infos = []
+        for index in range(count):
+            env = self.envs[index]
+            reward, truncated = env._play(int(actions[index]))
+            rewards[index] = reward
+            info = env._info(truncated)
+            if env.done:
+                dones[index] = True
+                info["final_observation"] = env.observation()
+                env._start(self._next_seed())
+            infos.append(info)
+        self._gather()
+        return self.observations(), rewards, dones, infos
+
+    def observations(self):
+        # (count, observation_size) int32, same layout as RaceEnv.observation().
+        count = len(self.envs)
+        own_positions = self.positions[:, _AGENT_CAR]
+        head = np.concatenate(
+            (
+                own_positions,
+                self.velocities[:, _AGENT_CAR],
+                self.penalties[:, _AGENT_CAR, None],
+                self.finish_distances[:, None],
+                self.target_distances
+            ),
+            axis=1
+        )
+        others = np.concatenate(
+            (
+                self.positions[:, 1:] - own_positions[:, None],
+                self.velocities[:, 1:],
+                self.penalties[:, 1:, None]
+            ),
+            axis=2
+        )
+        return np.concatenate((head, others.reshape(count, -1)), axis=1)
+
+    def close(self):
+        for env in self.envs:
+            env.close()
+
+    def _next_seed(self):
+        return next(self._seeds, None)
+
+    def _gather(self):
+        # Every race keeps its cars in one flat CarStore buffer (field rows, see
+        # CAR_FIELDS), so one conversion reads all of them.
+        stores = []
+        own = []
+        targets = []
+        masks = []
+        for env in self.envs:
+            game_state = env.game_state
+            stores.append(game_state.car_store.data)
+            pos = game_state.cars[_AGENT_CAR].pos
+            own.append(game_state.track.finish_distance_xy(pos.x, pos.y))
+            targets.append(env._target_distances)
+            masks.append(env._validity)
+        state = np.array(stores, dtype=np.int32).reshape(len(self.envs), len(CAR_FIELDS), -1)
+        self.positions[:] = state[:, 0:2].transpose(0, 2, 1)
+        self.velocities[:] = state[:, 2:4].transpose(0, 2, 1)
+        self.penalties[:] = state[:, 4]
+        self.finish_distances[:] = own
+        self.target_distances[:] = targets
+        self.action_masks[:] = masks
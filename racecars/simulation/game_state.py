@@ -3,22 +3,62 @@
 The rest of the project reads and updates these classes while playing turns.
 """
 
+from array import array
+from collections import OrderedDict
 from typing import List, Tuple
 import logging
 import random
+from simulation.race_random import RaceRandom
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is optional; without it the grid tables are built with plain loops.
+    np = None
 
 _LOGGER = logging.getLogger("racecars.game_state")
 
+# Upper bound of remembered segment_is_valid() answers per track (LRU eviction).
+_SEGMENT_CACHE_SIZE = 65536
+
+
+# Vector2i values with both coordinates in -_SMALL_VECTOR_LIMIT.._SMALL_VECTOR_LIMIT
+# (velocities, accelerations) are interned: Vector2i(1, -2) always returns one shared object.
+_SMALL_VECTOR_LIMIT = 16
+_SMALL_VECTOR_SPAN = 2 * _SMALL_VECTOR_LIMIT + 1
+_small_vectors = []
+_set_attribute = object.__setattr__
+
 
 class Vector2i:
-    def __init__(self, x: int = 0, y: int = 0):
-        self.x = int(x)
-        self.y = int(y)
+    # Immutable integer pair. Hashable, so vectors and vertices can key dicts and sets.
+    __slots__ = ("x", "y")
+
+    def __new__(cls, x: int = 0, y: int = 0):
+        x = int(x)
+        y = int(y)
+        if cls is Vector2i and _small_vectors:
+            if -_SMALL_VECTOR_LIMIT <= x <= _SMALL_VECTOR_LIMIT and -_SMALL_VECTOR_LIMIT <= y <= _SMALL_VECTOR_LIMIT:
+                return _small_vectors[(x + _SMALL_VECTOR_LIMIT) * _SMALL_VECTOR_SPAN + y + _SMALL_VECTOR_LIMIT]
+        self = object.__new__(cls)
+        _set_attribute(self, "x", x)
+        _set_attribute(self, "y", y)
+        return self
+
+    def __setattr__(self, name, value):
+        raise AttributeError(type(self).__name__ + " is immutable; create a new one instead.")
+
+    def __delattr__(self, name):
+        raise AttributeError(type(self).__name__ + " is immutable; create a new one instead.")
+
+    def __reduce__(self):
+        # Needed for pickling (process pools) because __setattr__ is blocked.
+        return (self.__class__, (self.x, self.y))
 
     def __add__(self, other):
         if not isinstance(other, Vector2i):
             return NotImplemented
-        if isinstance(self, Vertex) or isinstance(other, Vertex):
+        if other.__class__ is Vertex:
             return Vertex(self.x + other.x, self.y + other.y)
         return Vector2i(self.x + other.x, self.y + other.y)
 
@@ -40,13 +80,32 @@ class Vector2i:
             return NotImplemented
         return self.x == other.x and self.y == other.y
 
+    def __hash__(self):
+        # Vector2i(1, 2) == Vertex(1, 2), so both must hash the same.
+        return hash((self.x, self.y))
+
     def __repr__(self):
         return f"Vector2i(x={self.x}, y={self.y})"
 
 class Vertex(Vector2i):
+    __slots__ = ()
+
+    def __add__(self, other):
+        # A position moved by anything is still a position.
+        if not isinstance(other, Vector2i):
+            return NotImplemented
+        return Vertex(self.x + other.x, self.y + other.y)
+
     def __repr__(self):
         return f"Vertex(x={self.x}, y={self.y})"
 
+# Filled in one go: Vector2i() only starts returning interned objects once the table is complete.
+_small_vectors.extend([
+    Vector2i(x, y)
+    for x in range(-_SMALL_VECTOR_LIMIT, _SMALL_VECTOR_LIMIT + 1)
+    for y in range(-_SMALL_VECTOR_LIMIT, _SMALL_VECTOR_LIMIT + 1)
+])
+
 class Segment:
     def __init__(self, start: Vertex, end: Vertex):
         self.start = start
@@ -55,23 +114,234 @@ class Segment:
     def __repr__(self):
         return f"Segment(start={self.start}, end={self.end})"
 
+# Field rows of a CarStore, in this order.
+CAR_FIELDS = ("pos_x", "pos_y", "vel_x", "vel_y", "penalty", "finished")
+_POS_X, _POS_Y, _VEL_X, _VEL_Y, _PENALTY, _FINISHED = range(len(CAR_FIELDS))
+_FIELD_COUNT = len(CAR_FIELDS)
+_SEGMENT_INTS = 4
+
+
+class CarPath:
+    # A car's driven segments as x0, y0, x1, y1 ints in one growable array.
+    # Reads like a list of Segments; only slices can be deleted (checkpoint rewinds).
+    __slots__ = ("data",)
+
+    def __init__(self, segments=()):
+        self.data = array("i")
+        for segment in segments:
+            self.append(segment)
+
+    def __len__(self):
+        return len(self.data) // _SEGMENT_INTS
+
+    def __iter__(self):
+        data = self.data
+        for offset in range(0, len(data), _SEGMENT_INTS):
+            yield Segment(Vertex(data[offset], data[offset + 1]), Vertex(data[offset + 2], data[offset + 3]))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            segments = []
+            for item in range(*index.indices(len(self))):
+                segments.append(self[item])
+            return segments
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("path index out of range")
+        offset = index * _SEGMENT_INTS
+        data = self.data
+        return Segment(Vertex(data[offset], data[offset + 1]), Vertex(data[offset + 2], data[offset + 3]))
+
+    def __delitem__(self, index):
+        if not isinstance(index, slice) or index.step not in (None, 1):
+            raise TypeError("CarPath only supports deleting a contiguous slice.")
+        start, stop, _ = index.indices(len(self))
+        if start < stop:
+            del self.data[start * _SEGMENT_INTS:stop * _SEGMENT_INTS]
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def append(self, segment: Segment):
+        self.data.extend((segment.start.x, segment.start.y, segment.end.x, segment.end.y))
+
+    def append_xy(self, x0: int, y0: int, x1: int, y1: int):
+        self.data.extend((x0, y0, x1, y1))
+
+    def copy(self):
+        path = CarPath()
+        path.data = array("i", self.data)
+        return path
+
+
+class CarStore:
+    def __init__(self, count: int):
+        # Position, velocity, penalty and finish flag of every car of a race, stored field
+        # by field: data[field * count + slot]. Cars are views on one slot each.
+        self.count = count
+        self.data = array("i", [0]) * (_FIELD_COUNT * count)
+        self.paths = [CarPath() for _ in range(count)]
+        self.cars = [None] * count
+        self._arrays = None
+
+    @classmethod
+    def adopt(cls, cars):
+        # Moves the values and paths of `cars` into one new store, slot = list index.
+        # A car lives in one store at a time: a store it was moved out of no longer
+        # sees its changes.
+        store = cls(len(cars))
+        for slot in range(len(cars)):
+            cars[slot]._move_to(store, slot)
+        return store
+
+    @property
+    def arrays(self):
+        # (len(CAR_FIELDS), count) NumPy int view sharing memory with the store, or None
+        # without NumPy. After writing through it, call reload_cars().
+        if np is None:
+            return None
+        if self._arrays is None:
+            self._arrays = np.frombuffer(self.data, dtype=np.intc).reshape(_FIELD_COUNT, self.count)
+        return self._arrays
+
+    def field(self, name: str):
+        # Copy of one field row as an array("i"), slot order.
+        row = CAR_FIELDS.index(name) * self.count
+        return self.data[row:row + self.count]
+
+    def occupied(self, except_slot: int = None) -> set:
+        # (x, y) of every car but `except_slot`.
+        count = self.count
+        data = self.data
+        occupied = set()
+        for slot in range(count):
+            if slot != except_slot:
+                occupied.add((data[slot], data[count + slot]))
+        return occupied
+
+    def is_occupied(self, x: int, y: int, except_slot: int = None) -> bool:
+        count = self.count
+        data = self.data
+        for slot in range(count):
+            if slot != except_slot and data[slot] == x and data[count + slot] == y:
+                return True
+        return False
+
+    def slots_reaching(self, x_min: int, y_min: int, x_max: int, y_max: int) -> List[int]:
+        # Slots whose next move (pos to pos + vel) has its bounding box touching the given
+        # box; the cheap first filter for finish-line checks.
+        count = self.count
+        arrays = self.arrays
+        if arrays is not None:
+            next_x = arrays[_POS_X] + arrays[_VEL_X]
+            next_y = arrays[_POS_Y] + arrays[_VEL_Y]
+            near = (
+                (np.minimum(arrays[_POS_X], next_x) <= x_max)
+                & (np.maximum(arrays[_POS_X], next_x) >= x_min)
+                & (np.minimum(arrays[_POS_Y], next_y) <= y_max)
+                & (np.maximum(arrays[_POS_Y], next_y) >= y_min)
+            )
+            return np.flatnonzero(near).tolist()
+        data = self.data
+        slots = []
+        for slot in range(count):
+            x0 = data[_POS_X * count + slot]
+            y0 = data[_POS_Y * count + slot]
+            x1 = x0 + data[_VEL_X * count + slot]
+            y1 = y0 + data[_VEL_Y * count + slot]
+            if min(x0, x1) <= x_max and max(x0, x1) >= x_min and min(y0, y1) <= y_max and max(y0, y1) >= y_min:
+                slots.append(slot)
+        return slots
+
+    def capture(self):
+        # Everything about the cars that a turn can change; paths only grow, so their
+        # lengths are enough.
+        lengths = []
+        for path in self.paths:
+            lengths.append(len(path))
+        return (self.data.tobytes(), tuple(lengths))
+
+    def restore(self, state):
+        data, lengths = state
+        self.data[:] = array("i", data)
+        for slot in range(self.count):
+            del self.paths[slot][lengths[slot]:]
+        self.reload_cars()
+
+    def reload_cars(self):
+        # Cars hand out the Vertex/Vector2i objects they were last given; after the data
+        # was written directly they have to be rebuilt from it.
+        for car in self.cars:
+            if car is not None:
+                car._reload()
+
+
 class Car:
     def __init__(self, car_id: int, name: str, pos: Vertex, vel: Vector2i = Vector2i(0, 0), driver = None, logger: logging.Logger = _LOGGER):
         # One Car object stores everything needed to replay and score a single driver.
+        # pos, vel, penalty, finished and path live in a CarStore: a car of its own until
+        # a GameState moves all its cars into one store.
         self.id = car_id
         self.name = name
-        self.pos = pos
-        self.vel = vel  # Velocity vector
-        self.penalty = 0  # Number of penalty turns remaining
-        self.path: List[Segment] = []  # Path history for replay/logging
-        self.trail: List[Tuple[int, int]] = []  # Initialize trail as an empty list
         self.driver = driver
         self.logger = logger
         self._missing_driver_warning_emitted = False
+        self._attach(CarStore(1), 0)
+        self.pos = pos
+        self.vel = vel  # Velocity vector
 
     def __repr__(self):
         return f"Car(id={self.id}, name={self.name}, pos={self.pos}, vel={self.vel}, penalty={self.penalty})"
 
+    @property
+    def pos(self) -> Vertex:
+        # The object last assigned; the store holds the same values.
+        return self._pos
+
+    @pos.setter
+    def pos(self, pos: Vertex):
+        self._data[self._pos_x] = pos.x
+        self._data[self._pos_y] = pos.y
+        self._pos = pos
+
+    @property
+    def vel(self) -> Vector2i:
+        return self._vel
+
+    @vel.setter
+    def vel(self, vel: Vector2i):
+        self._data[self._vel_x] = vel.x
+        self._data[self._vel_y] = vel.y
+        self._vel = vel
+
+    @property
+    def penalty(self) -> int:
+        # Number of penalty turns remaining
+        return self._data[self._penalty]
+
+    @penalty.setter
+    def penalty(self, penalty: int):
+        self._data[self._penalty] = penalty
+
+    @property
+    def finished(self) -> bool:
+        # Crossed the finish line with a valid move.
+        return self._data[self._finished] != 0
+
+    @finished.setter
+    def finished(self, finished: bool):
+        self._data[self._finished] = 1 if finished else 0
+
+    @property
+    def path(self) -> CarPath:
+        # Path history for replay/logging
+        return self._store.paths[self._slot]
+
+    @path.setter
+    def path(self, segments):
+        self._store.paths[self._slot] = CarPath(segments)
+
     def deleteSetDriver(self, driver):
         self.driver = driver
         self._missing_driver_warning_emitted = False
@@ -89,9 +359,46 @@ class Car:
         # Forward car instance, world, ordered targets and validity flags to driver
         return self.driver.PickMove(self, world, targets, validity)
 
+    def _attach(self, store: CarStore, slot: int):
+        # Flat indices of this car's fields, so the properties skip the arithmetic.
+        count = store.count
+        self._store = store
+        self._slot = slot
+        self._data = store.data
+        self._pos_x = _POS_X * count + slot
+        self._pos_y = _POS_Y * count + slot
+        self._vel_x = _VEL_X * count + slot
+        self._vel_y = _VEL_Y * count + slot
+        self._penalty = _PENALTY * count + slot
+        self._finished = _FINISHED * count + slot
+        store.cars[slot] = self
+
+    def _reload(self):
+        data = self._data
+        self._pos = Vertex(data[self._pos_x], data[self._pos_y])
+        self._vel = Vector2i(data[self._vel_x], data[self._vel_y])
+
+    def _move_to(self, store: CarStore, slot: int):
+        old_store = self._store
+        old_slot = self._slot
+        count = old_store.count
+        for field in range(_FIELD_COUNT):
+            store.data[field * store.count + slot] = old_store.data[field * count + old_slot]
+        store.paths[slot] = old_store.paths[old_slot]
+        self._attach(store, slot)
+
 class Track:
     def __init__(self, width: int, height: int, road_mask: List[List[bool]], start_vertices: List[Vertex], finish_line: Segment):
         # The track is a grid plus start/finish metadata used by movement validation.
+        # road_mask may be a list of column lists or a 2D NumPy bool array, indexed [x][y].
+        self._segment_cache = OrderedDict()
+        self._cells = None
+        self._inside = None
+        self._road_array = None
+        self._inside_array = None
+        self._inside_distances = None
+        self._finish_distances = None
+        self._finish_view = None
         self.width = width
         self.height = height
         self.road_mask = road_mask  # Binary mask indicating road cells
@@ -104,105 +411,270 @@ class Track:
         else:
             self.start_line = None
 
-    def segment_is_valid(self, p0: Vertex, p1: Vertex) -> bool:
-        # We validate a move by sampling every interval between grid-line crossings.
-        # If any sampled interval is off-road, the whole move is invalid.
-        dx = p1.x - p0.x
-        dy = p1.y - p0.y
-        if dx == 0 and dy == 0:
-            return self._point_has_road(p0.x, p0.y)
-
-        t_values = self._collect_t_values(p0, p1)
+    @property
+    def road_mask(self) -> List[List[bool]]:
+        return self._road_mask
+
+    @road_mask.setter
+    def road_mask(self, road_mask: List[List[bool]]):
+        self._road_mask = road_mask
+        self.invalidate_caches()
+
+    def invalidate_caches(self):
+        # Assigning a new road_mask does this automatically.
+        # Code that edits road_mask (or width/height) in place must call it itself.
+        self._segment_cache.clear()
+        self._cells = None
+        self._inside = None
+        self._road_array = None
+        self._inside_array = None
+        self._inside_distances = None
+        self._finish_distances = None
+        self._finish_view = None
+
+    @property
+    def road_array(self):
+        # Read-only (width, height) NumPy bool array of road cells, or None without NumPy.
+        if self._cells is None:
+            self._build_grid_tables()
+        return self._road_array
+
+    @property
+    def inside_array(self):
+        # Read-only (width + 1, height + 1) NumPy bool array: vertex touches a road cell.
+        if self._cells is None:
+            self._build_grid_tables()
+        return self._inside_array
 
-        if dx != 0:
-            if dx > 0:
-                for x in range(p0.x + 1, p1.x):
-                    t = (x - p0.x) / dx
-                    if t > 0 and t < 1:
-                        t_values.append(t)
-            else:
-                for x in range(p0.x - 1, p1.x, -1):
-                    t = (x - p0.x) / dx
-                    if t > 0 and t < 1:
-                        t_values.append(t)
-
-        if dy != 0:
-            if dy > 0:
-                for y in range(p0.y + 1, p1.y):
-                    t = (y - p0.y) / dy
-                    if t > 0 and t < 1:
-                        t_values.append(t)
-            else:
-                for y in range(p0.y - 1, p1.y, -1):
-                    t = (y - p0.y) / dy
-                    if t > 0 and t < 1:
-                        t_values.append(t)
-
-        return self._segment_intervals_are_on_road(p0, p1, t_values)
+    def segment_is_valid(self, p0: Vertex, p1: Vertex) -> bool:
+        return self.segment_is_valid_xy(p0.x, p0.y, p1.x, p1.y)
+
+    def segment_is_valid_xy(self, x0: int, y0: int, x1: int, y1: int) -> bool:
+        # The same few segments are asked about many times per turn (move generation,
+        # renderer previews, drivers), so answers are memoized per (p0, p1).
+        key = (x0, y0, x1, y1)
+        cache = self._segment_cache
+        valid = cache.get(key)
+        if valid is not None:
+            cache.move_to_end(key)
+            return valid
+
+        # Every cell the segment passes through must be road (touching a road edge is fine).
+        valid = self._first_off_road_t(x0, y0, x1, y1) is None
+        cache[key] = valid
+        if len(cache) > _SEGMENT_CACHE_SIZE:
+            cache.popitem(last=False)
+        return valid
 
     def first_invalid_point_on_segment(self, p0: Vertex, p1: Vertex):
         # Used after crashes to find roughly where the car left the track.
+        t_exit = self._first_off_road_t(p0.x, p0.y, p1.x, p1.y)
+        if t_exit is None:
+            return None
         dx = p1.x - p0.x
         dy = p1.y - p0.y
         if dx == 0 and dy == 0:
-            if self._point_has_road(p0.x, p0.y):
-                return None
             return (float(p0.x), float(p0.y))
-
-        t_values = self._collect_t_values(p0, p1)
-        t_values.sort()
-
-        epsilon = 0.0000001
-        for index in range(len(t_values) - 1):
-            t0 = t_values[index]
-            t1 = t_values[index + 1]
-            if t1 - t0 > epsilon:
-                t_mid = (t0 + t1) * 0.5
-                x_mid = p0.x + dx * t_mid
-                y_mid = p0.y + dy * t_mid
-                if not self._sample_point_is_on_road(x_mid, y_mid):
-                    x_exit = p0.x + dx * t0
-                    y_exit = p0.y + dy * t0
-                    return (x_exit, y_exit)
-
-        return None
+        x_exit = p0.x + dx * t_exit
+        y_exit = p0.y + dy * t_exit
+        return (x_exit, y_exit)
 
     def finish_vertex_for_segment(self, p0: Vertex, p1: Vertex):
-        point = self._finish_intersection_point(p0, p1)
+        point = self.finish_point_for_segment_xy(p0.x, p0.y, p1.x, p1.y)
         if point is None:
             return None
-        return self._finish_vertex_from_point(point[0], point[1])
+        return Vertex(point[0], point[1])
 
-    def nearest_inside_vertex(self, point: Vertex) -> Vertex:
-        return self.nearest_inside_vertex_from_point(float(point.x), float(point.y))
+    def finish_point_for_segment_xy(self, x0: int, y0: int, x1: int, y1: int):
+        # Same as finish_vertex_for_segment, but with plain coordinates in and out.
+        point = self._finish_intersection_point(x0, y0, x1, y1)
+        if point is None:
+            return None
+        return self._finish_point_from_intersection(point[0], point[1])
+
+    def nearest_inside_vertex(self, point: Vertex, rng: random.Random = None) -> Vertex:
+        return self.nearest_inside_vertex_from_point(float(point.x), float(point.y), rng)
 
-    def nearest_inside_vertex_from_point(self, x: float, y: float) -> Vertex:
+    def nearest_inside_vertex_from_point(self, x: float, y: float, rng: random.Random = None) -> Vertex:
         # After a crash we "snap" the car back to the nearest legal vertex.
-        min_dist_sq = None
-        candidates: List[Vertex] = []
+        # Instead of scanning the whole grid we search square rings around the point,
+        # starting at the ring where the precomputed distance index says the first
+        # inside vertex is, and stop once no farther ring can be as close.
+        width = self.width
+        height = self.height
+        if width < 0 or height < 0:
+            return Vertex(int(round(x)), int(round(y)))
+
+        distances = self._inside_distance_table()
+        center_x = self._clamp_int(int(round(x)), 0, width)
+        center_y = self._clamp_int(int(round(y)), 0, height)
+        first_ring = distances[center_x * (height + 1) + center_y]
+        if first_ring < 0:
+            return Vertex(int(round(x)), int(round(y)))
 
-        for vertex_x in range(self.width + 1):
-            for vertex_y in range(self.height + 1):
+        min_dist_sq = None
+        candidates: List[Tuple[int, int]] = []
+        last_ring = width
+        if height > last_ring:
+            last_ring = height
+
+        ring = first_ring
+        while ring <= last_ring:
+            if min_dist_sq is not None:
+                # Every vertex on this ring is at least ring - 0.5 away from (x, y).
+                ring_min = ring - 0.5
+                if ring_min > 0 and ring_min * ring_min > min_dist_sq:
+                    break
+            for vertex_x, vertex_y in self._ring_vertices(center_x, center_y, ring):
                 if self._vertex_is_inside(vertex_x, vertex_y):
                     dx = vertex_x - x
                     dy = vertex_y - y
                     dist_sq = dx * dx + dy * dy
                     if min_dist_sq is None or dist_sq < min_dist_sq:
                         min_dist_sq = dist_sq
-                        candidates = [Vertex(vertex_x, vertex_y)]
+                        candidates = [(vertex_x, vertex_y)]
                     elif dist_sq == min_dist_sq:
-                        candidates.append(Vertex(vertex_x, vertex_y))
-
-        if candidates:
-            index = random.randint(0, len(candidates) - 1)
-            return candidates[index]
-
-        return Vertex(int(round(x)), int(round(y)))
+                        candidates.append((vertex_x, vertex_y))
+            ring += 1
+
+        # Same candidate order as a full x-then-y grid scan, so ties are broken uniformly
+        # at random exactly as before. Races pass their crash stream as `rng`.
+        candidates.sort()
+        if rng is None:
+            rng = random
+        index = rng.randint(0, len(candidates) - 1)
+        return Vertex(candidates[index][0], candidates[index][1])
+
+    def _ring_vertices(self, center_x: int, center_y: int, ring: int):
+        # Vertices at Chebyshev distance `ring` from the center, clipped to the grid.
+        if ring == 0:
+            yield (center_x, center_y)
+            return
+        low_x = center_x - ring
+        high_x = center_x + ring
+        low_y = center_y - ring
+        high_y = center_y + ring
+        x_from = low_x if low_x > 0 else 0
+        x_to = high_x if high_x < self.width else self.width
+        y_from = low_y + 1 if low_y + 1 > 0 else 0
+        y_to = high_y - 1 if high_y - 1 < self.height else self.height
+        if low_y >= 0:
+            for vertex_x in range(x_from, x_to + 1):
+                yield (vertex_x, low_y)
+        if high_y <= self.height:
+            for vertex_x in range(x_from, x_to + 1):
+                yield (vertex_x, high_y)
+        if low_x >= 0:
+            for vertex_y in range(y_from, y_to + 1):
+                yield (low_x, vertex_y)
+        if high_x <= self.width:
+            for vertex_y in range(y_from, y_to + 1):
+                yield (high_x, vertex_y)
+
+    def _inside_distance_table(self):
+        # Chebyshev distance from every vertex to the nearest inside vertex (-1 if the
+        # track has none). Built once per track with a multi-source BFS over 8 neighbours.
+        distances = self._inside_distances
+        if distances is not None:
+            return distances
+
+        if self._inside is None:
+            self._build_grid_tables()
+        inside = self._inside
+        column_size = self.height + 1
+        vertex_count = (self.width + 1) * column_size
+        distances = array("i", [-1]) * vertex_count
+        queue = []
+        for index in range(vertex_count):
+            if inside[index]:
+                distances[index] = 0
+                queue.append(index)
+
+        for index in queue:
+            vertex_x, vertex_y = divmod(index, column_size)
+            next_distance = distances[index] + 1
+            for nx in range(vertex_x - 1, vertex_x + 2):
+                if nx < 0 or nx > self.width:
+                    continue
+                for ny in range(vertex_y - 1, vertex_y + 2):
+                    if ny < 0 or ny > self.height:
+                        continue
+                    neighbor = nx * column_size + ny
+                    if distances[neighbor] < 0:
+                        distances[neighbor] = next_distance
+                        queue.append(neighbor)
+
+        self._inside_distances = distances
+        return distances
+
+    def finish_distance_xy(self, x: int, y: int) -> int:
+        # Fewest 8-neighbour steps over inside vertices from (x, y) to the finish line,
+        # or -1 if the vertex is outside or cut off. A valid move of speed s (the larger
+        # of |vx| and |vy|) never covers more than s of these steps, so planners can use
+        # it as a lower bound.
+        if x < 0 or x > self.width or y < 0 or y > self.height:
+            return -1
+        return self._finish_distance_table()[x * (self.height + 1) + y]
+
+    def finish_distances(self) -> memoryview:
+        # Read-only view of the whole field, vertex (x, y) at x * (height + 1) + y.
+        # Shared with every WorldState, so scripts get it without copying.
+        view = self._finish_view
+        if view is None:
+            view = memoryview(self._finish_distance_table()).toreadonly()
+            self._finish_view = view
+        return view
+
+    def _finish_distance_table(self):
+        # Multi-source BFS from the inside vertices of the finish line, built once per track.
+        distances = self._finish_distances
+        if distances is not None:
+            return distances
+
+        if self._inside is None:
+            self._build_grid_tables()
+        inside = self._inside
+        column_size = self.height + 1
+        distances = array("i", [-1]) * ((self.width + 1) * column_size)
+        queue = []
+        start = self.finish_line.start
+        end = self.finish_line.end
+        step_x = (end.x > start.x) - (end.x < start.x)
+        step_y = (end.y > start.y) - (end.y < start.y)
+        vertex_x = start.x
+        vertex_y = start.y
+        while True:
+            if self._vertex_is_inside(vertex_x, vertex_y):
+                index = vertex_x * column_size + vertex_y
+                if distances[index] < 0:
+                    distances[index] = 0
+                    queue.append(index)
+            if vertex_x == end.x and vertex_y == end.y:
+                break
+            vertex_x += step_x
+            vertex_y += step_y
+
+        for index in queue:
+            vertex_x, vertex_y = divmod(index, column_size)
+            next_distance = distances[index] + 1
+            for nx in range(vertex_x - 1, vertex_x + 2):
+                if nx < 0 or nx > self.width:
+                    continue
+                for ny in range(vertex_y - 1, vertex_y + 2):
+                    if ny < 0 or ny > self.height:
+                        continue
+                    neighbor = nx * column_size + ny
+                    if distances[neighbor] < 0 and inside[neighbor]:
+                        distances[neighbor] = next_distance
+                        queue.append(neighbor)
+
+        self._finish_distances = distances
+        return distances
 
     def segment_crosses_finish(self, p0: Vertex, p1: Vertex) -> bool:
-        return self._finish_intersection_point(p0, p1) is not None
+        return self._finish_intersection_point(p0.x, p0.y, p1.x, p1.y) is not None
 
-    def _finish_intersection_point(self, p0: Vertex, p1: Vertex):
+    def _finish_intersection_point(self, x0: int, y0: int, x1: int, y1: int):
         # Handles both vertical and horizontal finish lines.
         fx0 = self.finish_line.start.x
         fy0 = self.finish_line.start.y
@@ -210,37 +682,42 @@ class Track:
         fy1 = self.finish_line.end.y
 
         if fx0 == fx1:
-            if p0.x == p1.x:
-                if p0.x != fx0:
+            # Most segments are nowhere near the finish; reject them before dividing.
+            if (x0 < fx0 and x1 < fx0) or (x0 > fx0 and x1 > fx0):
+                return None
+            if x0 == x1:
+                if x0 != fx0:
                     return None
-                if not self._ranges_overlap(p0.y, p1.y, fy0, fy1):
+                if not self._ranges_overlap(y0, y1, fy0, fy1):
                     return None
-                return (float(p1.x), float(self._clamp_int(p1.y, fy0, fy1)))
+                return (float(x1), float(self._clamp_int(y1, fy0, fy1)))
 
-            t = (fx0 - p0.x) / (p1.x - p0.x)
+            t = (fx0 - x0) / (x1 - x0)
             if t < 0 or t > 1:
                 return None
-            y = p0.y + (p1.y - p0.y) * t
+            y = y0 + (y1 - y0) * t
             if not self._value_in_range(y, fy0, fy1):
                 return None
             return (float(fx0), float(y))
 
-        if p0.y == p1.y:
-            if p0.y != fy0:
+        if (y0 < fy0 and y1 < fy0) or (y0 > fy0 and y1 > fy0):
+            return None
+        if y0 == y1:
+            if y0 != fy0:
                 return None
-            if not self._ranges_overlap(p0.x, p1.x, fx0, fx1):
+            if not self._ranges_overlap(x0, x1, fx0, fx1):
                 return None
-            return (float(self._clamp_int(p1.x, fx0, fx1)), float(p1.y))
+            return (float(self._clamp_int(x1, fx0, fx1)), float(y1))
 
-        t = (fy0 - p0.y) / (p1.y - p0.y)
+        t = (fy0 - y0) / (y1 - y0)
         if t < 0 or t > 1:
             return None
-        x = p0.x + (p1.x - p0.x) * t
+        x = x0 + (x1 - x0) * t
         if not self._value_in_range(x, fx0, fx1):
             return None
         return (float(x), float(fy0))
 
-    def _finish_vertex_from_point(self, x: float, y: float) -> Vertex:
+    def _finish_point_from_intersection(self, x: float, y: float):
         fx0 = self.finish_line.start.x
         fy0 = self.finish_line.start.y
         fx1 = self.finish_line.end.x
@@ -249,108 +726,150 @@ class Track:
         if fx0 == fx1:
             vertex_y = int(round(y))
             vertex_y = self._clamp_int(vertex_y, fy0, fy1)
-            return Vertex(fx0, vertex_y)
+            return (fx0, vertex_y)
 
         vertex_x = int(round(x))
         vertex_x = self._clamp_int(vertex_x, fx0, fx1)
-        return Vertex(vertex_x, fy0)
+        return (vertex_x, fy0)
 
-    def _sample_point_is_on_road(self, x: float, y: float) -> bool:
-        # A point is considered road if any touching cell is road (boundary inclusive).
-        if x < 0 or y < 0 or x > self.width or y > self.height:
-            return False
-
-        epsilon = 0.000001
-        base_x = int(x)
-        base_y = int(y)
-
-        candidates_x: List[int] = []
-        candidates_y: List[int] = []
-
-        candidates_x.append(base_x)
-        if abs(x - round(x)) < epsilon:
-            candidates_x.append(base_x - 1)
-
-        candidates_y.append(base_y)
-        if abs(y - round(y)) < epsilon:
-            candidates_y.append(base_y - 1)
+    def _first_off_road_t(self, x0: int, y0: int, x1: int, y1: int):
+        # Walks the cells the segment passes through (Amanatides-Woo) with integers only.
+        # Returns None when the whole segment is on road, otherwise the parameter t
+        # (0..1) of the grid-line crossing where the first off-road stretch starts.
+        # A stretch lying on a grid line is on road if a cell on either side is road;
+        # passing exactly through a vertex does not touch the two diagonal cells.
+        dx = x1 - x0
+        dy = y1 - y0
 
-        for cx in candidates_x:
-            for cy in candidates_y:
-                if self._cell_is_road(cx, cy):
-                    return True
-
-        return False
-
-    def _collect_t_values(self, p0: Vertex, p1: Vertex) -> List[float]:
-        t_values: List[float] = []
-        t_values.append(0.0)
-        t_values.append(1.0)
+        if dx == 0 and dy == 0:
+            if self._vertex_is_inside(x0, y0):
+                return None
+            return 0.0
+
+        if dx == 0:
+            steps = abs(dy)
+            step_y = 1 if dy > 0 else -1
+            cell_y = y0 if dy > 0 else y0 - 1
+            for k in range(steps):
+                if not self._cell_is_road(x0 - 1, cell_y) and not self._cell_is_road(x0, cell_y):
+                    return k / steps
+                cell_y += step_y
+            return None
 
-        dx = p1.x - p0.x
-        dy = p1.y - p0.y
+        if dy == 0:
+            steps = abs(dx)
+            step_x = 1 if dx > 0 else -1
+            cell_x = x0 if dx > 0 else x0 - 1
+            for k in range(steps):
+                if not self._cell_is_road(cell_x, y0 - 1) and not self._cell_is_road(cell_x, y0):
+                    return k / steps
+                cell_x += step_x
+            return None
 
-        if dx != 0:
-            if dx > 0:
-                for x in range(p0.x + 1, p1.x):
-                    t = (x - p0.x) / dx
-                    if t > 0 and t < 1:
-                        t_values.append(t)
-            else:
-                for x in range(p0.x - 1, p1.x, -1):
-                    t = (x - p0.x) / dx
-                    if t > 0 and t < 1:
-                        t_values.append(t)
-
-        if dy != 0:
-            if dy > 0:
-                for y in range(p0.y + 1, p1.y):
-                    t = (y - p0.y) / dy
-                    if t > 0 and t < 1:
-                        t_values.append(t)
+        adx = abs(dx)
+        ady = abs(dy)
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        cell_x = x0 if dx > 0 else x0 - 1
+        cell_y = y0 if dy > 0 else y0 - 1
+
+        # crossed_x/crossed_y count grid lines already crossed. The next vertical line is
+        # at t = (crossed_x + 1) / adx and the next horizontal one at (crossed_y + 1) / ady,
+        # so comparing the cross-multiplied numerators tells which comes first.
+        crossed_x = 0
+        crossed_y = 0
+        last_axis = 0  # 0 = segment start, 1 = vertical line, 2 = horizontal line
+        while crossed_x < adx:
+            if not self._cell_is_road(cell_x, cell_y):
+                if last_axis == 1:
+                    return crossed_x / adx
+                if last_axis == 2:
+                    return crossed_y / ady
+                return 0.0
+
+            next_x = (crossed_x + 1) * ady
+            next_y = (crossed_y + 1) * adx
+            if next_x < next_y:
+                crossed_x += 1
+                cell_x += step_x
+                last_axis = 1
+            elif next_y < next_x:
+                crossed_y += 1
+                cell_y += step_y
+                last_axis = 2
             else:
-                for y in range(p0.y - 1, p1.y, -1):
-                    t = (y - p0.y) / dy
-                    if t > 0 and t < 1:
-                        t_values.append(t)
-
-        return t_values
-
-    def _segment_intervals_are_on_road(self, p0: Vertex, p1: Vertex, t_values: List[float]) -> bool:
-        dx = p1.x - p0.x
-        dy = p1.y - p0.y
-        t_values.sort()
-
-        epsilon = 0.0000001
-        for index in range(len(t_values) - 1):
-            t0 = t_values[index]
-            t1 = t_values[index + 1]
-            if t1 - t0 > epsilon:
-                t_mid = (t0 + t1) * 0.5
-                x_mid = p0.x + dx * t_mid
-                y_mid = p0.y + dy * t_mid
-                if not self._sample_point_is_on_road(x_mid, y_mid):
-                    return False
+                # Exactly through a vertex: both lines at once, diagonal cells untouched.
+                crossed_x += 1
+                crossed_y += 1
+                cell_x += step_x
+                cell_y += step_y
+                last_axis = 1
 
-        return True
+        return None
 
     def _cell_is_road(self, cell_x: int, cell_y: int) -> bool:
         if cell_x < 0 or cell_x >= self.width:
             return False
         if cell_y < 0 or cell_y >= self.height:
             return False
-        return self.road_mask[cell_x][cell_y]
+        cells = self._cells
+        if cells is None:
+            cells = self._build_grid_tables()
+        return cells[cell_x * self.height + cell_y] != 0
 
     def _vertex_is_inside(self, vertex_x: int, vertex_y: int) -> bool:
-        # A vertex is inside if any adjacent cell is road.
-        for cell_x in range(vertex_x - 1, vertex_x + 1):
-            for cell_y in range(vertex_y - 1, vertex_y + 1):
-                if self._cell_is_road(cell_x, cell_y):
-                    return True
-        return False
-
-    def _point_has_road(self, x: int, y: int) -> bool:
-        return self._sample_point_is_on_road(float(x), float(y))
+        # A vertex is inside if any adjacent cell is road (precomputed bitmap).
+        if vertex_x < 0 or vertex_x > self.width:
+            return False
+        if vertex_y < 0 or vertex_y > self.height:
+            return False
+        inside = self._inside
+        if inside is None:
+            self._build_grid_tables()
+            inside = self._inside
+        return inside[vertex_x * (self.height + 1) + vertex_y] != 0
+
+    def _build_grid_tables(self):
+        # Flat byte tables replace nested list lookups in the hot geometry queries:
+        # cell (x, y) is at x * height + y, vertex (x, y) at x * (height + 1) + y.
+        width = self.width
+        height = self.height
+        if np is not None:
+            road = np.zeros((width, height), dtype=np.bool_)
+            if width > 0 and height > 0:
+                mask = np.asarray(self._road_mask, dtype=np.bool_)
+                if mask.shape != (width, height):
+                    raise ValueError(
+                        "road_mask has shape %s, expected (%s, %s)." % (mask.shape, width, height)
+                    )
+                road[:, :] = mask
+            # A vertex touches the 2x2 block of cells around it; pad so border vertices work too.
+            padded = np.zeros((width + 2, height + 2), dtype=np.bool_)
+            padded[1:-1, 1:-1] = road
+            inside = padded[:-1, :-1] | padded[1:, :-1] | padded[:-1, 1:] | padded[1:, 1:]
+            road.flags.writeable = False
+            inside.flags.writeable = False
+            self._road_array = road
+            self._inside_array = inside
+            self._cells = road.tobytes()
+            self._inside = inside.tobytes()
+            return self._cells
+
+        cells = bytearray(width * height)
+        inside = bytearray((width + 1) * (height + 1))
+        for x in range(width):
+            column = self._road_mask[x]
+            for y in range(height):
+                if column[y]:
+                    cells[x * height + y] = 1
+                    vertex_index = x * (height + 1) + y
+                    inside[vertex_index] = 1
+                    inside[vertex_index + 1] = 1
+                    inside[vertex_index + height + 1] = 1
+                    inside[vertex_index + height + 2] = 1
+        self._cells = bytes(cells)
+        self._inside = bytes(inside)
+        return self._cells
 
     def _value_in_range(self, value: float, a: int, b: int) -> bool:
         low = a
@@ -394,16 +913,20 @@ class GameState:
         shuffle_turn_order_each_round: bool = False,
         strict_target_check: bool = False,
         penalty_mode: str = "fixed",
-        penalty_value: int = 2
+        penalty_value: int = 2,
+        move_time_limit: float = None,
+        race_random: RaceRandom = None
     ):
         # Global mutable state for one full game session.
         self.track = track
-        self.cars = cars
+        self.cars = cars  # also builds car_store
         self.car_collision_penalty_enabled = car_collision_penalty_enabled
         self.shuffle_turn_order_each_round = shuffle_turn_order_each_round
         self.strict_target_check = strict_target_check
         self.penalty_mode = penalty_mode
         self.penalty_value = penalty_value
+        self.move_time_limit = move_time_limit
+        self.race_random = race_random if race_random is not None else RaceRandom()
         self.turn_order: List[int] = []
         self.turn_order_position = 0
         self.current_player_idx = 0  # Index of the current player
@@ -413,6 +936,9 @@ class GameState:
         self.finish_triggered = False
         self.finish_after_player_idx = None
         self.performance = None
+        self.replay = None  # ReplayRecorder, if the race is being recorded
+        # Bumped by every applied move; equal values mean no car has moved since.
+        self.occupancy_version = 0
         self._initialize_turn_order()
 
     def __repr__(self):
@@ -447,14 +973,35 @@ class GameState:
                 # Keep order stable after finish was triggered,
                 # so each remaining player gets exactly one catch-up turn.
                 if not self.finish_triggered:
-                    random.shuffle(self.turn_order)
+                    self.race_random.turn_order.shuffle(self.turn_order)
 
         self.current_player_idx = self.turn_order[self.turn_order_position]
 
+    @property
+    def cars(self) -> List[Car]:
+        return self._cars
+
+    @cars.setter
+    def cars(self, cars: List[Car]):
+        # The cars become views on one CarStore, so whole-field queries read flat arrays.
+        # Cars belong to one GameState: giving the same Car objects to another GameState
+        # moves them into its store and leaves this one's car_store out of date.
+        self._cars = cars
+        self.car_store = CarStore.adopt(cars)
+
     def check_game_finished(self):
         # Check if any car would cross the finish line on its current segment.
+        # Only cars whose move gets near the finish line are checked exactly.
         winners: List[int] = []
-        for car in self.cars:
+        finish = self.track.finish_line
+        slots = self.car_store.slots_reaching(
+            min(finish.start.x, finish.end.x),
+            min(finish.start.y, finish.end.y),
+            max(finish.start.x, finish.end.x),
+            max(finish.start.y, finish.end.y)
+        )
+        for slot in slots:
+            car = self.cars[slot]
             next_pos = car.pos + car.vel
             if self.track.segment_crosses_finish(car.pos, next_pos):
                 winners.append(car.id)
@@ -470,7 +1017,7 @@ class GameState:
             self.turn_order.append(index)
 
         if self.shuffle_turn_order_each_round and len(self.turn_order) > 1:
-            random.shuffle(self.turn_order)
+            self.race_random.turn_order.shuffle(self.turn_order)
 
         self.turn_order_position = 0
         if len(self.turn_order) > 0:
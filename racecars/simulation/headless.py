@@ -0,0 +1,73 @@
+"""Play a whole race without any window or frame pacing.
+
+Batch evaluation of drivers uses this instead of the pygame renderer, so
+nothing in here may import pygame (directly or through ui/).
+"""
+
+import logging
+from typing import List
+from simulation.game_state import GameState, Segment
+from simulation.controller import Controller
+
+_LOGGER = logging.getLogger("racecars.headless")
+
+
+class RaceResult:
+    def __init__(self, winners: List[int], rounds: int, paths: List[List[Segment]], names: List[str], finished: bool):
+        # Plain data only, so results can be printed, logged or sent between processes.
+        self.winners = winners
+        self.rounds = rounds
+        self.paths = paths
+        self.names = names
+        self.finished = finished
+
+    def __repr__(self):
+        return (
+            "RaceResult(winners="
+            + str(self.winners)
+            + ", rounds="
+            + str(self.rounds)
+            + ", finished="
+            + str(self.finished)
+            + ")"
+        )
+
+
+def run_headless(game_state: GameState, max_rounds: int = 1000) -> RaceResult:
+    # Same turn loop as the renderer, just without drawing and clock.tick().
+    ensure_no_manual_drivers(game_state)
+    controller = Controller(game_state)
+
+    while not game_state.finished:
+        if not game_state.cars:
+            break
+        if max_rounds is not None and game_state.race_round > max_rounds:
+            _LOGGER.warning("Race stopped after %s rounds without reaching the finish.", max_rounds)
+            break
+        controller.update()
+
+    controller.close()
+    return build_race_result(game_state, max_rounds)
+
+
+def ensure_no_manual_drivers(game_state: GameState):
+    # A mouse driver would wait for a click forever, because no click can ever come.
+    for car in game_state.cars:
+        if car.driver is not None and hasattr(car.driver, "SetTarget"):
+            raise ValueError(
+                "Car %s (%s) is controlled by mouse. Headless races need script controllers only."
+                % (car.id + 1, car.name)
+            )
+
+
+def build_race_result(game_state: GameState, max_rounds: int = None) -> RaceResult:
+    # A race stopped at max_rounds already counts the round it never played.
+    rounds = game_state.race_round
+    if not game_state.finished and max_rounds is not None and rounds > max_rounds:
+        rounds = max_rounds
+    paths = []
+    names = []
+    for car in game_state.cars:
+        paths.append(list(car.path))
+        names.append(car.name)
+    return RaceResult(list(game_state.winners), rounds, paths, names, game_state.finished)
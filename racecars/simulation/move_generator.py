@@ -3,7 +3,10 @@
 UI and drivers use this to see what choices are available on a turn.
 """
 
-from simulation.game_state import Vertex, Vector2i, GameState
+from simulation.game_state import Vertex, GameState, Track
+
+# Fixed order scripts rely on: ax = -1..1 in the outer loop, ay = -1..1 in the inner one.
+_ACCELERATIONS = [(ax, ay) for ax in (-1, 0, 1) for ay in (-1, 0, 1)]
 
 
 def get_ordered_targets_and_validity(game_state: GameState, car_id: int):
@@ -14,31 +17,14 @@ def get_ordered_targets_and_validity(game_state: GameState, car_id: int):
     if car.penalty > 0:
         return [car.pos], [True]
 
-    targets = []
-    validity = []
+    occupied = occupied_positions(game_state, car_id)
+    pos = car.pos
+    vel = car.vel
+    points, validity = ordered_target_points(game_state.track, pos.x, pos.y, vel.x, vel.y, occupied)
 
-    for ax in [-1, 0, 1]:
-        for ay in [-1, 0, 1]:
-            acceleration = Vector2i(ax, ay)
-            new_velocity = car.vel + acceleration
-            target_vertex = car.pos + new_velocity
-            finish_vertex = game_state.track.finish_vertex_for_segment(car.pos, target_vertex)
-
-            if finish_vertex is not None:
-                target = finish_vertex
-                segment_valid = game_state.track.segment_is_valid(car.pos, finish_vertex)
-            else:
-                target = target_vertex
-                if not _target_in_bounds(game_state, target):
-                    segment_valid = False
-                else:
-                    segment_valid = game_state.track.segment_is_valid(car.pos, target)
-
-            occupied = _target_is_occupied(game_state, car_id, target)
-            valid = segment_valid and (not occupied)
-
-            targets.append(target)
-            validity.append(valid)
+    targets = []
+    for x, y in points:
+        targets.append(Vertex(x, y))
 
     if len(targets) == 0:
         print(game_state)
@@ -50,17 +36,87 @@ def get_ordered_targets_and_validity(game_state: GameState, car_id: int):
     return targets, validity
 
 
-def _target_is_occupied(game_state: GameState, this_car_id: int, target: Vertex) -> bool:
-    for index in range(len(game_state.cars)):
-        if index != this_car_id:
-            if game_state.cars[index].pos == target:
-                return True
-    return False
-
+def ordered_target_points(track: Track, pos_x: int, pos_y: int, vel_x: int, vel_y: int, occupied):
+    # All nine candidates in one pass, with plain (x, y) tuples instead of vector objects.
+    # `occupied` is a set of (x, y) positions of the other cars.
+    width = track.width
+    height = track.height
+    points = []
+    validity = []
 
-def _target_in_bounds(game_state: GameState, target: Vertex) -> bool:
-    if target.x < 0 or target.x > game_state.track.width:
-        return False
-    if target.y < 0 or target.y > game_state.track.height:
-        return False
-    return True
+    for ax, ay in _ACCELERATIONS:
+        target_x = pos_x + vel_x + ax
+        target_y = pos_y + vel_y + ay
+        finish_point = track.finish_point_for_segment_xy(pos_x, pos_y, target_x, target_y)
+
+        if finish_point is not None:
+            target_x = finish_point[0]
+            target_y = finish_point[1]
+            segment_valid = track.segment_is_valid_xy(pos_x, pos_y, target_x, target_y)
+        elif target_x < 0 or target_x > width or target_y < 0 or target_y > height:
+            segment_valid = False
+        else:
+            segment_valid = track.segment_is_valid_xy(pos_x, pos_y, target_x, target_y)
+
+        point = (target_x, target_y)
+        points.append(point)
+        validity.append(segment_valid and point not in occupied)
+
+    return points, validity
+
+
+def occupied_positions(game_state: GameState, this_car_id: int):
+    # Built once per turn, so each candidate costs one set lookup instead of a scan.
+    return game_state.car_store.occupied(this_car_id)
+
+
+class MoveTable:
+    def __init__(self, track: Track):
+        # Targets and road validity of every (pos, vel) state seen so far on one track.
+        # They do not depend on the other cars, so all races on the track can share it.
+        self.track = track
+        self._moves = {}
+
+    def __len__(self):
+        return len(self._moves)
+
+    def moves(self, pos_x: int, pos_y: int, vel_x: int, vel_y: int):
+        # Returns (targets, points, segment_valid) tuples in the fixed target order.
+        key = (pos_x, pos_y, vel_x, vel_y)
+        moves = self._moves.get(key)
+        if moves is None:
+            points, segment_valid = ordered_target_points(self.track, pos_x, pos_y, vel_x, vel_y, ())
+            targets = []
+            for x, y in points:
+                targets.append(Vertex(x, y))
+            moves = (tuple(targets), tuple(points), tuple(segment_valid))
+            self._moves[key] = moves
+        return moves
+
+
+def get_batch_targets_and_validity(game_states, move_tables: dict):
+    # get_ordered_targets_and_validity() for the current car of every race in one pass.
+    # move_tables maps Track -> MoveTable and gets a table for every new track.
+    results = []
+    for game_state in game_states:
+        car_id = game_state.current_player_idx
+        car = game_state.cars[car_id]
+        if car.penalty > 0:
+            results.append(([car.pos], [True]))
+            continue
+
+        track = game_state.track
+        table = move_tables.get(track)
+        if table is None:
+            table = MoveTable(track)
+            move_tables[track] = table
+        pos = car.pos
+        vel = car.vel
+        targets, points, segment_valid = table.moves(pos.x, pos.y, vel.x, vel.y)
+
+        occupied = occupied_positions(game_state, car_id)
+        validity = []
+        for index in range(len(points)):
+            validity.append(segment_valid[index] and points[index] not in occupied)
+        results.append((list(targets), validity))
+    return results
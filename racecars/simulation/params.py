@@ -11,13 +11,16 @@ class GameParams:
         turn_sharpness: int = 50,
         turn_density: int = 50,
         framerate: int = 30,
+        turn_rate: float = None,
         seed: int = None,
         measure_performance: bool = False,
         car_collision_penalty_enabled: bool = True,
         shuffle_turn_order_each_round: bool = False,
         strict_target_check: bool = False,
         penalty_mode: str = "fixed",
-        penalty_value: int = 2
+        penalty_value: int = 2,
+        move_time_limit: float = None,
+        isolate_drivers: bool = False
     ):
         self.width = width
         self.height = height
@@ -27,6 +30,7 @@ class GameParams:
         self.turn_sharpness = turn_sharpness
         self.turn_density = turn_density
         self.framerate = framerate
+        self.turn_rate = turn_rate  # Turns per second in the window, None = framerate, 0 = unlimited
         self.seed = seed
         self.measure_performance = measure_performance
         self.car_collision_penalty_enabled = car_collision_penalty_enabled
@@ -34,6 +38,8 @@ class GameParams:
         self.strict_target_check = strict_target_check
         self.penalty_mode = penalty_mode
         self.penalty_value = penalty_value
+        self.move_time_limit = move_time_limit  # Seconds per PickMove() call, None = unlimited
+        self.isolate_drivers = isolate_drivers  # Run every script in its own subprocess
 
     def clone(self):
         # Defensive copy so dialogs/CLI parsing can edit params without side effects.
@@ -46,11 +52,14 @@ class GameParams:
             turn_sharpness=self.turn_sharpness,
             turn_density=self.turn_density,
             framerate=self.framerate,
+            turn_rate=self.turn_rate,
             seed=self.seed,
             measure_performance=self.measure_performance,
             car_collision_penalty_enabled=self.car_collision_penalty_enabled,
             shuffle_turn_order_each_round=self.shuffle_turn_order_each_round,
             strict_target_check=self.strict_target_check,
             penalty_mode=self.penalty_mode,
-            penalty_value=self.penalty_value
+            penalty_value=self.penalty_value,
+            move_time_limit=self.move_time_limit,
+            isolate_drivers=self.isolate_drivers
         )
@@ -0,0 +1,59 @@
+"""Separate random number streams for one race, all derived from one race seed.
+
+Every part of the engine that needs chance draws from its own random.Random, so
+that one part drawing more or fewer numbers never changes what another part
+gets: a different track generator does not move the start slots, and a driver
+that rolls dice every turn does not change how crashes are resolved.
+
+- track: the track generator. Seeded with the race seed itself, so a seed
+  still gives the same track as before.
+- start_grid, names: start slots and car names.
+- turn_order: the shuffled turn order of each round.
+- crash: the tie-break when a crashed car is put back onto the road.
+- colors: car colors in the window.
+- driver(car_id): one stream per car, given to its script as `self.random`.
+
+Without a seed a race seed is still picked, so any race can be played again.
+Several races on one seed (same track) tell their other streams apart by
+their race index.
+"""
+
+import random
+
+# Seeds above this are valid too; picked seeds stay short enough to type back in.
+_MAX_PICKED_SEED = 2 ** 31 - 1
+
+
+class RaceRandom:
+    def __init__(self, seed: int = None, race_index: int = 0):
+        if seed is None:
+            seed = random.SystemRandom().randint(0, _MAX_PICKED_SEED)
+        self.seed = seed
+        self.race_index = race_index
+        self.track = random.Random(seed)
+        self.start_grid = self.stream("start_grid")
+        self.names = self.stream("names")
+        self.turn_order = self.stream("turn_order")
+        self.crash = self.stream("crash")
+        self.colors = self.stream("colors")
+
+    def __repr__(self):
+        return "RaceRandom(seed=" + str(self.seed) + ", race_index=" + str(self.race_index) + ")"
+
+    def stream(self, name: str) -> random.Random:
+        # String seeds are hashed with SHA-512, so streams do not depend on PYTHONHASHSEED
+        # and are the same in every process.
+        return random.Random(self._stream_seed(name))
+
+    def driver_seed(self, car_id: int) -> str:
+        # The seed of driver(car_id); sent to driver host processes instead of the object.
+        return self._stream_seed("driver/" + str(car_id))
+
+    def driver(self, car_id: int) -> random.Random:
+        return random.Random(self.driver_seed(car_id))
+
+    def _stream_seed(self, name: str) -> str:
+        # Race 0 keeps the plain names, so a single race does not depend on the index at all.
+        if self.race_index == 0:
+            return "racecars/" + str(self.seed) + "/" + name
+        return "racecars/" + str(self.seed) + "/" + str(self.race_index) + "/" + name
@@ -0,0 +1,165 @@
+"""Build a ready-to-play race: padded track plus cars with loaded drivers.
+
+Shared by the windowed game in main.py and by batch runners (tournaments),
+so nothing in here may import pygame.
+"""
+
+import logging
+import random
+from typing import List
+from simulation.game_state import GameState, Car, Track, Vertex, Segment
+from simulation.track_generator import generate_track
+from simulation.params import GameParams
+from simulation.manual_auto import MouseAuto
+from simulation.script_loader import load_auto_class
+from simulation.driver_host import HostedDriver
+from simulation.race_random import RaceRandom
+from ui.logging_utils import sanitize_logger_name
+
+_LOGGER = logging.getLogger("racecars.race_setup")
+
+
+def build_track(params: GameParams, library=None, race_random: RaceRandom = None) -> Track:
+    # A TrackLibrary that already has this track saves generating and padding it.
+    # Nothing else draws from the track stream, so skipping the generator changes
+    # nothing else in the race.
+    if library is not None:
+        track = library.get(params)
+        if track is not None:
+            return track
+
+    if race_random is None:
+        race_random = RaceRandom(params.seed)
+
+    # Generate a simple track
+    track = generate_track(
+        width=params.width-2,
+        height=params.height-2,
+        players=params.players,
+        track_width_mean=params.track_width_mean,
+        track_width_var=params.track_width_var,
+        turn_density=params.turn_density,
+        turn_sharpness=params.turn_sharpness,
+        rng=race_random.track
+    )
+
+    # add bounderies: one off-road column/row on every side
+    empty_column = [False] * params.height
+    padded_mask = [empty_column]
+    for column in track.road_mask:
+        padded_mask.append([False] + column + [False])
+    padded_mask.append(list(empty_column))
+    track.width = params.width
+    track.height = params.height
+    track.road_mask = padded_mask
+
+    # move start and finish lines (vertices are immutable, so build new ones)
+    start_vertices = []
+    for vertex in track.start_vertices:
+        start_vertices.append(Vertex(vertex.x + 1, vertex.y))
+    track.start_vertices = start_vertices
+    track.start_line = Segment(start_vertices[0], start_vertices[-1])
+    finish_x = params.width - 1
+    track.finish_line = Segment(
+        Vertex(finish_x, track.finish_line.start.y),
+        Vertex(finish_x, track.finish_line.end.y)
+    )
+    track.invalidate_caches()
+    return track
+
+
+def find_script_info(script_infos, name: str):
+    if name is None:
+        return None
+    target = name.lower()
+    target_no_ext = _strip_py_extension(target)
+    for info in script_infos:
+        info_name = info.name.lower()
+        info_file = info.file_name.lower()
+        if info_name == target or info_file == target or info_name == target_no_ext:
+            return info
+    return None
+
+
+def _strip_py_extension(name: str) -> str:
+    if name.endswith(".py"):
+        return name[:-3]
+    return name
+
+
+def create_cars_for_track(track: Track, players: int, controllers, script_infos, host_pool=None, race_random: RaceRandom = None) -> List[Car]:
+    # Start order is randomized so scripts do not always get the same starting slot.
+    # With a DriverHostPool, scripts are never imported here; each one runs in a host process.
+    if race_random is None:
+        race_random = RaceRandom()
+    start_positions = list(track.start_vertices)
+    race_random.start_grid.shuffle(start_positions)
+
+    # Scripts should use self.random; the ones that use the `random` module still get
+    # the same numbers for the same race (as long as the process runs one race at a time).
+    random.seed(race_random.stream("scripts").getrandbits(64))
+
+    count = players
+    if count > len(start_positions):
+        count = len(start_positions)
+
+    # generate random names
+    ADJECTIVES = ["Red", "Blue", "Green", "Yellow", "Silver", "Black",
+    "Swift", "Brave", "Wild", "Mighty", "Fierce", "Lucky"]
+    NOUNS = ["Comet", "Falcon", "Tiger", "Eagle", "Rocket", "Panther",
+    "Wolf", "Viper", "Storm", "Blaze", "Arrow", "Bolt"]
+    race_random.names.shuffle(ADJECTIVES)
+    race_random.names.shuffle(NOUNS)
+    names = []
+    for i in range(count):
+        names.append(ADJECTIVES[i] + " " + NOUNS[i])
+
+    cars: List[Car] = []
+    for index in range(count):
+        controller_name = "mouse"
+        if index < len(controllers):
+            controller_name = controllers[index]
+
+        driver = MouseAuto()
+        logger = logging.getLogger("racecars.car." + sanitize_logger_name("Mouse") + ".id_" + str(index + 1))
+        if controller_name.lower() != "mouse":
+            try:
+                script_info = find_script_info(script_infos, controller_name)
+                if script_info is None:
+                    raise ValueError("Controller '%s' was not found. Falling back to mouse for car %s." % (controller_name, index + 1))
+                if host_pool is not None:
+                    driver = HostedDriver(host_pool.acquire(script_info.name), track, race_random.driver_seed(index))
+                else:
+                    auto_class = load_auto_class(script_info)
+                    if auto_class is None:
+                        raise ValueError("Failed to load script '%s'. Falling back to mouse for car %s." % (script_info.name, index + 1))
+                    driver = auto_class(track)
+                    driver.random = race_random.driver(index)
+                try:
+                    name = driver.GetName()
+                except Exception as ex:
+                    logger.exception("GetName() failed for script '%s' (%s: %s). Using script file name as fallback.", script_info.name, type(ex).__name__, ex)
+                    name = script_info.name
+                names[index] = name
+                logger = logging.getLogger("racecars.car." + sanitize_logger_name(script_info.name) + ".id_" + str(index + 1))
+            except Exception as ex:
+                _LOGGER.exception("Script '%s' raised during initialization (%s: %s). Falling back to mouse for car %s.", controller_name, type(ex).__name__, ex, index + 1)
+
+        # finally create the car
+        cars.append(Car(index, names[index], start_positions[index], driver = driver, logger = logger))
+
+    return cars
+
+
+def build_game_state(params: GameParams, track: Track, cars: List[Car], race_random: RaceRandom = None) -> GameState:
+    return GameState(
+        track=track,
+        cars=cars,
+        car_collision_penalty_enabled=params.car_collision_penalty_enabled,
+        shuffle_turn_order_each_round=params.shuffle_turn_order_each_round,
+        strict_target_check=params.strict_target_check,
+        penalty_mode=params.penalty_mode,
+        penalty_value=params.penalty_value,
+        move_time_limit=params.move_time_limit,
+        race_random=race_random
+    )
@@ -0,0 +1,387 @@
+"""Record every applied move of a race and play it back without any driver code.
+
+A replay file is append-only: an 8-byte magic, then length-prefixed records
+(kind byte, 32-bit payload length, payload):
+
+- HEADER: JSON with the format version, game parameters (seed and track
+  parameters included), the race seed, car ids, names, controllers, start
+  positions and the first turn order.
+- TRACK: the road and start/finish lines, so a replay does not depend on the
+  track generator (or on a seed at all).
+- MOVE: car id, the applied target and the car position after the move, one
+  per turn. The position is needed because a crashed car is put back on a
+  randomly chosen vertex when several are equally close.
+- ORDER: the new turn order (16-bit car ids), written only after a move that
+  reshuffled it.
+- END: JSON with winners, rounds and whether the race finished.
+
+A file cut off in the middle (crash, closed window) still replays up to its
+last complete record. ReplayEngine applies the recorded targets through the
+normal TurnLogic, so crashes, penalties and the finish rules are re-simulated,
+and it keeps checkpoints to seek to any turn quickly.
+"""
+
+import json
+import logging
+import struct
+from typing import List
+from simulation.game_state import GameState, Car, Track, Vertex, Segment
+from simulation.move_generator import get_ordered_targets_and_validity
+from simulation.turn_logic import TurnLogic
+from simulation.headless import RaceResult
+from simulation.race_random import RaceRandom
+
+_LOGGER = logging.getLogger("racecars.replay")
+
+MAGIC = b"RCREPLAY"
+FORMAT_VERSION = 1
+FILE_EXTENSION = ".rcr"
+
+_KIND_HEADER = 1
+_KIND_TRACK = 2
+_KIND_MOVE = 3
+_KIND_ORDER = 4
+_KIND_END = 5
+
+_RECORD = struct.Struct("<BI")  # kind, payload length
+# car id, target x, target y, position x, position y after the move. A driver may
+# return any target (without strict_target_check it just crashes), so no short ints.
+_MOVE = struct.Struct("<Hiiii")
+_ORDER_ID = "H"
+_TRACK_HEAD = struct.Struct("<iiiiiii")  # width, height, finish x0, y0, x1, y1, start count
+_PAIR = struct.Struct("<ii")
+
+# Seeking backwards restarts from the closest checkpoint instead of from turn 0.
+DEFAULT_CHECKPOINT_EVERY = 200
+
+
+class ReplayError(Exception):
+    pass
+
+
+class ReplayRecorder:
+    def __init__(self, path: str, params, game_state: GameState, controllers=None):
+        # Writes the header and the track at once; moves follow as they are applied.
+        self.path = path
+        self.moves = 0
+        self._file = open(path, "wb")
+        self._last_order = list(game_state.turn_order)
+        self._file.write(MAGIC)
+        self._write(_KIND_HEADER, _encode_header(params, game_state, controllers))
+        self._write(_KIND_TRACK, _encode_track(game_state.track))
+
+    def record_move(self, car_id: int, target: Vertex, game_state: GameState):
+        # Call right after TurnLogic.apply_move, so a reshuffled turn order is seen too.
+        if self._file is None:
+            return
+        car = game_state.cars[car_id]
+        self._write(_KIND_MOVE, _MOVE.pack(car_id, _clamp_int32(target.x), _clamp_int32(target.y), car.pos.x, car.pos.y))
+        self.moves += 1
+        if game_state.turn_order != self._last_order:
+            self._last_order = list(game_state.turn_order)
+            self._write(_KIND_ORDER, struct.pack("<%s%s" % (len(self._last_order), _ORDER_ID), *self._last_order))
+
+    def close(self, game_state: GameState = None):
+        # With the game state, the result is written too, so a replay can be audited.
+        if self._file is None:
+            return
+        if game_state is not None:
+            end = {
+                "winners": list(game_state.winners),
+                "rounds": game_state.race_round,
+                "finished": game_state.finished
+            }
+            self._write(_KIND_END, json.dumps(end).encode("utf-8"))
+        self._file.close()
+        self._file = None
+
+    def _write(self, kind: int, payload: bytes):
+        self._file.write(_RECORD.pack(kind, len(payload)))
+        self._file.write(payload)
+
+
+class Replay:
+    def __init__(self, header: dict, track: Track, moves: List[tuple], orders: dict, end: dict):
+        # moves: (car_id, target x, target y, position x, position y) per turn.
+        # orders: move index -> turn order right after that move.
+        self.header = header
+        self.track = track
+        self.moves = moves
+        self.orders = orders
+        self.end = end
+
+    @property
+    def seed(self):
+        return self.header["params"].get("seed")
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.header["names"])
+
+    def __repr__(self):
+        return "Replay(seed=" + str(self.seed) + ", moves=" + str(len(self.moves)) + ")"
+
+
+def read_replay(path: str) -> Replay:
+    file = open(path, "rb")
+    try:
+        data = file.read()
+    finally:
+        file.close()
+    return parse_replay(data)
+
+
+def parse_replay(data: bytes) -> Replay:
+    if data[:len(MAGIC)] != MAGIC:
+        raise ReplayError("Not a racecars replay file.")
+    header = None
+    track = None
+    moves = []
+    orders = {}
+    end = None
+    offset = len(MAGIC)
+    while offset + _RECORD.size <= len(data):
+        kind, length = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        if offset + length > len(data):
+            _LOGGER.warning("Replay ends with an incomplete record; using the %s complete moves.", len(moves))
+            break
+        payload = data[offset:offset + length]
+        offset += length
+
+        if kind == _KIND_MOVE:
+            moves.append(_MOVE.unpack(payload))
+        elif kind == _KIND_ORDER:
+            orders[len(moves) - 1] = struct.unpack("<%s%s" % (len(payload) // struct.calcsize(_ORDER_ID), _ORDER_ID), payload)
+        elif kind == _KIND_HEADER:
+            header = json.loads(payload.decode("utf-8"))
+            if header.get("version", 0) > FORMAT_VERSION:
+                raise ReplayError("Replay format version %s is newer than this game." % header.get("version"))
+        elif kind == _KIND_TRACK:
+            track = _decode_track(payload)
+        elif kind == _KIND_END:
+            end = json.loads(payload.decode("utf-8"))
+        # Unknown kinds come from newer writers; their length lets us skip them.
+
+    if header is None or track is None:
+        raise ReplayError("Replay has no header or no track.")
+    return Replay(header, track, moves, orders, end)
+
+
+class ReplayEngine:
+    def __init__(self, replay: Replay, checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY):
+        # Also usable as the controller of a SimulationLoop, so the renderer can show a replay.
+        self.replay = replay
+        self.checkpoint_every = checkpoint_every
+        self.turn = 0
+        self.game_state = _build_game_state(replay)
+        self._checkpoints = [(0, _capture(self.game_state))]
+
+    @property
+    def turn_count(self) -> int:
+        return len(self.replay.moves)
+
+    def step(self) -> bool:
+        # Applies the next recorded move; False once there is none left.
+        if self.turn >= len(self.replay.moves) or self.game_state.finished:
+            return False
+        car_id, x, y, position_x, position_y = self.replay.moves[self.turn]
+        game_state = self.game_state
+        if car_id != game_state.current_player_idx:
+            raise ReplayError(
+                "Replay is out of sync at turn %s: car %s moved, but car %s was on turn."
+                % (self.turn, car_id + 1, game_state.current_player_idx + 1)
+            )
+        TurnLogic.apply_move(game_state, car_id, Vertex(x, y))
+        car = game_state.cars[car_id]
+        if car.pos.x != position_x or car.pos.y != position_y:
+            # Only the random tie-break after a crash may land somewhere else.
+            if car.vel.x != 0 or car.vel.y != 0:
+                raise ReplayError(
+                    "Replay is out of sync at turn %s: car %s reached %s, recorded (%s, %s)."
+                    % (self.turn, car_id + 1, car.pos, position_x, position_y)
+                )
+            car.pos = Vertex(position_x, position_y)
+        order = self.replay.orders.get(self.turn)
+        if order is not None:
+            game_state.turn_order = list(order)
+            game_state.current_player_idx = game_state.turn_order[game_state.turn_order_position]
+        self.turn += 1
+        if self.turn % self.checkpoint_every == 0 and self.turn > self._checkpoints[-1][0]:
+            self._checkpoints.append((self.turn, _capture(game_state)))
+        return True
+
+    def seek(self, turn: int):
+        # Puts the race into the state after `turn` applied moves.
+        if turn < 0:
+            turn = 0
+        if turn > len(self.replay.moves):
+            turn = len(self.replay.moves)
+        if turn < self.turn:
+            checkpoint_turn, state = self._checkpoints[0]
+            for candidate_turn, candidate in self._checkpoints:
+                if candidate_turn <= turn:
+                    checkpoint_turn, state = candidate_turn, candidate
+            _restore(self.game_state, state)
+            self.turn = checkpoint_turn
+        while self.turn < turn and self.step():
+            pass
+
+    def run_to_end(self) -> RaceResult:
+        while self.step():
+            pass
+        return self.result()
+
+    def result(self) -> RaceResult:
+        game_state = self.game_state
+        paths = []
+        names = []
+        for car in game_state.cars:
+            paths.append(list(car.path))
+            names.append(car.name)
+        return RaceResult(list(game_state.winners), game_state.race_round, paths, names, game_state.finished)
+
+    def verify(self) -> List[str]:
+        # Replays the whole race and lists every difference to the recorded result.
+        result = self.run_to_end()
+        end = self.replay.end
+        if end is None:
+            return ["The replay has no recorded result (race was interrupted)."]
+        problems = []
+        if list(end["winners"]) != result.winners:
+            problems.append("Winners differ: recorded %s, replayed %s." % (end["winners"], result.winners))
+        if end["rounds"] != result.rounds:
+            problems.append("Rounds differ: recorded %s, replayed %s." % (end["rounds"], result.rounds))
+        if bool(end["finished"]) != result.finished:
+            problems.append("Finish state differs: recorded %s, replayed %s." % (end["finished"], result.finished))
+        return problems
+
+    # SimulationLoop interface
+
+    def update(self) -> bool:
+        return self.step()
+
+    def apply_click(self, grid_x: int, grid_y: int):
+        # A replay has no players to click for.
+        return
+
+    def get_targets_and_validity(self):
+        if not self.game_state.cars or self.game_state.finished:
+            return [], []
+        return get_ordered_targets_and_validity(self.game_state, self.game_state.current_player_idx)
+
+
+def _clamp_int32(value: int) -> int:
+    # Only a target far off the track can be out of range; it crashes the car either
+    # way, and the replay takes a crashed car's position from the record.
+    return max(-2 ** 31, min(2 ** 31 - 1, value))
+
+
+def _encode_header(params, game_state: GameState, controllers) -> bytes:
+    cars = game_state.cars
+    header = {
+        "version": FORMAT_VERSION,
+        "params": dict(vars(params)),
+        "race_seed": game_state.race_random.seed,
+        "race_index": game_state.race_random.race_index,
+        "names": [str(car.name) for car in cars],
+        "controllers": list(controllers) if controllers is not None else None,
+        "start": [[car.pos.x, car.pos.y] for car in cars],
+        "turn_order": list(game_state.turn_order)
+    }
+    return json.dumps(header).encode("utf-8")
+
+
+def _encode_track(track: Track) -> bytes:
+    finish = track.finish_line
+    parts = [
+        _TRACK_HEAD.pack(
+            track.width,
+            track.height,
+            finish.start.x,
+            finish.start.y,
+            finish.end.x,
+            finish.end.y,
+            len(track.start_vertices)
+        )
+    ]
+    for vertex in track.start_vertices:
+        parts.append(_PAIR.pack(vertex.x, vertex.y))
+    cells = bytearray(track.width * track.height)
+    for x in range(track.width):
+        column = track.road_mask[x]
+        for y in range(track.height):
+            if column[y]:
+                cells[x * track.height + y] = 1
+    parts.append(bytes(cells))
+    return b"".join(parts)
+
+
+def _decode_track(payload: bytes) -> Track:
+    width, height, fx0, fy0, fx1, fy1, start_count = _TRACK_HEAD.unpack_from(payload, 0)
+    offset = _TRACK_HEAD.size
+    start_vertices = []
+    for _ in range(start_count):
+        x, y = _PAIR.unpack_from(payload, offset)
+        offset += _PAIR.size
+        start_vertices.append(Vertex(x, y))
+    cells = payload[offset:offset + width * height]
+    road_mask = []
+    for x in range(width):
+        column = cells[x * height:(x + 1) * height]
+        road_mask.append([value != 0 for value in column])
+    finish_line = Segment(Vertex(fx0, fy0), Vertex(fx1, fy1))
+    return Track(width, height, road_mask, start_vertices, finish_line)
+
+
+def _build_game_state(replay: Replay) -> GameState:
+    header = replay.header
+    params = header["params"]
+    cars = []
+    for index in range(len(header["names"])):
+        x, y = header["start"][index]
+        cars.append(Car(index, header["names"][index], Vertex(x, y)))
+    # Shuffling is off: recorded ORDER records replace the random reshuffles.
+    game_state = GameState(
+        track=replay.track,
+        cars=cars,
+        car_collision_penalty_enabled=params.get("car_collision_penalty_enabled", True),
+        shuffle_turn_order_each_round=False,
+        strict_target_check=params.get("strict_target_check", False),
+        penalty_mode=params.get("penalty_mode", "fixed"),
+        penalty_value=params.get("penalty_value", 2),
+        race_random=RaceRandom(header.get("race_seed"), header.get("race_index", 0))
+    )
+    game_state.turn_order = list(header["turn_order"])
+    if game_state.turn_order:
+        game_state.current_player_idx = game_state.turn_order[0]
+    return game_state
+
+
+def _capture(game_state: GameState):
+    return (
+        game_state.car_store.capture(),
+        tuple(game_state.turn_order),
+        game_state.turn_order_position,
+        game_state.current_player_idx,
+        game_state.race_round,
+        game_state.finished,
+        tuple(game_state.winners),
+        game_state.finish_triggered,
+        game_state.finish_after_player_idx,
+        game_state.occupancy_version
+    )
+
+
+def _restore(game_state: GameState, state):
+    cars, turn_order, position, current, race_round, finished, winners, triggered, after, version = state
+    game_state.car_store.restore(cars)
+    game_state.turn_order = list(turn_order)
+    game_state.turn_order_position = position
+    game_state.current_player_idx = current
+    game_state.race_round = race_round
+    game_state.finished = finished
+    game_state.winners = list(winners)
+    game_state.finish_triggered = triggered
+    game_state.finish_after_player_idx = after
+    game_state.occupancy_version = version
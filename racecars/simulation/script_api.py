@@ -1,6 +1,7 @@
 """Public API objects that student Auto scripts are expected to use."""
 
 import logging
+import random
 from simulation.game_state import Vertex, Vector2i
 
 _LOGGER = logging.getLogger("racecars.script_api")
@@ -8,6 +9,8 @@ _LOGGER = logging.getLogger("racecars.script_api")
 class AutoAuto:
     def __init__(self, logger: logging.Logger = _LOGGER):
         self.logger = logger
+        # Replaced by the engine with this car's own stream of the race (see race_random.py).
+        self.random = random.Random()
 
     def GetName(self) -> str:
         return "Why do you insantiate AutoAuto? You should subclass it and override GetName and PickMove."
@@ -25,40 +28,128 @@ class AutoAuto:
                 return target
         return None
 
+_set_attribute = object.__setattr__
+
+
 class CarInfo:
+    # Read-only record of one car. The engine refreshes it in place when the car moves.
+    __slots__ = ("id", "name", "pos", "vel")
+
     def __init__(self, car_id: int, name: str, pos: Vertex, vel: Vector2i):
-        self.id = car_id
-        self.name = name
-        self.pos = pos
-        self.vel = vel
+        _set_attribute(self, "id", car_id)
+        _set_attribute(self, "name", name)
+        _set_attribute(self, "pos", pos)
+        _set_attribute(self, "vel", vel)
 
+    def __setattr__(self, name, value):
+        raise AttributeError("CarInfo is read-only; the engine updates it.")
 
-class WorldState:
-    def __init__(self, road, start_vertices, finish_vertices, cars, race_round):
-        # Snapshot passed to scripts so they can plan their next target.
-        self.road = road
-        self.start_vertices = start_vertices
-        self.finish_vertices = finish_vertices
-        self.cars = cars
-        self.race_round = race_round
+    def __delattr__(self, name):
+        raise AttributeError("CarInfo is read-only; the engine updates it.")
 
+    def __repr__(self):
+        return "CarInfo(id=" + str(self.id) + ", name=" + str(self.name) + ", pos=" + str(self.pos) + ", vel=" + str(self.vel) + ")"
 
-def build_world_state(game_state):
-    # Build a copy-only view of the world to avoid scripts mutating engine internals.
-    track = game_state.track
-    finish_vertices = _finish_vertices_from_line(track.finish_line)
-    cars = []
 
-    for car in game_state.cars:
-        car_info = CarInfo(car.id, car.name, Vertex(car.pos.x, car.pos.y), Vector2i(car.vel.x, car.vel.y))
-        cars.append(car_info)
+class FinishDistances:
+    def __init__(self, values, width: int, height: int):
+        # Steps from every vertex to the finish line, computed once per track by the engine.
+        # One step moves to any of the 8 neighbouring vertices; -1 means off the road.
+        self._values = values
+        self.width = width
+        self.height = height
 
-    start_vertices = _copy_vertices(track.start_vertices)
-    return WorldState(track.road_mask, start_vertices, finish_vertices, cars, game_state.race_round)
+    def get(self, x: int, y: int) -> int:
+        if x < 0 or x > self.width or y < 0 or y > self.height:
+            return -1
+        return self._values[x * (self.height + 1) + y]
 
+    def __getitem__(self, vertex):
+        # Accepts a Vertex or an (x, y) tuple: world.finish_distance[auto.pos]
+        if isinstance(vertex, Vector2i):
+            return self.get(vertex.x, vertex.y)
+        x, y = vertex
+        return self.get(x, y)
 
-def _copy_vertices(vertices):
-    return [Vertex(v.x, v.y) for v in vertices]
+    @property
+    def values(self) -> memoryview:
+        # Flat read-only buffer, vertex (x, y) at x * (height + 1) + y.
+        return self._values
+
+
+class WorldState:
+    # View of the race passed to scripts so they can plan their next target.
+    # One WorldState lives for the whole race: track data is built once, and
+    # refresh_world_state() only touches the car records that changed. Scripts
+    # cannot assign to it; keep your own copies if you need last turn's values.
+    __slots__ = ("road", "start_vertices", "finish_vertices", "cars", "race_round", "finish_distance")
+
+    def __init__(self, road, start_vertices, finish_vertices, cars, race_round, finish_distance: FinishDistances = None):
+        _set_attribute(self, "road", road)
+        _set_attribute(self, "start_vertices", start_vertices)
+        _set_attribute(self, "finish_vertices", finish_vertices)
+        _set_attribute(self, "cars", cars)
+        _set_attribute(self, "race_round", race_round)
+        _set_attribute(self, "finish_distance", finish_distance)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("WorldState is read-only; the engine updates it.")
+
+    def __delattr__(self, name):
+        raise AttributeError("WorldState is read-only; the engine updates it.")
+
+
+def build_world_state(game_state, previous: WorldState = None):
+    # Built once per race. Everything is a tuple or an immutable value, so scripts
+    # can read it freely without being able to change engine internals.
+    # previous: an older world of the same race; its track data is shared, its car
+    # records are not, so whoever still holds it keeps seeing its own turn.
+    track = game_state.track
+    cars = []
+    for car in game_state.cars:
+        # pos and vel are immutable, so they are shared with the engine, not copied.
+        cars.append(CarInfo(car.id, car.name, car.pos, car.vel))
+    if previous is not None and previous.finish_distance.values is track.finish_distances():
+        return WorldState(
+            previous.road,
+            previous.start_vertices,
+            previous.finish_vertices,
+            tuple(cars),
+            game_state.race_round,
+            previous.finish_distance
+        )
+
+    road = tuple(tuple(bool(cell) for cell in column) for column in track.road_mask)
+    finish_vertices = tuple(_finish_vertices_from_line(track.finish_line))
+    start_vertices = tuple(track.start_vertices)
+    finish_distance = FinishDistances(track.finish_distances(), track.width, track.height)
+    return WorldState(road, start_vertices, finish_vertices, tuple(cars), game_state.race_round, finish_distance)
+
+
+def refresh_world_state(world: WorldState, game_state) -> WorldState:
+    # Brings a world built by build_world_state() up to date; usually one car moved.
+    # Returns a new world only if the race changed shape (other track or car list).
+    cars = game_state.cars
+    infos = world.cars
+    if len(infos) != len(cars) or world.finish_distance.values is not game_state.track.finish_distances():
+        return build_world_state(game_state)
+
+    for index in range(len(cars)):
+        car = cars[index]
+        info = infos[index]
+        if info.id != car.id:
+            return build_world_state(game_state)
+        pos = car.pos
+        vel = car.vel
+        if info.pos is not pos or info.vel is not vel:
+            _set_attribute(info, "pos", pos)
+            _set_attribute(info, "vel", vel)
+        if info.name != car.name:
+            _set_attribute(info, "name", car.name)
+
+    if world.race_round != game_state.race_round:
+        _set_attribute(world, "race_round", game_state.race_round)
+    return world
 
 
 def _finish_vertices_from_line(line):
@@ -0,0 +1,252 @@
+"""Shortest-path search over car states (x, y, vx, vy) for driver scripts.
+
+A state is a plain tuple (x, y, vx, vy). One move picks one of the nine
+accelerations, exactly like the targets the engine offers each turn, and the
+same Track checks decide which moves are legal and where a finishing move is
+snapped to the finish line. Other cars and crash penalties are ignored, so a
+plan is a route on an empty track; drivers still have to compare each planned
+step with the `validity` list they get.
+
+Typical use inside a script:
+
+    from simulation.search import TransitionTable, find_path_astar
+
+    class Auto(AutoAuto):
+        def __init__(self, track):
+            super().__init__()
+            self.table = TransitionTable(track)
+
+        def PickMove(self, auto, world, targets, validity):
+            path = find_path_astar(self.table, (auto.pos.x, auto.pos.y, auto.vel.x, auto.vel.y))
+            ...
+
+A path is a list of states starting with the start state and ending with the
+state right after crossing the finish line, or an empty list if no route was
+found within `max_states` expanded states.
+"""
+
+import heapq
+import logging
+import math
+from collections import deque
+from simulation.game_state import Track
+from simulation.move_generator import ordered_target_points
+
+_LOGGER = logging.getLogger("racecars.search")
+
+# Same cap as the hand-written planners in Scripts/ used, so a hopeless search still ends.
+DEFAULT_MAX_STATES = 300000
+
+HEURISTICS = ("road", "straight", "zero")
+
+_NO_CARS = frozenset()
+
+
+class TransitionTable:
+    def __init__(self, track: Track):
+        # Successors of every state ever expanded, shared by all searches on this track.
+        # Keep one table per driver (or per track) and reuse it between turns.
+        self.track = track
+        self._successors = {}
+
+    def __len__(self):
+        return len(self._successors)
+
+    def clear(self):
+        self._successors.clear()
+
+    def successors(self, state):
+        # Returns a tuple of (next_state, finished) pairs for the legal moves from `state`.
+        moves = self._successors.get(state)
+        if moves is not None:
+            return moves
+
+        x, y, vx, vy = state
+        track = self.track
+        points, validity = ordered_target_points(track, x, y, vx, vy, _NO_CARS)
+        moves = []
+        for index in range(len(points)):
+            if not validity[index]:
+                continue
+            target_x, target_y = points[index]
+            # Velocity is the target delta, so a snapped finishing move is slower.
+            finished = track.finish_point_for_segment_xy(x, y, target_x, target_y) is not None
+            moves.append(((target_x, target_y, target_x - x, target_y - y), finished))
+        moves = tuple(moves)
+        self._successors[state] = moves
+        return moves
+
+
+def find_path_bfs(table: TransitionTable, start, blocked=None, max_states: int = DEFAULT_MAX_STATES):
+    # Fewest moves to the finish. `blocked` is a set of (x, y) positions the first move
+    # must avoid (usually the other cars).
+    start = _as_state(start)
+    came_from = {start: None}
+    queue = deque([start])
+    expanded = 0
+
+    while queue and expanded < max_states:
+        state = queue.popleft()
+        expanded += 1
+        for next_state, finished in table.successors(state):
+            if next_state in came_from:
+                continue
+            if state is start and _is_blocked(next_state, blocked):
+                continue
+            came_from[next_state] = state
+            if finished:
+                return _reconstruct(came_from, next_state)
+            queue.append(next_state)
+
+    _log_not_found(start, expanded, max_states)
+    return []
+
+
+def find_path_astar(table: TransitionTable, start, heuristic: str = "road", blocked=None, max_states: int = DEFAULT_MAX_STATES):
+    # Same answer length as find_path_bfs, usually after far fewer expanded states.
+    # Every heuristic is a lower bound on the remaining moves, so the path is optimal.
+    if heuristic not in HEURISTICS:
+        raise ValueError("Unknown heuristic '%s'. Use one of: %s." % (heuristic, ", ".join(HEURISTICS)))
+
+    start = _as_state(start)
+    estimate = _heuristic_function(table.track, heuristic)
+    start_estimate = estimate(start)
+    if start_estimate is None:
+        _log_not_found(start, 0, max_states)
+        return []
+
+    came_from = {start: None}
+    cost = {start: 0}
+    closed = set()
+    counter = 0
+    # Ties on f prefer the deeper state (larger g), which reaches the finish sooner.
+    heap = [(start_estimate, 0, counter, start)]
+    expanded = 0
+
+    while heap and expanded < max_states:
+        _, negative_cost, _, state = heapq.heappop(heap)
+        if state in closed:
+            continue
+        state_cost = -negative_cost
+        if state_cost > cost[state]:
+            continue
+        closed.add(state)
+        expanded += 1
+
+        next_cost = state_cost + 1
+        for next_state, finished in table.successors(state):
+            if next_state in closed:
+                continue
+            if state is start and _is_blocked(next_state, blocked):
+                continue
+            known_cost = cost.get(next_state)
+            if known_cost is not None and known_cost <= next_cost:
+                continue
+            if finished:
+                # With unit move costs the first finishing move found from the cheapest
+                # open state cannot be beaten.
+                came_from[next_state] = state
+                return _reconstruct(came_from, next_state)
+            next_estimate = estimate(next_state)
+            if next_estimate is None:
+                continue
+            cost[next_state] = next_cost
+            came_from[next_state] = state
+            counter += 1
+            heapq.heappush(heap, (next_cost + next_estimate, -next_cost, counter, next_state))
+
+    _log_not_found(start, expanded, max_states)
+    return []
+
+
+def moves_lower_bound(distance: int, speed: int) -> int:
+    # Fewest moves that can cover `distance` grid steps when the current speed is
+    # `speed`: move k covers at most speed + k steps, so n moves cover at most
+    # n * speed + n * (n + 1) / 2 steps.
+    if distance <= 0:
+        return 0
+    half = speed + 0.5
+    moves = int(math.ceil(math.sqrt(half * half + 2 * distance) - half))
+    if moves < 1:
+        moves = 1
+    while moves > 1 and (moves - 1) * speed + (moves - 1) * moves // 2 >= distance:
+        moves -= 1
+    while moves * speed + moves * (moves + 1) // 2 < distance:
+        moves += 1
+    return moves
+
+
+def _heuristic_function(track: Track, heuristic: str):
+    # Each function returns a lower bound of the moves left, or None for a dead state.
+    # States on the heap have not finished yet, so at least one more move is always needed;
+    # this keeps the early return in find_path_astar exact.
+    if heuristic == "zero":
+        return _zero_heuristic
+
+    if heuristic == "straight":
+        line = track.finish_line
+
+        def straight(state):
+            distance = _chebyshev_to_segment(state[0], state[1], line)
+            return max(1, moves_lower_bound(distance, _speed(state)))
+        return straight
+
+    def road(state):
+        distance = track.finish_distance_xy(state[0], state[1])
+        if distance < 0:
+            return None
+        return max(1, moves_lower_bound(distance, _speed(state)))
+    return road
+
+
+def _zero_heuristic(state):
+    # Plain uniform-cost search; states are popped in order of moves made.
+    return 0
+
+
+def _speed(state):
+    speed_x = abs(state[2])
+    speed_y = abs(state[3])
+    if speed_x >= speed_y:
+        return speed_x
+    return speed_y
+
+
+def _chebyshev_to_segment(x: int, y: int, line) -> int:
+    # The finish line is axis-aligned, so the closest point is a clamp on each axis.
+    low_x = min(line.start.x, line.end.x)
+    high_x = max(line.start.x, line.end.x)
+    low_y = min(line.start.y, line.end.y)
+    high_y = max(line.start.y, line.end.y)
+    distance_x = low_x - x if x < low_x else x - high_x if x > high_x else 0
+    distance_y = low_y - y if y < low_y else y - high_y if y > high_y else 0
+    if distance_x >= distance_y:
+        return distance_x
+    return distance_y
+
+
+def _as_state(start):
+    x, y, vx, vy = start
+    return (int(x), int(y), int(vx), int(vy))
+
+
+def _is_blocked(state, blocked) -> bool:
+    if not blocked:
+        return False
+    return (state[0], state[1]) in blocked
+
+
+def _reconstruct(came_from, state):
+    path = []
+    while state is not None:
+        path.append(state)
+        state = came_from[state]
+    path.reverse()
+    return path
+
+
+def _log_not_found(start, expanded: int, max_states: int):
+    if expanded >= max_states:
+        _LOGGER.warning("No path from %s within %s expanded states.", start, max_states)
+    else:
+        _LOGGER.debug("No path from %s: the finish cannot be reached.", start)
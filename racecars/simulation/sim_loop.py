@@ -0,0 +1,106 @@
+"""Play turns in a background thread, independent of the display framerate.
+
+The window asks for the newest RaceSnapshot once per frame and draws it; the
+simulation thread takes a new snapshot only when one was asked for and the
+race has changed. A slow frame never delays a turn and a slow driver never
+freezes the window - the window just keeps showing the last finished turn.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from simulation.controller import Controller
+from simulation.snapshot import RaceSnapshot, take_snapshot
+
+_LOGGER = logging.getLogger("racecars.sim_loop")
+
+# Longest sleep while nothing can happen (waiting for a click, race over).
+_IDLE_WAIT = 0.05
+
+
+class SimulationLoop:
+    def __init__(self, controller: Controller, turn_rate: float = None):
+        # turn_rate: turns per second; None or 0 plays as fast as the drivers allow.
+        self.controller = controller
+        self.game_state = controller.game_state
+        self.turn_rate = turn_rate
+        self.error = None
+        self._clicks = deque()
+        self._wake = threading.Event()
+        self._snapshot = None
+        self._snapshot_wanted = True
+        self._turn = 0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        # The first picture is taken here so the window has something to draw at once.
+        self._publish()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="racecars-simulation", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            # A driver can be in the middle of PickMove(); the thread is a daemon, so do not hang.
+            self._thread.join(timeout)
+            self._thread = None
+
+    def latest_snapshot(self) -> RaceSnapshot:
+        self._snapshot_wanted = True
+        return self._snapshot
+
+    def apply_click(self, grid_x: int, grid_y: int):
+        # Clicks are handed to the controller by the simulation thread, never by the window.
+        self._clicks.append((grid_x, grid_y))
+        self._wake.set()
+
+    def _run(self):
+        interval = 0.0
+        if self.turn_rate:
+            interval = 1.0 / self.turn_rate
+        next_turn_time = time.perf_counter()
+
+        while self._running:
+            while self._clicks:
+                grid_x, grid_y = self._clicks.popleft()
+                self.controller.apply_click(grid_x, grid_y)
+
+            attempted = False
+            moved = False
+            now = time.perf_counter()
+            if not self.game_state.finished and now >= next_turn_time:
+                attempted = True
+                try:
+                    moved = self.controller.update()
+                except Exception as ex:
+                    self.error = ex
+                    _LOGGER.exception("Simulation stopped (%s: %s).", type(ex).__name__, ex)
+                    self._running = False
+                if moved:
+                    self._turn += 1
+                    next_turn_time = max(next_turn_time + interval, now)
+
+            if self._snapshot_wanted and self._snapshot.turn != self._turn:
+                self._publish()
+
+            if moved and interval == 0.0:
+                continue
+            if self.game_state.finished or (attempted and not moved):
+                # Race over, or a mouse player has not clicked yet: sleep until woken.
+                wait = _IDLE_WAIT
+            else:
+                wait = min(_IDLE_WAIT, max(0.0, next_turn_time - time.perf_counter()))
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def _publish(self):
+        targets = []
+        validity = []
+        if self.game_state.cars and not self.game_state.finished:
+            targets, validity = self.controller.get_targets_and_validity()
+        self._snapshot_wanted = False
+        self._snapshot = take_snapshot(self.game_state, targets, validity, self._turn)
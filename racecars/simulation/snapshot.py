@@ -0,0 +1,71 @@
+"""Immutable pictures of a race, taken by the simulation for the renderer.
+
+The renderer runs in another thread than the turn loop, so it never reads the
+live GameState. It draws the newest RaceSnapshot instead; everything inside
+one is a tuple, an immutable value or a copy nobody else holds, so it can be
+read without locks.
+"""
+
+from simulation.game_state import GameState, Track
+
+
+class CarSnapshot:
+    __slots__ = ("id", "name", "pos", "vel", "penalty", "path")
+
+    def __init__(self, car_id: int, name: str, pos, vel, penalty: int, path):
+        self.id = car_id
+        self.name = name
+        self.pos = pos
+        self.vel = vel
+        self.penalty = penalty
+        self.path = path
+
+    def __repr__(self):
+        return "CarSnapshot(id=" + str(self.id) + ", pos=" + str(self.pos) + ", penalty=" + str(self.penalty) + ")"
+
+
+class RaceSnapshot:
+    __slots__ = (
+        "track",
+        "cars",
+        "current_player_idx",
+        "race_round",
+        "finished",
+        "winners",
+        "targets",
+        "validity",
+        "turn"
+    )
+
+    def __init__(self, track: Track, cars: tuple, current_player_idx: int, race_round: int, finished: bool, winners: tuple, targets: tuple, validity: tuple, turn: int):
+        # `turn` counts applied moves; equal numbers mean equal pictures.
+        self.track = track
+        self.cars = cars
+        self.current_player_idx = current_player_idx
+        self.race_round = race_round
+        self.finished = finished
+        self.winners = winners
+        self.targets = targets
+        self.validity = validity
+        self.turn = turn
+
+    def __repr__(self):
+        return "RaceSnapshot(turn=" + str(self.turn) + ", race_round=" + str(self.race_round) + ", finished=" + str(self.finished) + ")"
+
+
+def take_snapshot(game_state: GameState, targets, validity, turn: int) -> RaceSnapshot:
+    # pos/vel are immutable vectors; a path copy is one flat int array copy.
+    cars = []
+    for car in game_state.cars:
+        cars.append(CarSnapshot(car.id, car.name, car.pos, car.vel, car.penalty, car.path.copy()))
+    return RaceSnapshot(
+        game_state.track,
+        tuple(cars),
+        game_state.current_player_idx,
+        game_state.race_round,
+        game_state.finished,
+        tuple(game_state.winners),
+        tuple(targets),
+        tuple(validity),
+        turn
+    )
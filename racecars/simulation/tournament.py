@@ -0,0 +1,213 @@
+"""Play many headless races in a pool of worker processes.
+
+Every race is identified by its track seed and uses the same list of
+controllers. Results are streamed back one race at a time, in the order the
+races finish, so a leaderboard can be updated while the tournament runs.
+"""
+
+import csv
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List
+from simulation.params import GameParams
+from simulation.performance import PerformanceTracker
+from simulation.race_setup import build_track, create_cars_for_track, build_game_state, find_script_info
+from simulation.script_loader import load_scripts_from_folder, load_auto_class
+from simulation.headless import run_headless
+from simulation.driver_host import DriverHostPool, release_hosted_drivers
+from simulation.replay import ReplayRecorder, FILE_EXTENSION
+from simulation.track_library import open_track_library
+from simulation.race_random import RaceRandom
+
+_LOGGER = logging.getLogger("racecars.tournament")
+
+CSV_HEADER = ["seed", "car_id", "controller", "car_name", "winner", "finished", "rounds", "calls", "total_seconds", "avg_seconds", "timeouts"]
+
+# Filled once per worker process by _init_worker, then reused for every race.
+_worker_scripts = []
+_worker_controllers = []
+_worker_params = None
+_worker_host_pool = None
+_worker_replay_folder = None
+_worker_track_library = None
+
+
+class TournamentResult:
+    def __init__(
+        self,
+        seed: int,
+        controllers: List[str],
+        names: List[str],
+        winners: List[int],
+        rounds: int,
+        finished: bool,
+        decision_seconds: List[float],
+        decision_calls: List[int],
+        decision_timeouts: List[int]
+    ):
+        # Plain data only; it travels from the worker process back to the parent.
+        self.seed = seed
+        self.controllers = controllers
+        self.names = names
+        self.winners = winners
+        self.rounds = rounds
+        self.finished = finished
+        self.decision_seconds = decision_seconds
+        self.decision_calls = decision_calls
+        self.decision_timeouts = decision_timeouts
+
+    def __repr__(self):
+        return (
+            "TournamentResult(seed="
+            + str(self.seed)
+            + ", winners="
+            + str(self.winners)
+            + ", rounds="
+            + str(self.rounds)
+            + ")"
+        )
+
+
+def run_tournament(
+    seeds,
+    controllers,
+    params: GameParams,
+    scripts_folder: str,
+    workers: int = None,
+    max_rounds: int = 1000,
+    replay_folder: str = None,
+    track_library: str = None
+):
+    # Generator: yields one TournamentResult per race as soon as a worker finishes it.
+    # With replay_folder, every race is also recorded as seed_<N>.rcr in that folder.
+    # With track_library (a file path), workers map that file and only generate missing tracks.
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(scripts_folder, list(controllers), params.clone(), replay_folder, track_library)
+    )
+    try:
+        futures = {}
+        for seed in seeds:
+            future = executor.submit(_run_race, seed, max_rounds)
+            futures[future] = seed
+
+        for future in as_completed(futures):
+            seed = futures[future]
+            try:
+                result = future.result()
+            except Exception as ex:
+                _LOGGER.error("Race with seed %s failed (%s: %s). Skipping it.", seed, type(ex).__name__, ex)
+                continue
+            yield result
+    finally:
+        # Stopping early (break in the caller) must not wait for the remaining races:
+        # queued ones are cancelled, running ones finish in the background and their
+        # results are dropped.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def result_to_csv_rows(result: TournamentResult):
+    rows = []
+    for car_id in range(len(result.names)):
+        calls = result.decision_calls[car_id]
+        total = result.decision_seconds[car_id]
+        avg = 0.0
+        if calls > 0:
+            avg = total / calls
+        controller = "mouse"
+        if car_id < len(result.controllers):
+            controller = result.controllers[car_id]
+        rows.append([
+            result.seed,
+            car_id + 1,
+            controller,
+            result.names[car_id],
+            1 if car_id in result.winners else 0,
+            1 if result.finished else 0,
+            result.rounds,
+            calls,
+            total,
+            avg,
+            result.decision_timeouts[car_id]
+        ])
+    return rows
+
+
+def write_results_csv(results, log_path: str):
+    # Writes rows as results arrive, so a long tournament can be watched with `tail`.
+    count = 0
+    file = open(log_path, "w", encoding="utf-8", newline="")
+    try:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        for result in results:
+            writer.writerows(result_to_csv_rows(result))
+            file.flush()
+            count += 1
+    finally:
+        file.close()
+    return count
+
+
+def replay_file_name(seed: int) -> str:
+    return "seed_" + str(seed) + FILE_EXTENSION
+
+
+def _init_worker(scripts_folder: str, controllers: List[str], params: GameParams, replay_folder: str = None, track_library: str = None):
+    # Import every selected driver once per process; ScriptInfo caches the class.
+    # With isolated drivers the scripts are imported by host processes instead,
+    # which stay alive for all races this worker plays.
+    global _worker_scripts, _worker_controllers, _worker_params, _worker_host_pool, _worker_replay_folder, _worker_track_library
+    _worker_replay_folder = replay_folder
+    if track_library is not None:
+        _worker_track_library = open_track_library(track_library)
+    _worker_scripts = load_scripts_from_folder(scripts_folder)
+    _worker_controllers = controllers
+    _worker_params = params
+    if params.isolate_drivers:
+        _worker_host_pool = DriverHostPool(scripts_folder)
+        return
+    for name in controllers:
+        if name.lower() == "mouse":
+            continue
+        script_info = find_script_info(_worker_scripts, name)
+        if script_info is None:
+            _LOGGER.warning("Controller '%s' was not found in '%s'.", name, scripts_folder)
+            continue
+        load_auto_class(script_info)
+
+
+def _run_race(seed: int, max_rounds: int) -> TournamentResult:
+    params = _worker_params.clone()
+    params.seed = seed
+    params.players = len(_worker_controllers)
+
+    race_random = RaceRandom(seed)
+    track = build_track(params, _worker_track_library, race_random)
+    cars = create_cars_for_track(track, params.players, _worker_controllers, _worker_scripts, _worker_host_pool, race_random)
+    game_state = build_game_state(params, track, cars, race_random)
+    tracker = PerformanceTracker(len(cars), None, print_summary=False)
+    game_state.performance = tracker
+    if _worker_replay_folder is not None:
+        replay_path = os.path.join(_worker_replay_folder, replay_file_name(seed))
+        game_state.replay = ReplayRecorder(replay_path, params, game_state, _worker_controllers)
+
+    try:
+        race = run_headless(game_state, max_rounds)
+    finally:
+        release_hosted_drivers(cars, _worker_host_pool)
+        if game_state.replay is not None:
+            game_state.replay.close(game_state)
+    return TournamentResult(
+        seed,
+        list(_worker_controllers),
+        race.names,
+        race.winners,
+        race.rounds,
+        race.finished,
+        list(tracker.total_seconds),
+        list(tracker.call_counts),
+        list(tracker.timeout_counts)
+    )
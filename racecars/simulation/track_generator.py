@@ -5,9 +5,13 @@ pass (without decreasing x), and retries until the track is fully connected.
 """
 
 import random
+import re
 from simulation.game_state import Track, Vertex, Segment
 from typing import List
 
+# bytes(road column) has 1 for road cells; this finds the vertical runs of road.
+_ROAD_RUN = re.compile(b"\x01+")
+
 def generate_track(
     width: int = 60,
     height: int = 40,
@@ -16,11 +20,13 @@ def generate_track(
     track_width_var: int = 2,
     turn_density: int = 50,
     turn_sharpness: int = 50,
-    seed: int = None
+    seed: int = None,
+    rng: random.Random = None
 ) -> Track:
     # If a seed is provided, students can recreate exactly the same track.
-    if seed is not None:
-        random.seed(seed)
+    # Only `rng` is drawn from; the global `random` module is left alone.
+    if rng is None:
+        rng = random.Random(seed)
 
     track_width_mean, track_width_var = _clamp_track_width_for_players(players, height, track_width_mean, track_width_var)
     min_width, max_width = _track_width_bounds(players, height)
@@ -47,8 +53,8 @@ def generate_track(
         if max_start_y < 0:
             max_start_y = 0
 
-        start_y = random.randint(0, max_start_y)
-        finish_y = random.randint(0, max_start_y)
+        start_y = rng.randint(0, max_start_y)
+        finish_y = rng.randint(0, max_start_y)
 
         start_vertices: List[Vertex] = []
         for i in range(start_line_length):
@@ -57,16 +63,11 @@ def generate_track(
         finish_line = Segment(Vertex(finish_x, finish_y), Vertex(finish_x, finish_y + start_line_length))
 
         # Road mask stores "is this cell road?" as booleans.
-        road_mask: List[List[bool]] = []
-        for _ in range(width):
-            column: List[bool] = []
-            for _ in range(height):
-                column.append(False)
-            road_mask.append(column)
+        road_mask: List[List[bool]] = [[False] * height for _ in range(width)]
 
         # 2) Draw a curvy centerline and paint road thickness around it.
-        centerline = _generate_centerline(width, height, start_y, finish_y, turn_density, turn_sharpness)
-        _apply_thickness(road_mask, width, height, centerline, track_width_mean, track_width_var, min_width, max_width)
+        centerline = _generate_centerline(width, height, start_y, finish_y, turn_density, turn_sharpness, rng)
+        _apply_thickness(road_mask, width, height, centerline, track_width_mean, track_width_var, min_width, max_width, rng)
         _ensure_start_finish(road_mask, width, height, start_y, finish_y, start_line_length)
         forward_pass_ok = _prune_track_for_forward_pass(
             road_mask,
@@ -103,7 +104,8 @@ def _generate_centerline(
     start_y: int,
     finish_y: int,
     turn_density: int,
-    turn_sharpness: int
+    turn_sharpness: int,
+    rng: random.Random
 ) -> List[Vertex]:
     # Builds a left-to-right path that gravitates toward waypoints.
     path: List[Vertex] = []
@@ -112,7 +114,7 @@ def _generate_centerline(
     direction_y = 0
 
     target_x = width - 1
-    waypoints_x, waypoints_y = _build_waypoints(width, height, start_y, finish_y)
+    waypoints_x, waypoints_y = _build_waypoints(width, height, start_y, finish_y, rng)
     next_wp_index = len(waypoints_y)
     target_y = finish_y
     if len(waypoints_y) > 1:
@@ -146,7 +148,7 @@ def _generate_centerline(
                 if next_wp_index < len(waypoints_y):
                     target_y = waypoints_y[next_wp_index]
 
-        direction_y = _pick_direction_with_bias(direction_y, y, target_y, height, turn_density, turn_sharpness)
+        direction_y = _pick_direction_with_bias(direction_y, y, target_y, height, turn_density, turn_sharpness, rng)
 
         next_y = y + direction_y
         if next_y < 0 or next_y >= height:
@@ -173,7 +175,7 @@ def _force_vertical_to_target(path: List[Vertex], x: int, y: int, target_y: int)
         path.append(Vertex(x, y))
     return y
 
-def _build_waypoints(width: int, height: int, start_y: int, finish_y: int):
+def _build_waypoints(width: int, height: int, start_y: int, finish_y: int, rng: random.Random):
     # Waypoints force larger shape changes so tracks do not become straight corridors.
     if width < 2:
         return [0], [start_y]
@@ -223,7 +225,7 @@ def _build_waypoints(width: int, height: int, start_y: int, finish_y: int):
             edge_toggle = True
             wy = edge_y
         else:
-            wy = _pick_waypoint_y(height, prev_y)
+            wy = _pick_waypoint_y(height, prev_y, rng)
 
         waypoints_y.append(wy)
         prev_y = wy
@@ -232,14 +234,14 @@ def _build_waypoints(width: int, height: int, start_y: int, finish_y: int):
     return waypoints_x, waypoints_y
 
 
-def _pick_waypoint_y(height: int, prev_y: int) -> int:
+def _pick_waypoint_y(height: int, prev_y: int, rng: random.Random) -> int:
     if height <= 0:
         return 0
     for _ in range(8):
-        y = random.randint(0, height - 1)
+        y = rng.randint(0, height - 1)
         if abs(y - prev_y) > 3:
             return y
-    return random.randint(0, height - 1)
+    return rng.randint(0, height - 1)
 
 
 def _edge_target_for_start(height: int, start_y: int) -> int:
@@ -265,7 +267,8 @@ def _pick_direction_with_bias(
     target_y: int,
     height: int,
     turn_density: int,
-    turn_sharpness: int
+    turn_sharpness: int,
+    rng: random.Random
 ) -> int:
     # Weighted random steering: prefer moving toward the current target_y,
     # while still allowing some noise for variety.
@@ -312,7 +315,7 @@ def _pick_direction_with_bias(
     if total <= 0:
         return 0
 
-    pick = random.randint(1, total)
+    pick = rng.randint(1, total)
     if pick <= weight_down:
         return -1
     if pick <= weight_down + weight_zero:
@@ -327,7 +330,8 @@ def _apply_thickness(
     track_width_mean: int,
     track_width_var: int,
     min_width: int,
-    max_width: int
+    max_width: int,
+    rng: random.Random
 ):
     # Converts centerline points into a drivable ribbon with varying width.
     if min_width < 1:
@@ -343,22 +347,31 @@ def _apply_thickness(
 
     current_base = _clamp_int(track_width_mean, min_width, max_width)
 
-    for index, point in enumerate(centerline):
+    # Brush radius per centerline point; drawn first so the random sequence (and the
+    # track for a seed) does not depend on how the road is painted.
+    radii = []
+    for index in range(len(centerline)):
         if index % change_interval == 0:
-            current_base = _random_between(min_width, max_width)
-        width_offset = random.randint(-track_width_var, track_width_var)
+            current_base = _random_between(min_width, max_width, rng)
+        width_offset = rng.randint(-track_width_var, track_width_var)
         track_width = current_base + width_offset
         track_width = _clamp_int(track_width, min_width, max_width)
         if track_width < 1:
             track_width = 1
-        radius = track_width // 2
+        radii.append(track_width // 2)
 
-        for dx in range(-radius, radius + 1):
-            for dy in range(-radius, radius + 1):
-                x = point.x + dx
-                y = point.y + dy
-                if 0 <= x < width and 0 <= y < height:
-                    road_mask[x][y] = True
+    for index, point in enumerate(centerline):
+        radius = radii[index]
+        # Square brush, clipped to the grid once and painted one column slice at a time.
+        x_from = max(point.x - radius, 0)
+        x_to = min(point.x + radius + 1, width)
+        y_from = max(point.y - radius, 0)
+        y_to = min(point.y + radius + 1, height)
+        if x_from >= x_to or y_from >= y_to:
+            continue
+        brush = [True] * (y_to - y_from)
+        for x in range(x_from, x_to):
+            road_mask[x][y_from:y_to] = brush
 
 def _ensure_start_finish(
     road_mask: List[List[bool]],
@@ -393,25 +406,15 @@ def _prune_track_for_forward_pass(
         return False
 
     finish_mid_y = finish_y + (line_length // 2)
-    dead_end: List[List[bool]] = []
-    for _ in range(width):
-        dead_end_column: List[bool] = []
-        for _ in range(height):
-            dead_end_column.append(False)
-        dead_end.append(dead_end_column)
-
-    on_path: List[List[bool]] = []
-    for _ in range(width):
-        path_column: List[bool] = []
-        for _ in range(height):
-            path_column.append(False)
-        on_path.append(path_column)
+    # Flat x * height + y flags: one allocation instead of a list per column.
+    dead_end = bytearray(width * height)
+    on_path = bytearray(width * height)
 
     stack = []
     stack.append(start_cell)
     start_x = start_cell[0]
     start_cell_y = start_cell[1]
-    on_path[start_x][start_cell_y] = True
+    on_path[start_x * height + start_cell_y] = 1
 
     while len(stack) > 0:
         current = stack[len(stack) - 1]
@@ -436,15 +439,15 @@ def _prune_track_for_forward_pass(
             nx = next_cell[0]
             ny = next_cell[1]
             stack.append((nx, ny))
-            on_path[nx][ny] = True
+            on_path[nx * height + ny] = 1
             continue
 
         # No forward-safe move from this node. Remove it when possible and backtrack.
         protected = _cell_is_protected(cx, cy, width, start_y, finish_y, line_length)
         if not protected:
             road_mask[cx][cy] = False
-        dead_end[cx][cy] = True
-        on_path[cx][cy] = False
+        dead_end[cx * height + cy] = 1
+        on_path[cx * height + cy] = 0
         stack.pop()
 
     return False
@@ -485,8 +488,8 @@ def _pick_forward_neighbor(
     x: int,
     y: int,
     finish_mid_y: int,
-    dead_end: List[List[bool]],
-    on_path: List[List[bool]]
+    dead_end: bytearray,
+    on_path: bytearray
 ):
     vertical_step = 1
     if finish_mid_y < y:
@@ -508,9 +511,9 @@ def _pick_forward_neighbor(
             continue
         if not road_mask[nx][ny]:
             continue
-        if dead_end[nx][ny]:
+        if dead_end[nx * height + ny]:
             continue
-        if on_path[nx][ny]:
+        if on_path[nx * height + ny]:
             continue
         return (nx, ny)
 
@@ -547,7 +550,7 @@ def _track_is_valid(
     finish_y: int,
     line_length: int
 ) -> bool:
-    # Breadth-first search ensures every road cell is connected and finish is reachable.
+    # Every road cell must be connected to the start, and the finish must be reachable.
     if width <= 0 or height <= 0:
         return False
 
@@ -562,58 +565,66 @@ def _track_is_valid(
     if not _start_has_exit(road_mask, width, height, start_cells):
         return False
 
-    visited: List[List[bool]] = []
-    for _ in range(width):
-        column: List[bool] = []
-        for _ in range(height):
-            column.append(False)
-        visited.append(column)
-
-    queue = []
-    queue.append(start_cells[0])
-    visited[start_cells[0][0]][start_cells[0][1]] = True
-    for cx, cy in queue:
-
-        nx = cx - 1
-        ny = cy
-        if nx >= 0 and road_mask[nx][ny] and not visited[nx][ny]:
-            visited[nx][ny] = True
-            queue.append((nx, ny))
-
-        nx = cx + 1
-        ny = cy
-        if nx < width and road_mask[nx][ny] and not visited[nx][ny]:
-            visited[nx][ny] = True
-            queue.append((nx, ny))
-
-        nx = cx
-        ny = cy - 1
-        if ny >= 0 and road_mask[nx][ny] and not visited[nx][ny]:
-            visited[nx][ny] = True
-            queue.append((nx, ny))
-
-        nx = cx
-        ny = cy + 1
-        if ny < height and road_mask[nx][ny] and not visited[nx][ny]:
-            visited[nx][ny] = True
-            queue.append((nx, ny))
-
     finish_reached = False
+    finish_column = road_mask[width - 1]
     for y in range(finish_y, min(finish_y + line_length, height)):
-        if visited[width - 1][y]:
+        if finish_column[y]:
             finish_reached = True
             break
 
     if not finish_reached:
         return False
 
-    for x in range(width):
-        for y in range(height):
-            if road_mask[x][y] and not visited[x][y]:
-                return False
+    # The start and finish cells are road, so "finish reachable and no road cell left
+    # unvisited" is the same as "the road is one connected component".
+    return _road_is_connected(road_mask, width)
 
+def _road_is_connected(road_mask: List[List[bool]], width: int) -> bool:
+    # Labels vertical runs of road instead of single cells: runs in neighbouring columns
+    # that share a row are joined with union-find. A column has only a few runs, so this
+    # touches far fewer items than a cell-by-cell breadth-first search.
+    parent = []
+    previous_runs = []
+    for x in range(width):
+        runs = []
+        for match in _ROAD_RUN.finditer(bytes(road_mask[x])):
+            run_id = len(parent)
+            parent.append(run_id)
+            runs.append((match.start(), match.end(), run_id))
+
+        left = 0
+        right = 0
+        while left < len(previous_runs) and right < len(runs):
+            left_start, left_end, left_id = previous_runs[left]
+            right_start, right_end, right_id = runs[right]
+            if left_start < right_end and right_start < left_end:
+                _union(parent, left_id, right_id)
+            if left_end <= right_end:
+                left += 1
+            else:
+                right += 1
+        previous_runs = runs
+
+    if len(parent) == 0:
+        return False
+    root = _find(parent, 0)
+    for run_id in range(1, len(parent)):
+        if _find(parent, run_id) != root:
+            return False
     return True
 
+def _find(parent: List[int], item: int) -> int:
+    while parent[item] != item:
+        parent[item] = parent[parent[item]]
+        item = parent[item]
+    return item
+
+def _union(parent: List[int], first: int, second: int):
+    first_root = _find(parent, first)
+    second_root = _find(parent, second)
+    if first_root != second_root:
+        parent[second_root] = first_root
+
 def _start_has_exit(
     road_mask: List[List[bool]],
     width: int,
@@ -697,7 +708,7 @@ def _clamp_int(value: int, low: int, high: int) -> int:
         return high
     return value
 
-def _random_between(min_value: int, max_value: int) -> int:
+def _random_between(min_value: int, max_value: int, rng: random.Random) -> int:
     if min_value >= max_value:
         return min_value
-    return random.randint(min_value, max_value)
+    return rng.randint(min_value, max_value)
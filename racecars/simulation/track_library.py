@@ -0,0 +1,242 @@
+"""Save fully prepared tracks to one compact file and load them through mmap.
+
+A track library holds padded, ready-to-race tracks keyed by the parameters
+that decide their shape (size, players, width, turns, seed). Every road cell
+is one bit, so a 60x40 track takes about 330 bytes. The file is opened with
+mmap: worker processes share the operating system's copy of the file, and
+only the few bytes of the track that is actually raced are unpacked.
+
+Layout (little-endian):
+
+- 8-byte magic, format version, track count
+- index: per track its key (7 ints and a 64-bit seed) and the offset and
+  length of its entry
+- entries: width, height, finish line, start vertices, then the road bits in
+  x-then-y order, lowest bit first
+"""
+
+import logging
+import mmap
+import os
+import struct
+from simulation.game_state import Track, Vertex, Segment
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is optional; without it the road bits are unpacked with plain loops.
+    np = None
+
+_LOGGER = logging.getLogger("racecars.track_library")
+
+MAGIC = b"RCTRACKS"
+FORMAT_VERSION = 1
+
+_FILE_HEAD = struct.Struct("<HI")  # format version, track count
+_INDEX_ENTRY = struct.Struct("<7iqQI")  # key, entry offset, entry length
+_INT_LIMIT = 2 ** 31
+_SEED_LIMIT = 2 ** 63
+_TRACK_HEAD = struct.Struct("<HHhhhhH")  # width, height, finish x0, y0, x1, y1, start count
+_PAIR = struct.Struct("<hh")
+
+
+class TrackLibraryError(Exception):
+    pass
+
+
+def track_key(params) -> tuple:
+    # Everything generate_track() depends on; None if the track is not reproducible.
+    # Keys that do not fit the index (say a seed beyond 64 bits) are not stored either.
+    if params.seed is None:
+        return None
+    key = (
+        params.width,
+        params.height,
+        params.players,
+        params.track_width_mean,
+        params.track_width_var,
+        params.turn_sharpness,
+        params.turn_density,
+        params.seed
+    )
+    if not -_SEED_LIMIT <= key[7] < _SEED_LIMIT:
+        return None
+    for value in key[:7]:
+        if not -_INT_LIMIT <= value < _INT_LIMIT:
+            return None
+    return key
+
+
+def encode_track(track: Track) -> bytes:
+    finish = track.finish_line
+    parts = [
+        _TRACK_HEAD.pack(
+            track.width,
+            track.height,
+            finish.start.x,
+            finish.start.y,
+            finish.end.x,
+            finish.end.y,
+            len(track.start_vertices)
+        )
+    ]
+    for vertex in track.start_vertices:
+        parts.append(_PAIR.pack(vertex.x, vertex.y))
+    height = track.height
+    bits = bytearray((track.width * height + 7) // 8)
+    for x in range(track.width):
+        column = track.road_mask[x]
+        base = x * height
+        for y in range(height):
+            if column[y]:
+                index = base + y
+                bits[index >> 3] |= 1 << (index & 7)
+    parts.append(bytes(bits))
+    return b"".join(parts)
+
+
+def decode_track(buffer, offset: int = 0) -> Track:
+    # `buffer` may be bytes, a memoryview or an mmap; only this entry is read.
+    width, height, fx0, fy0, fx1, fy1, start_count = _TRACK_HEAD.unpack_from(buffer, offset)
+    offset += _TRACK_HEAD.size
+    start_vertices = []
+    for _ in range(start_count):
+        x, y = _PAIR.unpack_from(buffer, offset)
+        offset += _PAIR.size
+        start_vertices.append(Vertex(x, y))
+    road_mask = _unpack_road(buffer, offset, width, height)
+    finish_line = Segment(Vertex(fx0, fy0), Vertex(fx1, fy1))
+    return Track(width, height, road_mask, start_vertices, finish_line)
+
+
+def _unpack_road(buffer, offset: int, width: int, height: int):
+    # Always plain lists of bools: scripts get the track and may use list methods on it.
+    count = width * height
+    byte_count = (count + 7) // 8
+    if np is not None:
+        packed = np.frombuffer(buffer, dtype=np.uint8, count=byte_count, offset=offset)
+        cells = np.unpackbits(packed, count=count, bitorder="little").astype(bool)
+        return cells.reshape(width, height).tolist()
+    packed = bytes(buffer[offset:offset + byte_count])
+    road_mask = []
+    for x in range(width):
+        base = x * height
+        column = []
+        for y in range(height):
+            index = base + y
+            column.append(packed[index >> 3] >> (index & 7) & 1 == 1)
+        road_mask.append(column)
+    return road_mask
+
+
+def write_track_library(path: str, tracks: dict):
+    # tracks: track_key -> Track.
+    entries = {}
+    for key in tracks:
+        entries[key] = encode_track(tracks[key])
+    write_track_entries(path, entries)
+
+
+def write_track_entries(path: str, encoded: dict):
+    # encoded: track_key -> encode_track() bytes. The file is replaced in one step, so
+    # processes that still have the old library mapped keep reading the old file safely.
+    keys = sorted(encoded)
+    entries = []
+    for key in keys:
+        entries.append(encoded[key])
+
+    offset = len(MAGIC) + _FILE_HEAD.size + _INDEX_ENTRY.size * len(keys)
+    parts = [MAGIC, _FILE_HEAD.pack(FORMAT_VERSION, len(keys))]
+    for index in range(len(keys)):
+        parts.append(_INDEX_ENTRY.pack(*keys[index], offset, len(entries[index])))
+        offset += len(entries[index])
+    parts.extend(entries)
+
+    temporary_path = path + ".tmp"
+    file = open(temporary_path, "wb")
+    try:
+        file.write(b"".join(parts))
+    finally:
+        file.close()
+    os.replace(temporary_path, path)
+
+
+class TrackLibrary:
+    def __init__(self, path: str):
+        # Maps the file read-only; only the index is parsed here.
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file cannot be mapped.
+            self._file.close()
+            raise TrackLibraryError("Track library '%s' is empty." % path)
+        self._index = {}
+        try:
+            self._read_index()
+        except (struct.error, TrackLibraryError):
+            self.close()
+            raise
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def keys(self):
+        return list(self._index)
+
+    def get(self, params) -> Track:
+        # A new Track object on every call (tracks cache per-race data); None if missing.
+        key = track_key(params)
+        if key is None:
+            return None
+        return self.get_by_key(key)
+
+    def get_by_key(self, key: tuple) -> Track:
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        return decode_track(self._map, entry[0])
+
+    def get_encoded(self, key: tuple) -> bytes:
+        # The stored entry as it is, for copying it into another library without decoding.
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        offset, length = entry
+        return self._map[offset:offset + length]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _read_index(self):
+        data = self._map
+        if data[:len(MAGIC)] != MAGIC:
+            raise TrackLibraryError("'%s' is not a racecars track library." % self.path)
+        version, count = _FILE_HEAD.unpack_from(data, len(MAGIC))
+        if version > FORMAT_VERSION:
+            raise TrackLibraryError("Track library format version %s is newer than this game." % version)
+        offset = len(MAGIC) + _FILE_HEAD.size
+        for _ in range(count):
+            values = _INDEX_ENTRY.unpack_from(data, offset)
+            offset += _INDEX_ENTRY.size
+            self._index[tuple(values[:8])] = (values[8], values[9])
+
+
+def open_track_library(path: str):
+    # None (with a log message) if there is no usable library at `path`.
+    if not os.path.exists(path):
+        return None
+    try:
+        return TrackLibrary(path)
+    except (OSError, struct.error, TrackLibraryError) as ex:
+        _LOGGER.warning("Track library '%s' could not be opened (%s). Tracks will be generated.", path, ex)
+        return None
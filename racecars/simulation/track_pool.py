@@ -0,0 +1,170 @@
+"""Generate tracks ahead of time in background processes and keep them on disk.
+
+A TrackPool sits on top of a track library file (see track_library.py). Races
+ask it for the track of their parameters and seed; prefetch() starts
+generating tracks that will be needed later in worker processes, so that a
+race usually finds its track ready and starts at once. Only a track that was
+never asked for is generated on demand, in the calling process. New tracks
+are written back to the library file by save() (and close()), so the next run
+finds them on disk.
+
+    pool = TrackPool("tracks.rct")
+    pool.prefetch(params, range(1, 101))
+    track = build_track(params, pool)    # instant when prefetched
+    pool.close()
+"""
+
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from simulation.params import GameParams
+from simulation.track_library import (
+    track_key,
+    encode_track,
+    decode_track,
+    open_track_library,
+    write_track_entries
+)
+
+_LOGGER = logging.getLogger("racecars.track_pool")
+
+
+class TrackPool:
+    def __init__(self, library_path: str, workers: int = None):
+        # workers: generator processes for prefetch(), None = one per core.
+        self.library_path = library_path
+        self.workers = workers
+        self.hits = 0
+        self.misses = 0
+        self._library = open_track_library(library_path)
+        self._ready = {}  # track_key -> encoded track, not yet saved
+        self._pending = {}  # track_key -> Future of an encoded track
+        self._executor = None
+
+    def __contains__(self, params) -> bool:
+        key = track_key(params)
+        return key is not None and self._is_known(key)
+
+    def prefetch(self, params: GameParams, seeds) -> int:
+        # Starts background generation for every seed that is not stored or queued yet.
+        submitted = 0
+        for seed in seeds:
+            race_params = params.clone()
+            race_params.seed = seed
+            key = track_key(race_params)
+            if key is None or self._is_known(key) or key in self._pending:
+                continue
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            self._pending[key] = self._executor.submit(_generate_encoded, race_params)
+            submitted += 1
+        return submitted
+
+    def get(self, params: GameParams):
+        # Same interface as TrackLibrary.get(), so build_track(params, pool) works.
+        # A queued track is waited for; an unknown one is generated right here.
+        key = track_key(params)
+        if key is None:
+            return None
+
+        encoded = self._ready.get(key)
+        if encoded is not None:
+            self.hits += 1
+            return decode_track(encoded)
+
+        if self._library is not None and key in self._library:
+            self.hits += 1
+            return self._library.get_by_key(key)
+
+        future = self._pending.pop(key, None)
+        if future is not None:
+            start = time.perf_counter()
+            try:
+                encoded = future.result()
+            except Exception as ex:
+                _LOGGER.warning("Background generation of track %s failed (%s: %s).", key, type(ex).__name__, ex)
+            else:
+                self.hits += 1
+                self._ready[key] = encoded
+                _LOGGER.debug("Waited %.3f s for queued track %s.", time.perf_counter() - start, key)
+                return decode_track(encoded)
+
+        self.misses += 1
+        encoded = _generate_encoded(params)
+        self._ready[key] = encoded
+        return decode_track(encoded)
+
+    def wait(self):
+        # Blocks until every prefetched track is generated.
+        for key in list(self._pending):
+            future = self._pending.pop(key)
+            try:
+                self._ready[key] = future.result()
+            except Exception as ex:
+                _LOGGER.warning("Background generation of track %s failed (%s: %s).", key, type(ex).__name__, ex)
+
+    def save(self) -> int:
+        # Writes finished tracks into the library file; returns how many were added.
+        self._collect_finished()
+        if len(self._ready) == 0:
+            return 0
+        entries = {}
+        if self._library is not None:
+            for key in self._library.keys():
+                entries[key] = self._library.get_encoded(key)
+            self._library.close()
+        added = len(self._ready)
+        entries.update(self._ready)
+        write_track_entries(self.library_path, entries)
+        self._ready = {}
+        self._library = open_track_library(self.library_path)
+        _LOGGER.info("Track library '%s': %s tracks added, %s in total.", self.library_path, added, len(entries))
+        return added
+
+    def close(self):
+        # Unstarted generations are dropped; finished ones are saved.
+        if self._executor is not None:
+            for future in self._pending.values():
+                future.cancel()
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        self.save()
+        self._pending = {}
+        if self._library is not None:
+            self._library.close()
+            self._library = None
+
+    def _is_known(self, key) -> bool:
+        if key in self._ready:
+            return True
+        return self._library is not None and key in self._library
+
+    def _collect_finished(self):
+        for key in list(self._pending):
+            future = self._pending[key]
+            if not future.done() or future.cancelled():
+                continue
+            del self._pending[key]
+            try:
+                self._ready[key] = future.result()
+            except Exception as ex:
+                _LOGGER.warning("Background generation of track %s failed (%s: %s).", key, type(ex).__name__, ex)
+
+
+def ensure_track_library(path: str, params: GameParams, seeds, workers: int = None) -> int:
+    # Generates the tracks for `seeds` that are not in the library yet, in parallel,
+    # and saves them; returns how many were generated.
+    pool = TrackPool(path, workers)
+    try:
+        pool.prefetch(params, seeds)
+        pool.wait()
+        return pool.save()
+    finally:
+        pool.close()
+
+
+def _generate_encoded(params: GameParams) -> bytes:
+    # Runs in a worker process; bytes travel back much cheaper than a Track object.
+    # Imported here so that the pool itself never needs the generator.
+    from simulation.race_setup import build_track
+    return encode_track(build_track(params))
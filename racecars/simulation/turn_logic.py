@@ -1,6 +1,6 @@
 """Apply one player's chosen action and update the shared game state."""
 
-from simulation.game_state import GameState, Vertex, Vector2i, Segment
+from simulation.game_state import GameState, Vertex, Vector2i
 
 class TurnLogic:
     @staticmethod
@@ -9,6 +9,8 @@ class TurnLogic:
             return
 
         car = game_state.cars[car_id]
+        # Anything cached for the current turn (targets, occupied cells) is stale from here on.
+        game_state.occupancy_version += 1
 
         if car.penalty > 0:
             # Crash penalty consumes turns before the car can move again.
@@ -40,12 +42,12 @@ class TurnLogic:
             if exit_point is None:
                 collision_point = new_position
                 collision_vertex = collision_point
-                car.pos = game_state.track.nearest_inside_vertex(collision_point)
+                car.pos = game_state.track.nearest_inside_vertex(collision_point, game_state.race_random.crash)
             else:
                 collision_vertex = Vertex(int(round(exit_point[0])), int(round(exit_point[1])))
-                car.pos = game_state.track.nearest_inside_vertex_from_point(exit_point[0], exit_point[1])
+                car.pos = game_state.track.nearest_inside_vertex_from_point(exit_point[0], exit_point[1], game_state.race_random.crash)
             if collision_vertex != old_position:
-                car.path.append(Segment(old_position, collision_vertex))
+                car.path.append_xy(old_position.x, old_position.y, collision_vertex.x, collision_vertex.y)
             car.vel = Vector2i(0, 0)
             if TurnLogic._should_apply_penalty(game_state, target_occupied, segment_valid):
                 car.penalty = TurnLogic._compute_penalty_rounds(game_state, new_velocity)
@@ -53,7 +55,7 @@ class TurnLogic:
                 car.penalty = 0
         else:
             # Normal move: append to replay path and keep new velocity.
-            car.path.append(Segment(old_position, new_position))
+            car.path.append_xy(old_position.x, old_position.y, new_position.x, new_position.y)
             car.pos = new_position
             car.vel = new_velocity
 
@@ -65,6 +67,7 @@ class TurnLogic:
 
         if crossed_finish:
             # Game ends only after everyone had the same number of turns.
+            car.finished = True
             if not TurnLogic._winner_exists(game_state, car.id):
                 game_state.winners.append(car.id)
             if not game_state.finish_triggered:
@@ -75,12 +78,7 @@ class TurnLogic:
 
     @staticmethod
     def _target_is_occupied(game_state: GameState, car_id: int, target: Vertex) -> bool:
-        for index in range(len(game_state.cars)):
-            if index != car_id:
-                other = game_state.cars[index]
-                if other.pos == target:
-                    return True
-        return False
+        return game_state.car_store.is_occupied(target.x, target.y, car_id)
 
     @staticmethod
     def _winner_exists(game_state: GameState, car_id: int) -> bool:
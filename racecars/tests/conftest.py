@@ -0,0 +1,6 @@
+"""Lets the tests import simulation.* the way main.py does, from the racecars folder."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,98 @@
+"""find_path_bfs and find_path_astar must agree, and A*'s estimates must be lower bounds."""
+
+import pytest
+from simulation.params import GameParams
+from simulation.race_setup import build_track
+from simulation.search import (
+    HEURISTICS,
+    TransitionTable,
+    find_path_bfs,
+    find_path_astar,
+    moves_lower_bound,
+    _heuristic_function
+)
+
+TRACK_SEEDS = (1, 2, 3)
+
+_tables = {}
+
+
+def _table(seed: int) -> TransitionTable:
+    # One table per track for the whole module, so later searches reuse expanded states.
+    table = _tables.get(seed)
+    if table is None:
+        params = GameParams()
+        params.seed = seed
+        table = TransitionTable(build_track(params))
+        _tables[seed] = table
+    return table
+
+
+def _starts(table: TransitionTable):
+    # A standing start and a state in full flight, taken from the middle of a route.
+    start = table.track.start_vertices[0]
+    standing = (start.x, start.y, 0, 0)
+    path = find_path_bfs(table, standing)
+    assert path, "generated track has no route"
+    return [standing, path[len(path) // 2]]
+
+
+def _assert_legal_route(table: TransitionTable, path):
+    for index in range(len(path) - 1):
+        moves = dict(table.successors(path[index]))
+        assert path[index + 1] in moves, (path[index], path[index + 1])
+        assert moves[path[index + 1]] == (index == len(path) - 2)
+
+
+@pytest.mark.parametrize("seed", TRACK_SEEDS)
+def test_astar_finds_as_few_moves_as_bfs(seed):
+    table = _table(seed)
+    for start in _starts(table):
+        expected = find_path_bfs(table, start)
+        _assert_legal_route(table, expected)
+        for heuristic in HEURISTICS:
+            path = find_path_astar(table, start, heuristic)
+            assert len(path) == len(expected), (start, heuristic)
+            assert path[0] == start
+            _assert_legal_route(table, path)
+
+
+@pytest.mark.parametrize("seed", TRACK_SEEDS)
+def test_estimates_never_exceed_bfs_moves(seed):
+    table = _table(seed)
+    track = table.track
+    estimates = {}
+    for heuristic in HEURISTICS:
+        estimates[heuristic] = _heuristic_function(track, heuristic)
+
+    for start in _starts(table):
+        path = find_path_bfs(table, start)
+        # Every tail of a shortest route is a shortest route from its first state.
+        for index in range(len(path) - 1):
+            state = path[index]
+            moves_left = len(path) - 1 - index
+            distance = track.finish_distance_xy(state[0], state[1])
+            assert distance >= 0, state
+
+            # No move covers more finish-distance steps than its speed.
+            steps = 0
+            for later in path[index + 1:]:
+                steps += max(abs(later[2]), abs(later[3]))
+            assert distance <= steps, state
+
+            speed = max(abs(state[2]), abs(state[3]))
+            assert moves_lower_bound(distance, speed) <= moves_left, state
+            for heuristic in HEURISTICS:
+                assert estimates[heuristic](state) <= moves_left, (state, heuristic)
+
+
+def test_moves_lower_bound_is_the_fewest_moves_on_a_straight_road():
+    # Accelerating every move is the fastest way to cover a distance.
+    for speed in range(0, 6):
+        for distance in range(0, 80):
+            moves = 0
+            covered = 0
+            while covered < distance:
+                moves += 1
+                covered += speed + moves
+            assert moves_lower_bound(distance, speed) == moves, (distance, speed)
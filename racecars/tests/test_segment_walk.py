@@ -0,0 +1,142 @@
+"""The integer grid walk of Track.segment_is_valid must match the old t-sampling check.
+
+_ReferenceTrack is a frozen copy of the implementation it replaced: it splits a
+segment at every grid-line crossing and samples the middle of each piece.
+"""
+
+import random
+from simulation.game_state import Track, Vertex, Segment
+from simulation.params import GameParams
+from simulation.race_setup import build_track
+
+SEGMENTS_PER_TRACK = 3000
+
+
+class _ReferenceTrack:
+    def __init__(self, track: Track):
+        self.width = track.width
+        self.height = track.height
+        self.road_mask = track.road_mask
+
+    def segment_is_valid(self, p0: Vertex, p1: Vertex) -> bool:
+        dx = p1.x - p0.x
+        dy = p1.y - p0.y
+        if dx == 0 and dy == 0:
+            return self._sample_point_is_on_road(float(p0.x), float(p0.y))
+
+        t_values = self._collect_t_values(p0, p1)
+        t_values.sort()
+        epsilon = 0.0000001
+        for index in range(len(t_values) - 1):
+            t0 = t_values[index]
+            t1 = t_values[index + 1]
+            if t1 - t0 > epsilon:
+                t_mid = (t0 + t1) * 0.5
+                if not self._sample_point_is_on_road(p0.x + dx * t_mid, p0.y + dy * t_mid):
+                    return False
+        return True
+
+    def first_invalid_point_on_segment(self, p0: Vertex, p1: Vertex):
+        dx = p1.x - p0.x
+        dy = p1.y - p0.y
+        if dx == 0 and dy == 0:
+            if self._sample_point_is_on_road(float(p0.x), float(p0.y)):
+                return None
+            return (float(p0.x), float(p0.y))
+
+        t_values = self._collect_t_values(p0, p1)
+        t_values.sort()
+        epsilon = 0.0000001
+        for index in range(len(t_values) - 1):
+            t0 = t_values[index]
+            t1 = t_values[index + 1]
+            if t1 - t0 > epsilon:
+                t_mid = (t0 + t1) * 0.5
+                if not self._sample_point_is_on_road(p0.x + dx * t_mid, p0.y + dy * t_mid):
+                    return (p0.x + dx * t0, p0.y + dy * t0)
+        return None
+
+    def _collect_t_values(self, p0: Vertex, p1: Vertex):
+        t_values = [0.0, 1.0]
+        dx = p1.x - p0.x
+        dy = p1.y - p0.y
+        if dx > 0:
+            for x in range(p0.x + 1, p1.x):
+                t_values.append((x - p0.x) / dx)
+        elif dx < 0:
+            for x in range(p0.x - 1, p1.x, -1):
+                t_values.append((x - p0.x) / dx)
+        if dy > 0:
+            for y in range(p0.y + 1, p1.y):
+                t_values.append((y - p0.y) / dy)
+        elif dy < 0:
+            for y in range(p0.y - 1, p1.y, -1):
+                t_values.append((y - p0.y) / dy)
+        return t_values
+
+    def _sample_point_is_on_road(self, x: float, y: float) -> bool:
+        # A point is road if any touching cell is road (boundary inclusive).
+        if x < 0 or y < 0 or x > self.width or y > self.height:
+            return False
+        epsilon = 0.000001
+        candidates_x = [int(x)]
+        if abs(x - round(x)) < epsilon:
+            candidates_x.append(int(x) - 1)
+        candidates_y = [int(y)]
+        if abs(y - round(y)) < epsilon:
+            candidates_y.append(int(y) - 1)
+        for cell_x in candidates_x:
+            for cell_y in candidates_y:
+                if self._cell_is_road(cell_x, cell_y):
+                    return True
+        return False
+
+    def _cell_is_road(self, cell_x: int, cell_y: int) -> bool:
+        if cell_x < 0 or cell_x >= self.width or cell_y < 0 or cell_y >= self.height:
+            return False
+        return self.road_mask[cell_x][cell_y]
+
+
+def _generated_track(seed: int) -> Track:
+    params = GameParams()
+    params.seed = seed
+    return build_track(params)
+
+
+def _noise_track(seed: int, width: int = 30, height: int = 20) -> Track:
+    # Scattered road cells give far more boundary cases than a generated track.
+    rng = random.Random(seed)
+    road_mask = [[rng.random() < 0.7 for _ in range(height)] for _ in range(width)]
+    finish_line = Segment(Vertex(width - 1, 0), Vertex(width - 1, height))
+    return Track(width, height, road_mask, [Vertex(1, 1)], finish_line)
+
+
+def _random_segments(track: Track, rng: random.Random, count: int):
+    # Short moves like real ones, long ones, and endpoints off the grid.
+    for _ in range(count):
+        x0 = rng.randint(-2, track.width + 2)
+        y0 = rng.randint(-2, track.height + 2)
+        reach = rng.choice((1, 3, 8, 25))
+        yield Vertex(x0, y0), Vertex(x0 + rng.randint(-reach, reach), y0 + rng.randint(-reach, reach))
+
+
+def _assert_same_answers(track: Track, seed: int):
+    reference = _ReferenceTrack(track)
+    rng = random.Random(seed)
+    for p0, p1 in _random_segments(track, rng, SEGMENTS_PER_TRACK):
+        expected_valid = reference.segment_is_valid(p0, p1)
+        assert track.segment_is_valid(p0, p1) == expected_valid, (p0, p1)
+        assert track.segment_is_valid_xy(p0.x, p0.y, p1.x, p1.y) == expected_valid, (p0, p1)
+        expected_exit = reference.first_invalid_point_on_segment(p0, p1)
+        assert track.first_invalid_point_on_segment(p0, p1) == expected_exit, (p0, p1)
+
+
+def test_generated_tracks_match_reference():
+    for seed in (1, 2, 3):
+        _assert_same_answers(_generated_track(seed), seed)
+
+
+def test_noise_tracks_match_reference():
+    for seed in (11, 12, 13, 14):
+        _assert_same_answers(_noise_track(seed), seed)
+
@@ -7,9 +7,14 @@ _DEFAULT_LOG_LEVEL = "INFO"
 _FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
 _DATE_FORMAT = "%H:%M:%S"
 
+# Arguments of the last setup_logging() call, for processes that have to log the same way.
+_settings = None
+
 
 def setup_logging(level, to_console: bool = True, file_path: str = None):
     """Configure root logging handlers and return the resolved level name."""
+    global _settings
+    _settings = (level, to_console, file_path)
     root = logging.getLogger()
     _remove_handlers(root)
     logging.disable(logging.NOTSET)
@@ -59,6 +64,11 @@ def setup_logging(level, to_console: bool = True, file_path: str = None):
         )
     return level_name
 
+def logging_settings():
+    """Return the arguments of the last setup_logging() call, or None if it was never called."""
+    return _settings
+
+
 def _resolve_level(level):
     text = _DEFAULT_LOG_LEVEL
     if level is not None:
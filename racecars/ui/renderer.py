@@ -1,13 +1,15 @@
 """Pygame renderer for the racecars game.
 
-Draws the track, cars, move hints, and status text each frame.
+Draws the track, cars, move hints, and status text each frame. Turns are
+played by a SimulationLoop thread; every frame draws its newest RaceSnapshot.
 """
 
 import logging
-import random
 import pygame
 from simulation.game_state import GameState
 from simulation.controller import Controller
+from simulation.sim_loop import SimulationLoop
+from simulation.snapshot import RaceSnapshot
 
 _LOGGER = logging.getLogger("racecars.renderer")
 
@@ -32,11 +34,16 @@ class Renderer:
         game_state: GameState,
         screen_width: int = None,
         screen_height: int = None,
-        framerate: int = 30
+        framerate: int = 30,
+        turn_rate: float = None,
+        controller=None
     ):
+        # `controller` may be anything with the Controller turn interface, e.g. a ReplayEngine.
         pygame.init()
         self.game_state = game_state
-        self.controller = Controller(game_state)
+        if controller is None:
+            controller = Controller(game_state)
+        self.controller = controller
         self.cell_size = 20  # Size of each grid cell in pixels
         self.margin = 40  # Paper margin around the grid
         if screen_width is None or screen_height is None:
@@ -44,11 +51,24 @@ class Renderer:
         self.screen = pygame.display.set_mode((screen_width, screen_height))
         self.clock = pygame.time.Clock()
         self.framerate = framerate
+        # Turns per second for the simulation thread; None keeps one turn per frame.
+        self.turn_rate = framerate if turn_rate is None else turn_rate
+        self.simulation = None
+        self.snapshot = None
+        # Track, grid and start/finish lines never change during a race, so they are
+        # drawn once into this surface and blitted every frame.
+        self._static_layer = None
+        self._static_layer_key = None
+        # Static layer plus every path segment drawn so far; each frame only adds the
+        # segments appended since the previous frame (counted per car id).
+        self._trail_layer = None
+        self._trail_base = None
+        self._trail_counts = {}
 
         self.car_colors = []
         for color_name in _CAR_COLOR_NAMES:
             self.car_colors.append(pygame.colordict.THECOLORS[color_name])
-        random.shuffle(self.car_colors)
+        self.game_state.race_random.colors.shuffle(self.car_colors)
         
         self.font = pygame.font.SysFont("consolas", 18)
         self._missing_start_line_warning_emitted = False
@@ -61,7 +81,7 @@ class Renderer:
         screen_height = height_px + self.margin * 2
         return screen_width, screen_height
 
-    def draw_grid(self):
+    def draw_grid(self, surface):
         # Grid lines mimic graph paper, which helps explain vector movement.
         width_px = self.game_state.track.width * self.cell_size
         height_px = self.game_state.track.height * self.cell_size
@@ -71,16 +91,16 @@ class Renderer:
             color = (170, 200, 220)
             if x % (self.cell_size * 5) == 0:
                 color = (120, 160, 190)
-            pygame.draw.line(self.screen, color, (line_x, self.margin), (line_x, self.margin + height_px), 1)
+            pygame.draw.line(surface, color, (line_x, self.margin), (line_x, self.margin + height_px), 1)
 
         for y in range(0, height_px + 1, self.cell_size):
             line_y = self.margin + y
             color = (170, 200, 220)
             if y % (self.cell_size * 5) == 0:
                 color = (120, 160, 190)
-            pygame.draw.line(self.screen, color, (self.margin, line_y), (self.margin + width_px, line_y), 1)
+            pygame.draw.line(surface, color, (self.margin, line_y), (self.margin + width_px, line_y), 1)
 
-    def draw_track(self):
+    def draw_track(self, surface):
         # Paint only drivable cells; the background remains "off-road".
         for x in range(self.game_state.track.width):
             for y in range(self.game_state.track.height):
@@ -91,30 +111,31 @@ class Renderer:
                     self.cell_size
                 )
                 if self.game_state.track.road_mask[x][y]:
-                    pygame.draw.rect(self.screen, (235, 235, 235), rect)  # Light track
+                    pygame.draw.rect(surface, (235, 235, 235), rect)  # Light track
 
     def handle_click(self, position):
         # Convert click position to nearest vertex coordinates
         grid_x = round((position[0] - self.margin) / self.cell_size)
         grid_y = round((position[1] - self.margin) / self.cell_size)
-        self.controller.apply_click(grid_x, grid_y)
+        self.simulation.apply_click(grid_x, grid_y)
+
+    def draw_path_segments(self, surface, color, segments):
+        # Historical path, so students can replay decision outcomes.
+        for segment in segments:
+            start_pos = self._vertex_to_screen(segment.start.x, segment.start.y)
+            end_pos = self._vertex_to_screen(segment.end.x, segment.end.y)
+            pygame.draw.line(surface, color, start_pos, end_pos, 2)
+            pygame.draw.circle(surface, color, start_pos, self.cell_size // 8)
+            pygame.draw.circle(surface, color, end_pos, self.cell_size // 8)
 
     def draw_cars(self):
-        for car in self.game_state.cars:
+        # Paths are already in the trail layer; only the cars themselves move.
+        for car in self.snapshot.cars:
             color = self.car_colors[car.id]
-            # Draw the historical path so students can replay decision outcomes.
-            for segment in car.path:
-                start_pos = self._vertex_to_screen(segment.start.x, segment.start.y)
-                end_pos = self._vertex_to_screen(segment.end.x, segment.end.y)
-                pygame.draw.line(self.screen, color, start_pos, end_pos, 2)
-                pygame.draw.circle(self.screen, color, start_pos, self.cell_size // 8)
-                pygame.draw.circle(self.screen, color, end_pos, self.cell_size // 8)
-
-            # Draw the car
             car_pos = self._vertex_to_screen(car.pos.x, car.pos.y)
             pygame.draw.circle(self.screen, color, car_pos, self.cell_size // 3)
 
-    def draw_start_and_finish_lines(self):
+    def draw_start_and_finish_lines(self, surface):
         if self.game_state.track.start_line is None:
             if not self._missing_start_line_warning_emitted:
                 _LOGGER.warning("Track.start_line is None. Start line rendering is skipped.")
@@ -128,12 +149,12 @@ class Renderer:
             for y in range(start.y, end.y + 1):
                 x0, y0 = self._vertex_to_screen(start.x, y)
                 x1, y1 = self._vertex_to_screen(start.x, y + 1)
-                pygame.draw.line(self.screen, (0, 180, 0), (x0, y0), (x1, y1), 2)
+                pygame.draw.line(surface, (0, 180, 0), (x0, y0), (x1, y1), 2)
         else:
             for x in range(start.x, end.x + 1):
                 x0, y0 = self._vertex_to_screen(x, start.y)
                 x1, y1 = self._vertex_to_screen(x + 1, start.y)
-                pygame.draw.line(self.screen, (0, 180, 0), (x0, y0), (x1, y1), 2)
+                pygame.draw.line(surface, (0, 180, 0), (x0, y0), (x1, y1), 2)
 
         # Draw finish line
         start = self.game_state.track.finish_line.start
@@ -142,26 +163,66 @@ class Renderer:
             for y in range(start.y, end.y + 1):
                 x0, y0 = self._vertex_to_screen(start.x, y)
                 x1, y1 = self._vertex_to_screen(start.x, y + 1)
-                pygame.draw.line(self.screen, (200, 0, 0), (x0, y0), (x1, y1), 2)
+                pygame.draw.line(surface, (200, 0, 0), (x0, y0), (x1, y1), 2)
         else:
             for x in range(start.x, end.x + 1):
                 x0, y0 = self._vertex_to_screen(x, start.y)
                 x1, y1 = self._vertex_to_screen(x + 1, start.y)
-                pygame.draw.line(self.screen, (200, 0, 0), (x0, y0), (x1, y1), 2)
+                pygame.draw.line(surface, (200, 0, 0), (x0, y0), (x1, y1), 2)
 
-    def render(self):
-        self.screen.fill((180, 180, 180))  # Gray background outside track
-        self.draw_track()
-        self.draw_grid()  # Grid on top for graph-paper look
-        self.draw_start_and_finish_lines()
+    def render(self, snapshot: RaceSnapshot):
+        self.snapshot = snapshot
+        self.screen.blit(self._get_trail_layer(), (0, 0))
         self.draw_possible_targets()
         self.draw_cars()
         self.draw_status()
         self.draw_round_counter()
         pygame.display.flip()
 
+    def invalidate_static_layer(self):
+        # Call after changing cell_size, margin or the window size.
+        self._static_layer = None
+        self._static_layer_key = None
+        self._trail_layer = None
+
+    def _get_static_layer(self):
+        key = (self.screen.get_size(), self.cell_size, self.margin, id(self.game_state.track))
+        if self._static_layer is None or self._static_layer_key != key:
+            layer = pygame.Surface(self.screen.get_size()).convert()
+            layer.fill((180, 180, 180))  # Gray background outside track
+            self.draw_track(layer)
+            self.draw_grid(layer)  # Grid on top for graph-paper look
+            self.draw_start_and_finish_lines(layer)
+            self._static_layer = layer
+            self._static_layer_key = key
+        return self._static_layer
+
+    def _get_trail_layer(self):
+        static_layer = self._get_static_layer()
+        if self._trail_layer is None or self._trail_base is not static_layer or self._trails_were_reset():
+            self._trail_layer = static_layer.copy()
+            self._trail_base = static_layer
+            self._trail_counts = {}
+
+        for car in self.snapshot.cars:
+            drawn = self._trail_counts.get(car.id, 0)
+            if drawn < len(car.path):
+                self.draw_path_segments(self._trail_layer, self.car_colors[car.id], car.path[drawn:])
+                self._trail_counts[car.id] = len(car.path)
+        return self._trail_layer
+
+    def _trails_were_reset(self) -> bool:
+        # Paths only grow during a race; a shorter one means a new race in this window.
+        for car in self.snapshot.cars:
+            if len(car.path) < self._trail_counts.get(car.id, 0):
+                return True
+        return False
+
     def run(self):
-        # Main render loop: input -> game update -> redraw.
+        # Main render loop: input -> newest snapshot -> redraw. Turns run in their own thread,
+        # so a slow frame only skips pictures and a slow driver never blocks the window.
+        self.simulation = SimulationLoop(self.controller, self.turn_rate)
+        self.simulation.start()
         running = True
         while running:
             for event in pygame.event.get():
@@ -170,10 +231,10 @@ class Renderer:
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     self.handle_click(event.pos)
 
-            self.controller.update()
-            self.render()
+            self.render(self.simulation.latest_snapshot())
             self.clock.tick(self.framerate)
 
+        self.simulation.stop()
         pygame.quit()
 
     def _vertex_to_screen(self, x: int, y: int):
@@ -183,32 +244,48 @@ class Renderer:
 
     def _draw_target_preview_lines(self):
         # Light guide lines make the acceleration options easier to read visually.
-        if not self.game_state.cars:
+        snapshot = self.snapshot
+        if not snapshot.cars:
             return
 
-        car = self.game_state.cars[self.game_state.current_player_idx]
-        targets, validity = self.controller.get_targets_and_validity()
+        car = snapshot.cars[snapshot.current_player_idx]
+        targets = snapshot.targets
+        validity = snapshot.validity
 
-        overlay = pygame.Surface(self.screen.get_size(), pygame.SRCALPHA)
         start_pos = self._vertex_to_screen(car.pos.x, car.pos.y)
-
+        end_positions = []
         for target, is_valid in zip(targets, validity):
             if is_valid:
-                end_pos = self._vertex_to_screen(target.x, target.y)
-                pygame.draw.line(overlay, (0, 120, 255, 80), start_pos, end_pos, 2)
+                end_positions.append(self._vertex_to_screen(target.x, target.y))
+        if not end_positions:
+            return
+
+        # The translucent overlay only needs to cover the lines, not the whole window.
+        pad = 2
+        left = min(start_pos[0], min(pos[0] for pos in end_positions)) - pad
+        top = min(start_pos[1], min(pos[1] for pos in end_positions)) - pad
+        right = max(start_pos[0], max(pos[0] for pos in end_positions)) + pad
+        bottom = max(start_pos[1], max(pos[1] for pos in end_positions)) + pad
+        overlay = pygame.Surface((right - left + 1, bottom - top + 1), pygame.SRCALPHA)
+        local_start = (start_pos[0] - left, start_pos[1] - top)
+        for end_pos in end_positions:
+            local_end = (end_pos[0] - left, end_pos[1] - top)
+            pygame.draw.line(overlay, (0, 120, 255, 80), local_start, local_end, 2)
 
-        self.screen.blit(overlay, (0, 0))
+        self.screen.blit(overlay, (left, top))
 
     def draw_possible_targets(self):
         # Targets are shown every frame for the currently active car.
-        if self.game_state.finished:
+        snapshot = self.snapshot
+        if snapshot.finished:
             return
 
         self._draw_target_preview_lines()
 
-        targets, validity = self.controller.get_targets_and_validity()
+        targets = snapshot.targets
+        validity = snapshot.validity
         penalty_mode = self._current_car_is_waiting()
-        current_car = self.game_state.cars[self.game_state.current_player_idx]
+        current_car = snapshot.cars[snapshot.current_player_idx]
         for index, target in enumerate(targets):
             is_valid = index < len(validity) and validity[index]
             pos = self._vertex_to_screen(target.x, target.y)
@@ -221,14 +298,15 @@ class Renderer:
 
     def draw_status(self):
         # Status line switches between "current turn" and "winner(s)" mode.
-        if not self.game_state.cars:
+        snapshot = self.snapshot
+        if not snapshot.cars:
             return
 
         x = self.margin
         y = 10
-        if self.game_state.finished:
-            if len(self.game_state.winners) == 1:
-                winner_id = self.game_state.winners[0]
+        if snapshot.finished:
+            if len(snapshot.winners) == 1:
+                winner_id = snapshot.winners[0]
                 winner = self._get_car_by_id(winner_id)
                 winner_text = "Car " + str(winner_id + 1) + ": " + winner.name
                 parts = [
@@ -241,7 +319,7 @@ class Renderer:
                 parts.extend(self._winner_name_parts())
                 self._blit_text_parts(x, y, parts)
         else:
-            current = self.game_state.cars[self.game_state.current_player_idx]
+            current = snapshot.cars[snapshot.current_player_idx]
             parts = [
                 ("Turn: ", (0, 0, 0)),
                 (current.name, self.car_colors[current.id])
@@ -249,7 +327,7 @@ class Renderer:
             self._blit_text_parts(x, y, parts)
 
     def draw_round_counter(self):
-        round_text = "Round: " + str(self.game_state.race_round)
+        round_text = "Round: " + str(self.snapshot.race_round)
         label = self.font.render(round_text, True, (0, 0, 0))
         x = self.screen.get_width() - label.get_width() - 10
         y = 10
@@ -257,24 +335,24 @@ class Renderer:
 
     def _join_winners(self):
         text = ""
-        for index, winner_id in enumerate(self.game_state.winners):
+        for index, winner_id in enumerate(self.snapshot.winners):
             if index > 0:
                 text = text + ", "
             text = text + "Car " + str(winner_id)
         return text
 
     def _get_car_by_id(self, car_id: int):
-        for car in self.game_state.cars:
+        for car in self.snapshot.cars:
             if car.id == car_id:
                 return car
         if car_id not in self._missing_car_id_warnings:
             _LOGGER.warning("Requested car_id=%s was not found. Falling back to first car.", car_id)
             self._missing_car_id_warnings.add(car_id)
-        return self.game_state.cars[0]
+        return self.snapshot.cars[0]
 
     def _winner_name_parts(self):
         parts = []
-        for index, winner_id in enumerate(self.game_state.winners):
+        for index, winner_id in enumerate(self.snapshot.winners):
             winner = self._get_car_by_id(winner_id)
             if index > 0:
                 parts.append((", ", (0, 0, 0)))
@@ -290,9 +368,10 @@ class Renderer:
             offset_x += label.get_width()
 
     def _current_car_is_waiting(self):
-        if not self.game_state.cars:
+        snapshot = self.snapshot
+        if not snapshot.cars:
             return False
-        car = self.game_state.cars[self.game_state.current_player_idx]
+        car = snapshot.cars[snapshot.current_player_idx]
         return car.penalty > 0
 
     def _apply_penalty_marker_offset(self, pos):